@@ -1,13 +1,329 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+import argparse
 import json
-import re
 import os
-from tkinter import ttk
+import queue
+import sys
+import threading
 from collections import Counter # Importar Counter para contar elementos y encontrar duplicados
+from contextlib import redirect_stdout
+from typing import NamedTuple, Optional
+
+from escritura_json import COMPRESIONES, abrir_salida, volcar_json
+from indice_versiculos import IndiceVersiculos, detectar_superposiciones
+from lectura_json import abrir_texto, expandir_entradas
+from metricas import Metricas
+from referencias_biblicas import formatear_referencia, parse_referencia
+from registro_devocional import Devocional, cargar_compacto
+
+# tkinter se importa solo al abrir la interfaz gráfica (ver _importar_tk), para que el
+# modo por lotes arranque rápido y funcione sin pantalla.
+tk = ttk = filedialog = messagebox = scrolledtext = None
+
+NOMBRE_SALIDA = "excluded_verses.json"
+NOMBRE_INDICE = "excluded_verses.idx"
+
+# Cada cuánto la interfaz vacía la cola de eventos del proceso en segundo plano (ms)
+# y cuántos eventos procesa como máximo en cada pasada.
+INTERVALO_COLA_MS = 100
+MAX_EVENTOS_POR_PASADA = 5000
+
+
+class ExtraccionCancelada(Exception):
+    """Se pidió cancelar la extracción mientras estaba en curso."""
+
+
+def _importar_tk():
+    global tk, ttk, filedialog, messagebox, scrolledtext
+    import tkinter
+    from tkinter import filedialog as _filedialog, messagebox as _messagebox, scrolledtext as _scrolledtext, ttk as _ttk
+    tk, ttk, filedialog, messagebox, scrolledtext = tkinter, _ttk, _filedialog, _messagebox, _scrolledtext
+
+
+class VersiculoExtraido(NamedTuple):
+    """Pasaje extraído de un campo 'versiculo' junto con su procedencia."""
+    pasaje: tuple
+    archivo: Optional[str] = None
+    idioma: Optional[str] = None  # None si el documento no tiene la estructura conocida
+    fecha: Optional[str] = None
+
+
+def _extraer_de_campo(value, versiculos, log, archivo, idioma, fecha):
+    # Se usa el motor compartido de referencias (patrón precompilado y memorizado).
+    # Ejemplo: "Hebreos 5:8-9 RVR1960: \"Texto\"" -> Referencia de "Hebreos 5:8-9"
+    # Ejemplo: "Salmos 23" -> Referencia de "Salmos 23" (capítulo completo)
+    referencia = parse_referencia(value.strip())
+    if referencia:
+        versiculos.append(VersiculoExtraido(referencia.pasaje, archivo, idioma, fecha))
+        log(f"  - Extraído: {formatear_referencia(referencia, idioma=idioma)}")
+    else:
+        log(f"  - No se pudo extraer el versículo con el patrón estricto del campo 'versiculo': '{value.strip()}'")
+
+
+_CONTENEDORES = (dict, list, Devocional)
+
+
+def _recorrer_generico(data, versiculos, log, archivo):
+    """
+    Recorrido iterativo (con una pila explícita, sin límite de profundidad) de cualquier
+    estructura JSON, buscando las claves 'versiculo' en todos los niveles. Los Devocional
+    se recorren igual que los dicts.
+    """
+    pendientes = [data]
+    while pendientes:
+        nodo = pendientes.pop()
+        if type(nodo) is list:
+            pendientes.extend(value for value in reversed(nodo) if type(value) in _CONTENEDORES)
+        else:
+            hijos = []
+            for key, value in nodo.items():
+                if key == "versiculo" and type(value) is str:
+                    _extraer_de_campo(value, versiculos, log, archivo, None, None)
+                elif type(value) in _CONTENEDORES:
+                    hijos.append(value)
+            pendientes.extend(reversed(hijos))
+
+
+def buscar_versiculos(data, versiculos, log=print, archivo=None):
+    """
+    Busca el campo 'versiculo' en la estructura JSON y agrega a la lista versiculos un
+    VersiculoExtraido por cada uno que se ajuste a un patrón de referencia bíblica.
+
+    Para la estructura conocida {"data": {idioma: {fecha: [devocional, ...]}}} se lee
+    directamente el 'versiculo' de cada devocional y se registra su (archivo, idioma,
+    fecha). Lo que no tiene esa forma (otras claves, idiomas o fechas con otro tipo de
+    valor, documentos de otra estructura) se recorre con la búsqueda genérica.
+    """
+    if type(data) is not dict:
+        if type(data) in _CONTENEDORES:
+            _recorrer_generico(data, versiculos, log, archivo)
+        return
+    for key, value in data.items():
+        if key == "versiculo" and type(value) is str:
+            _extraer_de_campo(value, versiculos, log, archivo, None, None)
+        elif key != "data" or type(value) is not dict:
+            if type(value) in _CONTENEDORES:
+                _recorrer_generico(value, versiculos, log, archivo)
+        else:
+            for idioma, fechas in value.items():
+                if type(fechas) is not dict:
+                    if type(fechas) in _CONTENEDORES:
+                        _recorrer_generico(fechas, versiculos, log, archivo)
+                    continue
+                for fecha, devocionales in fechas.items():
+                    if type(devocionales) is not list:
+                        if type(devocionales) in _CONTENEDORES:
+                            _recorrer_generico(devocionales, versiculos, log, archivo)
+                        continue
+                    for devocional in devocionales:
+                        if type(devocional) is Devocional:
+                            # Cargado con cargar_compacto: 'versiculo' es siempre texto.
+                            _extraer_de_campo(devocional.versiculo, versiculos, log, archivo, idioma, fecha)
+                            continue
+                        if type(devocional) is not dict:
+                            if type(devocional) is list:
+                                _recorrer_generico(devocional, versiculos, log, archivo)
+                            continue
+                        versiculo = devocional.get("versiculo")
+                        if type(versiculo) is str:
+                            _extraer_de_campo(versiculo, versiculos, log, archivo, idioma, fecha)
+
+
+def _describir_procedencia(versiculo):
+    partes = [os.path.basename(versiculo.archivo) if versiculo.archivo else "?"]
+    if versiculo.idioma is not None:
+        partes += [versiculo.idioma, versiculo.fecha]
+    return " ".join(partes)
+
+
+def extraer_versiculos_excluidos(file_paths, output_dir, compression=None, compact=False,
+                                 log=print, avisar=None, progreso=None, versiculos=None, metricas=None,
+                                 cancelar=None, indice=False):
+    """
+    Extrae los versículos del campo 'versiculo' de todos los archivos y escribe
+    excluded_verses.json (o .json.gz / .json.xz) en output_dir.
+
+    log(mensaje) recibe el detalle del proceso; avisar(nivel, titulo, mensaje), si se pasa,
+    recibe los avisos que la interfaz muestra en ventanas ('info', 'advertencia' o 'error');
+    progreso(porcentaje) se llama cada vez que cambia el porcentaje de bytes leídos del
+    total de los archivos. versiculos permite reutilizar la lista donde se acumulan los
+    VersiculoExtraido (pasaje y procedencia). Con metricas (metricas.Metricas) se
+    registran los tiempos de lectura, extracción y escritura y los bytes y versículos de
+    cada archivo.
+
+    cancelar es un threading.Event (o cualquier objeto con is_set()); si se activa, la
+    lectura se interrumpe, no se escribe la salida y el resumen indica "cancelado".
+
+    Además de los duplicados exactos se informan las superposiciones de rangos (por
+    ejemplo 'Juan 3:16' ya cubierto por 'Juan 3:14-18'). Con indice=True se escribe
+    también excluded_verses.idx, el bitset de versículos usados (ver indice_versiculos).
+    Devuelve un resumen con los contadores y la ruta de salida (None si no pudo guardarse).
+    """
+    if metricas is None:
+        metricas = Metricas()
+    if avisar is None:
+        avisar = lambda nivel, titulo, mensaje: None
+    if versiculos is None:
+        versiculos = []
+
+    tamanos = []
+    for file_path in file_paths:
+        try:
+            tamanos.append(os.path.getsize(file_path))
+        except OSError:
+            tamanos.append(0)
+    total_bytes = sum(tamanos) or 1
+    avance = {"bytes": 0, "porcentaje": -1}
+
+    def informar(bytes_leidos):
+        """Avance de la lectura; es el punto donde se atiende un pedido de cancelación."""
+        if cancelar is not None and cancelar.is_set():
+            raise ExtraccionCancelada()
+        actualizar(bytes_leidos)
+
+    def actualizar(bytes_leidos):
+        avance["bytes"] += bytes_leidos
+        porcentaje = min(100, avance["bytes"] * 100 // total_bytes)
+        if progreso and porcentaje != avance["porcentaje"]:
+            avance["porcentaje"] = porcentaje
+            progreso(porcentaje)
+
+    total_files = len(file_paths)
+    processed_count = 0
+    omitidos = []
+    cancelado = False
+    for i, file_path in enumerate(file_paths):
+        file_name = os.path.basename(file_path)
+        if cancelar is not None and cancelar.is_set():
+            cancelado = True
+            break
+        log(f"Procesando archivo ({i+1}/{total_files}): {file_name}")
+        try:
+            with metricas.etapa("lectura_decodificacion", file_path), abrir_texto(file_path, informar) as f:
+                data = cargar_compacto(f)
+            metricas.contar("bytes_leidos", os.path.getsize(file_path), archivo=file_path)
+
+            # Recursivamente buscar solo en el campo 'versiculo'
+            extraidos_antes = len(versiculos)
+            with metricas.etapa("extraccion", file_path):
+                buscar_versiculos(data, versiculos, log, file_path)
+            metricas.contar("versiculos_extraidos", len(versiculos) - extraidos_antes, archivo=file_path)
+
+            processed_count += 1
+
+        except ExtraccionCancelada:
+            cancelado = True
+            break
+        except json.JSONDecodeError:
+            avisar("error", "Error de JSON", f"El archivo '{file_name}' no es un JSON válido y se omitirá.")
+            log(f"Error de JSON: El archivo '{file_name}' no es válido y se ha omitido.")
+            omitidos.append(file_path)
+        except FileNotFoundError:
+            avisar("error", "Error de Archivo", f"El archivo '{file_name}' no se encontró y se omitirá.")
+            log(f"Error de Archivo: El archivo '{file_name}' no se encontró y se ha omitido.")
+            omitidos.append(file_path)
+        except Exception as e:
+            avisar("error", "Error Desconocido", f"Ocurrió un error al procesar '{file_name}': {e}")
+            log(f"Error Desconocido al procesar '{file_name}': {e}")
+            omitidos.append(file_path)
+        # Los archivos omitidos o leídos a medias cuentan como completos para el progreso
+        actualizar(sum(tamanos[:i + 1]) - avance["bytes"])
+
+    if cancelado:
+        log("Proceso cancelado. No se generó el archivo de salida.")
+        return {
+            "archivos_seleccionados": total_files,
+            "archivos_procesados": processed_count,
+            "archivos_omitidos": omitidos,
+            "versiculos_extraidos": len(versiculos),
+            "versiculos_unicos": len({versiculo.pasaje for versiculo in versiculos}),
+            "versiculos_duplicados": None,
+            "versiculos_superpuestos": None,
+            "salida": None,
+            "salida_indice": None,
+            "cancelado": True,
+        }
+
+    # Ordenar la lista de versículos
+    output_verses = sorted(formatear_referencia(versiculo.pasaje, idioma=versiculo.idioma) for versiculo in versiculos)
+
+    # Verificar duplicados comparando las referencias como tuplas de enteros
+    verse_counts = Counter(versiculo.pasaje for versiculo in versiculos)
+    duplicates = sorted(pasaje for pasaje, count in verse_counts.items() if count > 1)
+
+    if duplicates:
+        procedencias = {}
+        for versiculo in versiculos:
+            if verse_counts[versiculo.pasaje] > 1:
+                procedencias.setdefault(versiculo.pasaje, []).append(_describir_procedencia(versiculo))
+        log("\n--- Versículos Duplicados Encontrados ---")
+        for pasaje in duplicates:
+            log(f"- '{formatear_referencia(pasaje)}' (aparece {verse_counts[pasaje]} veces: {'; '.join(procedencias[pasaje])})")
+        avisar("advertencia", "Versículos Duplicados", f"Se encontraron {len(duplicates)} versículos duplicados. Verifique el log para detalles.")
+    else:
+        log("\n--- No se encontraron versículos duplicados ---")
+        avisar("info", "Sin Duplicados", "No se encontraron versículos duplicados en la lista final.")
+
+    # Versículos distintos que comparten versículos con otro ya extraído
+    superposiciones = detectar_superposiciones(versiculo.pasaje for versiculo in versiculos)
+    if superposiciones:
+        log("\n--- Versículos Superpuestos Encontrados ---")
+        for pasaje, previos in superposiciones:
+            log(f"- '{formatear_referencia(pasaje)}' se superpone con "
+                f"{', '.join(repr(formatear_referencia(previo)) for previo in previos)}")
+        avisar("advertencia", "Versículos Superpuestos", f"Se encontraron {len(superposiciones)} versículos que se superponen con otros rangos. Verifique el log para detalles.")
+
+    output_file_name = NOMBRE_SALIDA
+    if compression:
+        output_file_name += f".{compression}"
+    output_file_path = os.path.join(output_dir, output_file_name)
+    salida = None
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        with metricas.etapa("escritura"), abrir_salida(output_file_path) as outfile:
+            volcar_json(output_verses, outfile, compacto=compact)
+        salida = output_file_path
+        metricas.contar("bytes_escritos", os.path.getsize(output_file_path))
+
+        final_message = (
+            f"Todos los versículos extraídos y guardados en '{output_file_path}'. "
+            f"Cantidad total de versículos en el archivo final: {len(output_verses)} (incluyendo duplicados)."
+        )
+        avisar("info", "Éxito", final_message)
+        log(f"Proceso completado. {final_message}")
+    except Exception as e:
+        avisar("error", "Error al guardar", f"No se pudo guardar '{output_file_path}': {e}")
+        log(f"Error al guardar '{output_file_path}': {e}")
+
+    salida_indice = None
+    if indice and salida:
+        index_file_path = os.path.join(output_dir, NOMBRE_INDICE)
+        try:
+            with metricas.etapa("escritura_indice"):
+                IndiceVersiculos.desde_pasajes(versiculo.pasaje for versiculo in versiculos).guardar(index_file_path)
+            salida_indice = index_file_path
+            metricas.contar("bytes_escritos", os.path.getsize(index_file_path))
+            log(f"Índice de versículos usados guardado en '{index_file_path}'.")
+        except Exception as e:
+            avisar("error", "Error al guardar", f"No se pudo guardar '{index_file_path}': {e}")
+            log(f"Error al guardar '{index_file_path}': {e}")
+
+    return {
+        "archivos_seleccionados": total_files,
+        "archivos_procesados": processed_count,
+        "archivos_omitidos": omitidos,
+        "versiculos_extraidos": len(output_verses),
+        "versiculos_unicos": len(verse_counts),
+        "versiculos_duplicados": len(duplicates),
+        "versiculos_superpuestos": len(superposiciones),
+        "salida": salida,
+        "salida_indice": salida_indice,
+        "cancelado": False,
+    }
+
 
 class VerseExtractorApp:
     def __init__(self, root):
+        _importar_tk()
         self.root = root
         self.root.title("Extractor de Versículos Bíblicos")
         self.root.geometry("700x600")
@@ -43,7 +359,10 @@ class VerseExtractorApp:
         self.process_button = tk.Button(process_frame, text="Procesar y Generar excluded_verses.json", command=self.process_files, state=tk.DISABLED)
         self.process_button.pack(pady=10, padx=10)
 
-        # Barra de progreso
+        self.cancel_button = tk.Button(process_frame, text="Cancelar", command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_button.pack(pady=2, padx=10)
+
+        # Barra de progreso (por bytes leídos del total de los archivos)
         self.progress_label = tk.Label(process_frame, text="Progreso: 0%")
         self.progress_label.pack(pady=2)
         self.progressbar = ttk.Progressbar(process_frame, orient="horizontal", length=400, mode="determinate")
@@ -58,7 +377,13 @@ class VerseExtractorApp:
 
         self.selected_files = []
         self.output_directory = ""
-        self.all_extracted_verses = [] # Cambiado de set a list para permitir duplicados
+        self.all_extracted_verses = [] # VersiculoExtraido (pasaje y procedencia); lista para permitir duplicados
+        self.output_compression = None # 'gz' o 'xz' para escribir excluded_verses.json comprimido
+        self.output_compact = False # True para escribir el JSON sin indentación
+        self.output_index = True # Escribir también excluded_verses.idx (bitset de versículos usados)
+        self.worker = None # Hilo que ejecuta la extracción
+        self.events = queue.Queue() # Eventos del hilo hacia la interfaz
+        self.cancel_event = threading.Event()
 
         self._check_can_process()
         self.log_message("Aplicación iniciada. Seleccione archivos y una carpeta de destino.")
@@ -69,12 +394,11 @@ class VerseExtractorApp:
         self.log_text.insert(tk.END, message + "\n")
         self.log_text.see(tk.END) # Auto-scroll al final
         self.log_text.config(state='disabled')
-        self.root.update_idletasks() # Actualizar la UI
 
     def select_files(self):
         file_paths = filedialog.askopenfilenames(
             title="Seleccionar archivos JSON",
-            filetypes=[("Archivos JSON", "*.json"), ("Todos los archivos", "*.*")]
+            filetypes=[("Archivos JSON", "*.json *.json.gz *.json.xz"), ("Todos los archivos", "*.*")]
         )
         if file_paths:
             self.selected_files = list(file_paths)
@@ -101,11 +425,14 @@ class VerseExtractorApp:
         self._check_can_process()
 
     def _check_can_process(self):
-        if self.selected_files and self.output_directory:
+        if self.selected_files and self.output_directory and not self._processing():
             self.process_button.config(state=tk.NORMAL)
         else:
             self.process_button.config(state=tk.DISABLED)
 
+    def _processing(self):
+        return self.worker is not None and self.worker.is_alive()
+
     def process_files(self):
         self.all_extracted_verses.clear() # Limpiar la lista para un nuevo procesamiento
         self.log_text.config(state='normal')
@@ -113,8 +440,7 @@ class VerseExtractorApp:
         self.log_text.config(state='disabled')
         self.log_message("Iniciando procesamiento de archivos...")
 
-        total_files = len(self.selected_files)
-        if total_files == 0:
+        if not self.selected_files:
             messagebox.showwarning("Advertencia", "No se han seleccionado archivos para procesar.")
             self.log_message("Error: No hay archivos seleccionados para procesar.")
             return
@@ -123,111 +449,141 @@ class VerseExtractorApp:
             self.log_message("Error: No se ha seleccionado una carpeta de destino.")
             return
 
-        self.progressbar['value'] = 0
-        self.progress_label.config(text="Progreso: 0%")
+        self._update_progress(0)
         self.process_button.config(state=tk.DISABLED) # Deshabilitar el botón mientras se procesa
-
-        processed_count = 0
-        for i, file_path in enumerate(self.selected_files):
-            file_name = os.path.basename(file_path)
-            self.log_message(f"Procesando archivo ({i+1}/{total_files}): {file_name}")
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Recursivamente buscar solo en el campo 'versiculo'
-                self._find_verses_in_json(data)
-
-                processed_count += 1
-                progress_percentage = int((processed_count / total_files) * 100)
-                self.progressbar['value'] = progress_percentage
-                self.progress_label.config(text=f"Progreso: {progress_percentage}%")
-                self.root.update_idletasks()
-
-            except json.JSONDecodeError:
-                messagebox.showerror("Error de JSON", f"El archivo '{file_name}' no es un JSON válido y se omitirá.")
-                self.log_message(f"Error de JSON: El archivo '{file_name}' no es válido y se ha omitido.")
-                continue
-            except FileNotFoundError:
-                messagebox.showerror("Error de Archivo", f"El archivo '{file_name}' no se encontró y se omitirá.")
-                self.log_message(f"Error de Archivo: El archivo '{file_name}' no se encontró y se ha omitido.")
-                continue
-            except Exception as e:
-                messagebox.showerror("Error Desconocido", f"Ocurrió un error al procesar '{file_name}': {e}")
-                self.log_message(f"Error Desconocido al procesar '{file_name}': {e}")
-                continue
-
-        # Ordenar la lista de versículos
-        output_verses = sorted(self.all_extracted_verses)
-
-        # Verificar duplicados
-        verse_counts = Counter(output_verses)
-        duplicates = [verse for verse, count in verse_counts.items() if count > 1]
-
-        if duplicates:
-            self.log_message("\n--- Versículos Duplicados Encontrados ---")
-            for verse in duplicates:
-                self.log_message(f"- '{verse}' (aparece {verse_counts[verse]} veces)")
-            messagebox.showwarning("Versículos Duplicados", f"Se encontraron {len(duplicates)} versículos duplicados. Verifique el log para detalles.")
-        else:
-            self.log_message("\n--- No se encontraron versículos duplicados ---")
-            messagebox.showinfo("Sin Duplicados", "No se encontraron versículos duplicados en la lista final.")
-
-        output_file_path = os.path.join(self.output_directory, "excluded_verses.json")
+        self.cancel_button.config(state=tk.NORMAL)
+        self.cancel_event.clear()
+
+        # La extracción corre en un hilo aparte y solo se comunica con la interfaz a
+        # través de la cola; la interfaz la vacía por lotes con un temporizador.
+        self.worker = threading.Thread(target=self._run_extraction, args=(
+            list(self.selected_files), self.output_directory, self.output_compression, self.output_compact,
+            self.output_index,
+        ), daemon=True)
+        self.worker.start()
+        self.root.after(INTERVALO_COLA_MS, self._drain_events)
+
+    def _run_extraction(self, file_paths, output_directory, compression, compact, index):
+        """Cuerpo del hilo de trabajo: no toca ningún widget."""
+        put = self.events.put
         try:
-            with open(output_file_path, 'w', encoding='utf-8') as outfile:
-                json.dump(output_verses, outfile, indent=4, ensure_ascii=False)
-            
-            final_message = (
-                f"Todos los versículos extraídos y guardados en '{output_file_path}'. "
-                f"Cantidad total de versículos en el archivo final: {len(output_verses)} (incluyendo duplicados)."
+            resumen = extraer_versiculos_excluidos(
+                file_paths, output_directory, compression=compression, compact=compact,
+                log=lambda mensaje: put(("log", mensaje)),
+                avisar=lambda nivel, titulo, mensaje: put(("aviso", nivel, titulo, mensaje)),
+                progreso=lambda porcentaje: put(("progreso", porcentaje)),
+                versiculos=self.all_extracted_verses, cancelar=self.cancel_event, indice=index,
             )
-            messagebox.showinfo("Éxito", final_message)
-            self.log_message(f"Proceso completado. {final_message}")
-            self.progressbar['value'] = 100
-            self.progress_label.config(text="Progreso: 100%")
         except Exception as e:
-            messagebox.showerror("Error al guardar", f"No se pudo guardar '{output_file_path}': {e}")
-            self.log_message(f"Error al guardar '{output_file_path}': {e}")
-        finally:
+            put(("aviso", "error", "Error Desconocido", f"Ocurrió un error durante la extracción: {e}"))
+            resumen = None
+        put(("fin", resumen))
+
+    def _drain_events(self):
+        """Aplica los eventos pendientes del hilo de trabajo: un solo insert de log por pasada."""
+        lineas = []
+        porcentaje = None
+        fin = False
+        resumen = None
+        for _ in range(MAX_EVENTOS_POR_PASADA):
+            try:
+                evento = self.events.get_nowait()
+            except queue.Empty:
+                break
+            tipo = evento[0]
+            if tipo == "log":
+                lineas.append(evento[1])
+            elif tipo == "progreso":
+                porcentaje = evento[1]
+            elif tipo == "aviso":
+                # Antes de abrir la ventana se muestra lo que ya estaba en el log
+                if lineas:
+                    self.log_message("\n".join(lineas))
+                    lineas = []
+                self._show_dialog(*evento[1:])
+            elif tipo == "fin":
+                fin = True
+                resumen = evento[1]
+                break
+
+        if lineas:
+            self.log_message("\n".join(lineas))
+        if porcentaje is not None:
+            self._update_progress(porcentaje)
+
+        if fin:
+            self.worker.join()
+            self.worker = None
+            if resumen and resumen["salida"]:
+                self._update_progress(100)
+            self.cancel_button.config(state=tk.DISABLED)
             self._check_can_process() # Re-habilitar el botón después de procesar
+        else:
+            self.root.after(INTERVALO_COLA_MS, self._drain_events)
+
+    def cancel_processing(self):
+        if self._processing():
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.log_message("Cancelando...")
+
+    def _update_progress(self, porcentaje):
+        self.progressbar['value'] = porcentaje
+        self.progress_label.config(text=f"Progreso: {porcentaje}%")
+
+    def _show_dialog(self, nivel, titulo, mensaje):
+        """Muestra en una ventana los avisos del proceso de extracción."""
+        if nivel == "error":
+            messagebox.showerror(titulo, mensaje)
+        elif nivel == "advertencia":
+            messagebox.showwarning(titulo, mensaje)
+        else:
+            messagebox.showinfo(titulo, mensaje)
+
+    def _find_verses_in_json(self, data, file_path=None):
+        """Busca el campo 'versiculo' en la estructura JSON y acumula los pasajes extraídos."""
+        buscar_versiculos(data, self.all_extracted_verses, self.log_message, file_path)
+
+
+def main(argv=None):
+    """
+    Modo por lotes, sin interfaz gráfica. Los mensajes de avance van a stderr y el
+    resumen se imprime en stdout como JSON. Código de salida: 0 si todo se procesó y
+    guardó, 1 si algún archivo se omitió o la salida no pudo guardarse, 2 si los
+    argumentos no son válidos.
+    """
+    parser = argparse.ArgumentParser(description="Genera excluded_verses.json a partir de archivos de devocionales, sin interfaz gráfica.")
+    parser.add_argument("entradas", nargs="+", help="Archivos o patrones glob de entrada (.json, .json.gz, .json.xz)")
+    parser.add_argument("-o", "--salida", required=True, help="Carpeta de salida")
+    parser.add_argument("--formato", choices=("indentado", "compacto"), default="indentado", help="Formato del JSON de salida")
+    parser.add_argument("--compresion", choices=COMPRESIONES, default=None, help="Comprimir la salida")
+    parser.add_argument("--indice", action="store_true", help=f"Escribir también {NOMBRE_INDICE}, el bitset de versículos usados")
+    parser.add_argument("--metricas", default=None,
+                        help="Guardar tiempos por etapa y contadores en este archivo (.json, o .jsonl para una línea por archivo)")
+    args = parser.parse_args(argv)
+
+    try:
+        file_paths = expandir_entradas(args.entradas)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    metricas = Metricas()
+    with redirect_stdout(sys.stderr):
+        resumen = extraer_versiculos_excluidos(file_paths, args.salida, compression=args.compresion,
+                                               compact=args.formato == "compacto", metricas=metricas,
+                                               indice=args.indice)
+    if args.metricas:
+        metricas.guardar(args.metricas)
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+
+    completo = not resumen["archivos_omitidos"] and resumen["salida"]
+    return 0 if completo else 1
 
-    def _find_verses_in_json(self, data):
-        """
-        Función recursiva para buscar el campo 'versiculo' en la estructura JSON.
-        Solo extrae la referencia del versículo de este campo específico,
-        siempre y cuando se ajuste a un patrón de referencia bíblica.
-        """
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if key == "versiculo" and isinstance(value, str):
-                    # Patrón para capturar solo la referencia del versículo (ej. "Juan 3:16", "1 Corintios 13:4-7", "Salmos 23")
-                    # Este regex es más permisivo con el formato que sigue a la referencia (RVR, comillas, etc.)
-                    # Se enfoca en extraer el inicio de la cadena que coincide con una referencia bíblica.
-                    # Se ha mejorado para manejar acentos y la "ñ" en los nombres de libros.
-                    # Ejemplo: "Hebreos 5:8-9 RVR1960: \"Texto\"" -> "Hebreos 5:8-9"
-                    # Ejemplo: "Juan 3:16: \"Texto\"" -> "Juan 3:16"
-                    # Ejemplo: "Salmos 23" -> "Salmos 23"
-                    specific_verse_reference_pattern = re.compile(
-                        r'^(?:[123]?\s?[A-Za-zñÑáéíóúÁÉÍÓÚüÜ]+\.?\s?\d+(?::\d+(?:-\d+)?)?)'
-                    )
-                    
-                    match = specific_verse_reference_pattern.match(value.strip())
-                    if match:
-                        cleaned_verse = match.group(0).strip() # group(0) es el match completo del patrón
-                        self.all_extracted_verses.append(cleaned_verse)
-                        self.log_message(f"  - Extraído: {cleaned_verse}")
-                    else:
-                        self.log_message(f"  - No se pudo extraer el versículo con el patrón estricto del campo 'versiculo': '{value.strip()}'")
-
-                elif isinstance(value, (dict, list)):
-                    self._find_verses_in_json(value) # Llamada recursiva
-        elif isinstance(data, list):
-            for item in data:
-                self._find_verses_in_json(item) # Llamada recursiva
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    _importar_tk()
     root = tk.Tk()
     app = VerseExtractorApp(root)
     root.mainloop()
-
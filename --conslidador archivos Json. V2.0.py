@@ -1,229 +1,715 @@
+import argparse
+import glob
+import io
 import json
 import os
-import re
-from datetime import datetime
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from itertools import repeat
+from time import perf_counter
+
+from cache_consolidacion import CacheConsolidacion
+from delta_devocionales import escribir_delta, resumir
+from duplicados_similares import UMBRAL_POR_DEFECTO, buscar_casi_duplicados
+from escritura_json import (COMPRESIONES, escribir_indice_fechas, escribir_lista_versiculos, escribir_shards, nombres_versionados,
+                            publicar_versionado, volcar_devocionales, volcar_json)
+from lectura_json import (COMA_FINAL, VALOR_CONCATENADO, abrir_texto, cargar_json_tolerante, expandir_entradas,
+                          iter_devocionales)
+from metricas import Metricas, perfilar
+from referencias_biblicas import Referencia, parse_referencia
+from registro_devocional import Devocional, compactar, decodificar_compacto, huella, huella_texto
+from salidas_devocionales import FORMATOS_TRADUCIDOS, SalidaExcluidos, SalidaTraducidos, alimentar
+
+DESCRIPCION_REPARACIONES = {
+    COMA_FINAL: "Coma final eliminada",
+    VALOR_CONCATENADO: "Objeto concatenado en la raíz combinado con el anterior",
+}
+
+# Carpeta (dentro de la de salida) donde se escriben los shards por idioma y mes.
+CARPETA_SHARDS = "devocionales_shards"
+
+# Por debajo de este volumen total de entrada no vale la pena arrancar procesos.
+MIN_BYTES_PARALELO = 4 * 1024 * 1024
 
 def get_next_versioned_filename(base_name, extension, directory="."):
     """
     Determina el siguiente nombre de archivo versionado incluyendo la fecha y hora de ejecución.
     Formato: base_YYYYMMDD_HHMMSS.ext
     Si ya existe un archivo con el mismo timestamp, añade un sufijo de conteo: base_YYYYMMDD_HHMMSS_1.ext
+    Solo comprueba los nombres candidatos, sin listar la carpeta. Para escribir una salida
+    conviene publicar_versionado, que además reserva el nombre de forma exclusiva.
     """
-    now = datetime.now()
-    timestamp_str = now.strftime("%Y%m%d_%H%M%S")
-    
-    # Nombre base con timestamp
-    current_base_name = f"{base_name}_{timestamp_str}"
-    
-    version = 0
-    # Patrón para encontrar archivos con el mismo timestamp para añadir un sufijo incremental
-    pattern = re.compile(rf"^{re.escape(current_base_name)}(?:_(\d+))?\.{re.escape(extension)}$")
-    
     if not os.path.isdir(directory):
         os.makedirs(directory, exist_ok=True) 
-        
-    found_existing = False
-    for filename in os.listdir(directory):
-        match = pattern.match(filename)
-        if match:
-            found_existing = True
-            if match.group(1): # Si existe un sufijo numérico (ej. _1, _2)
-                current_version = int(match.group(1))
-                if current_version > version:
-                    version = current_version
-            else: # Si existe el archivo base sin sufijo (primera vez que se genera ese timestamp)
-                version = max(version, 0) # Asegura que al menos sea 0 para el primer sufijo (_1)
-    
-    if found_existing:
-        version += 1 # Incrementa la versión si se encontró un archivo existente con el mismo timestamp
-        final_filename = f"{current_base_name}_{version}.{extension}"
-    else:
-        final_filename = f"{current_base_name}.{extension}"
-        
-    return os.path.join(directory, final_filename)
+
+    for ruta in nombres_versionados(base_name, extension, directory):
+        if not os.path.exists(ruta):
+            return ruta
 
 def normalize_verse_reference(verse_str):
     """
-    Normaliza una cadena de referencia de versículo para usarla como clave única.
-    Extrae la referencia bíblica (ej. 'Filipenses 2:3-4 RVR1960') ignorando el texto de la cita.
+    Normaliza una referencia de versículo para usarla como clave única.
+    Devuelve la Referencia (libro, capítulo, versículo inicial, versículo final, versión)
+    del inicio del campo (ej. 'Filipenses 2:3-4 RVR1960: "Nada hagáis..."'), o None si
+    el campo no empieza con una referencia bíblica. A diferencia de comparar cadenas,
+    'Juan 3:16' y 'Juan 3:1' dan claves distintas.
+    """
+    return parse_referencia(verse_str)
+
+def repair_json_string(json_str, metricas=None, archivo=None):
     """
-    if not isinstance(verse_str, str):
+    Intenta reparar un string JSON con problemas de formato comunes.
+    Elimina comas finales en objetos y arrays y combina objetos concatenados en la raíz,
+    todo en una sola pasada, e informa el offset en bytes de cada reparación.
+    Devuelve los datos, o None si el documento tiene otros errores.
+    Si se pasan metricas, cuenta el intento y las reparaciones aplicadas.
+    """
+    if metricas:
+        metricas.contar("reparaciones_intentadas", archivo=archivo)
+    try:
+        data, reparaciones = cargar_json_tolerante(json_str)
+    except json.JSONDecodeError as e:
+        print(f"DEBUG: Error JSON no reparable: {e}")
         return None
+    if metricas:
+        metricas.contar("reparaciones_exitosas", archivo=archivo)
+        metricas.contar("reparaciones_aplicadas", len(reparaciones), archivo=archivo)
 
-    # Patron para buscar el libro, capitulo y versiculo, y opcionalmente la versión.
-    # Se ajusta para capturar hasta los dos puntos y luego el texto del versículo.
-    # La clave está en no capturar el resto del texto después de la referencia.
-    # Modificación aquí: el patrón se hace más específico para capturar solo la referencia.
-    match = re.match(r"([\wáéíóúüñÁÉÍÓÚÜÑ\s]+(?: \d+:\d+(?:-\d+)?)?)\s*(RVR1960|NVI|DHH|LBLA|TLA)?", verse_str, re.IGNORECASE)
-    
-    if match:
-        # Intenta obtener el grupo de la referencia (el primer grupo capturado)
-        # Considera que la referencia puede no incluir un ":" si es solo el libro y capítulo
-        # Por ejemplo, "Génesis 1"
-        raw_reference = match.group(1).strip()
-        
-        # Eliminar cualquier comilla o texto adicional que pueda aparecer después de la referencia directa.
-        # Por ejemplo, si viene 'Filipenses 2:3-4 RVR1960: "Nada hagáis..."'
-        cleaned_reference = raw_reference.split(':', 1)[0].strip() # Tomar solo lo antes del primer ':'
-        
-        # Opcional: Estandarizar la capitalización y eliminar espacios extra.
-        return re.sub(r'\s+', ' ', cleaned_reference).strip().upper()
-    
-    # Si el patrón no coincide, intentar una limpieza más simple o devolver None
-    # Esto puede ocurrir si el formato es muy diferente o si el campo está vacío.
-    # Agregamos una verificación para cadenas muy cortas o sin contenido útil.
-    if len(verse_str.strip()) > 5: # Si la cadena es lo suficientemente larga para ser un versículo.
-        # Intentar extraer algo si no hay un patrón claro, aunque esto puede no ser 100% único.
-        # Por ejemplo, quitar solo el texto entre comillas después del primer ":".
-        parts = verse_str.split(':', 1)
-        if len(parts) > 1:
-            return re.sub(r'["\'`].*$', '', parts[0]).strip().upper()
-        else:
-            return re.sub(r'["\'`].*$', '', verse_str).strip().upper()
-    return None
+    for reparacion in reparaciones:
+        descripcion = DESCRIPCION_REPARACIONES.get(reparacion["tipo"], reparacion["tipo"])
+        print(f"    - {descripcion} (byte {reparacion['offset']})")
+    return data
 
-def repair_json_string(json_str):
+
+def _fusionar_devocionales(devocionales, file_name, all_devotionals, all_verses_data, huellas,
+                           metricas=None, archivo=None, etapa_lectura="lectura_decodificacion", descartados=None):
     """
-    Intenta reparar un string JSON común problemas de formato.
-    Añade corchetes si faltan, elimina comas finales, etc.
+    Incorpora los devocionales (fecha, devocional, texto) de un archivo a los acumuladores,
+    descartando duplicados por fecha y versículo normalizado. Los devocionales se
+    guardan como Devocional (registro compacto con la referencia ya interpretada).
+    Si el iterador falla a mitad del archivo, deshace todo lo que este archivo
+    había agregado antes de propagar el error, para poder reintentar con la reparación.
+    Devuelve la cantidad de devocionales leídos y la lista (fecha, clave única, devocional,
+    huella) de los agregados, en orden.
+
+    Si se pasa el conjunto huellas, antes de normalizar se calcula la huella del contenido
+    con la fecha: una repetición exacta de algo ya leído, en huellas, se descarta con una
+    sola búsqueda, sin interpretar el versículo. Cada huella nueva se agrega a huellas. Si
+    el recorrido trae el texto JSON del devocional (modo incremental) la huella sale de ese
+    texto (huella_texto), sin serializarlo en forma canónica (huella, para documentos ya
+    cargados o reparados); una repetición con otro formato no se reconoce por huella, pero
+    igual se descarta como duplicado por fecha y versículo. Con huellas=None no se calcula
+    ninguna huella (la huella de los agregados queda en None): es lo más rápido salvo
+    que el corpus tenga muchas repeticiones exactas.
+    Con la lista descartados se anotan (huella, contador) de los devocionales nuevos que
+    se descartaron como duplicados o sin referencia, para que la fusión de archivos
+    leídos por separado cuente igual que una lectura en serie (ver _consolidar).
+
+    Con metricas se registra el tiempo esperando al iterador (etapa_lectura: en modo
+    incremental es la lectura y decodificación del archivo), el de normalización y el de
+    deduplicación (huella incluida), además de los duplicados exactos, los duplicados por
+    fecha y versículo y los devocionales sin referencia.
     """
-    # Intentar cargar directamente
+    leidos = 0
+    agregados = []
+    fechas_nuevas = []
+    huellas_nuevas = []
+    descartados_previos = len(descartados) if descartados is not None else 0
+    lectura = normalizacion = deduplicacion = 0.0
+    duplicados = exactos = sin_referencia = 0
+    marca = perf_counter()
     try:
-        return json.loads(json_str)
+        for date_key, devocional, texto in devocionales:
+            inicio = perf_counter()
+            lectura += inicio - marca
+            if date_key not in all_devotionals:
+                all_devotionals[date_key] = []
+                fechas_nuevas.append(date_key)
+
+            leidos += 1
+
+            # Camino rápido: la misma fecha con el mismo contenido ya se leyó
+            contenido = None
+            if huellas is not None:
+                contenido = huella(devocional, date_key) if texto is None else huella_texto(texto, date_key)
+                if contenido in huellas:
+                    exactos += 1
+                    marca = perf_counter()
+                    deduplicacion += marca - inicio
+                    continue
+                huellas.add(contenido)
+                huellas_nuevas.append(contenido)
+            con_huella = perf_counter()
+            deduplicacion += con_huella - inicio
+
+            # Extraer y normalizar el versículo para la unicidad
+            devocional = compactar(devocional)
+            verse_reference = devocional.get("versiculo")
+            normalized_verse = devocional.referencia
+            normalizado = perf_counter()
+            normalizacion += normalizado - con_huella
+
+            if normalized_verse:
+                # Usar una clave que combine la fecha y el versículo normalizado
+                unique_key = (date_key, normalized_verse)
+                if unique_key not in all_verses_data:
+                    all_devotionals[date_key].append(devocional)
+                    all_verses_data[unique_key] = verse_reference # Guardar la versión original del versículo para la lista final
+                    agregados.append((date_key, unique_key, devocional, contenido))
+                else:
+                    duplicados += 1
+                    if descartados is not None and contenido is not None:
+                        descartados.append((contenido, "duplicados"))
+            else:
+                print(f"  ¡ADVERTENCIA! Devocional sin referencia de versículo válida para unicidad en '{file_name}'. Se omitirá: {verse_reference}")
+                sin_referencia += 1
+                if descartados is not None and contenido is not None:
+                    descartados.append((contenido, "sin_referencia"))
+            marca = perf_counter()
+            deduplicacion += marca - normalizado
+        lectura += perf_counter() - marca
     except json.JSONDecodeError:
-        pass # Intentar reparaciones
+        for date_key, unique_key, _, _ in reversed(agregados):
+            all_devotionals[date_key].pop()
+            del all_verses_data[unique_key]
+        for date_key in fechas_nuevas:
+            if not all_devotionals[date_key]:
+                del all_devotionals[date_key]
+        if huellas is not None:
+            huellas.difference_update(huellas_nuevas)
+        if descartados is not None:
+            del descartados[descartados_previos:]
+        raise
+    finally:
+        if metricas:
+            metricas.sumar_tiempo(etapa_lectura, lectura, archivo=archivo)
+            metricas.sumar_tiempo("normalizacion", normalizacion, archivo=archivo)
+            metricas.sumar_tiempo("deduplicacion", deduplicacion, archivo=archivo)
+    if metricas:
+        metricas.contar("duplicados", duplicados, archivo=archivo)
+        metricas.contar("duplicados_exactos", exactos, archivo=archivo)
+        metricas.contar("sin_referencia", sin_referencia, archivo=archivo)
+    return leidos, agregados
 
-    # 1. Eliminar posible coma final en el último elemento de un objeto o array
-    json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
-    
-    # 2. Si el JSON es una secuencia de objetos sin un array contenedor, intentar envolverlo
-    # Esto es una suposición y puede que no sea lo que se necesita en todos los casos
-    # Aquí asumo que el JSON esperado es un objeto o un array de objetos.
-    if not json_str.strip().startswith('[') and not json_str.strip().startswith('{'):
-        json_str = f"[{json_str}]"
-    
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError as e:
-        print(f"DEBUG: Error JSON después de reparación básica: {e}")
-        # Intento de reparación más robusto: añadir un punto de acceso 'data' si no existe
-        if not json_str.strip().startswith('{"data":'):
-            json_str_with_data_wrapper = f'{{"data": {json_str}}}'
-            try:
-                return json.loads(json_str_with_data_wrapper)
-            except json.JSONDecodeError as e_wrapped:
-                print(f"DEBUG: Error JSON después de intentar envolver en 'data': {e_wrapped}")
-        
-        # Último intento: envolver en un array si es un objeto simple
-        if json_str.strip().startswith('{') and not json_str.strip().startswith('['):
-            try:
-                return json.loads(f'[{json_str}]')
-            except json.JSONDecodeError as e_array:
-                print(f"DEBUG: Error JSON después de intentar envolver en array: {e_array}")
 
-        # Si todo falla, devolver None o levantar el error original.
-        return None
+def _devocionales_es(data):
+    """Recorre los devocionales en español de un documento ya cargado (sin su texto original)."""
+    for date_key, devotionals_list in data["data"]["es"].items():
+        for devocional in devotionals_list:
+            yield date_key, devocional, None
+
+
+def _devocionales_es_streaming(file_path, idiomas_vistos, con_texto=False):
+    """Recorre los devocionales en español leyendo el archivo de forma incremental (con su texto JSON si se pide)."""
+    if not con_texto:
+        for idioma, date_key, devocional in iter_devocionales(file_path, idiomas_vistos):
+            if idioma == "es":
+                yield date_key, devocional, None
+        return
+    for idioma, date_key, devocional, texto in iter_devocionales(file_path, idiomas_vistos, con_texto=True):
+        if idioma == "es":
+            yield date_key, devocional, texto
+
+
+def _procesar_archivo(file_path, streaming, all_devotionals, all_verses_data, huellas, metricas, descartados=None):
+    """
+    Lee un archivo (reparándolo si hace falta) y fusiona sus devocionales en los acumuladores.
+    Devuelve (procesado, leídos, agregados) donde procesado indica si el archivo pudo leerse.
+    descartados se pasa a _fusionar_devocionales.
+    Los tiempos de cada etapa y los bytes leídos se registran en metricas bajo file_path.
+    """
+    file_name = os.path.basename(file_path)
+    print(f"--------------------------------------------------")
+    print(f"Procesando '{file_name}'...")
+    metricas.contar("bytes_leidos", os.path.getsize(file_path), archivo=file_path)
+
+    if streaming:
+        idiomas_vistos = set()
+        try:
+            leidos, agregados = _fusionar_devocionales(_devocionales_es_streaming(file_path, idiomas_vistos, huellas is not None),
+                                                       file_name, all_devotionals, all_verses_data, huellas,
+                                                       metricas, file_path, descartados=descartados)
+        except json.JSONDecodeError as e:
+            print(f"  ❌ Error de formato JSON en '{file_name}': {e}. Intentando reparar...")
+        else:
+            if "es" in idiomas_vistos:
+                print(f"  '{file_name}' procesado. Devocionales leídos: {leidos}")
+                return True, leidos, agregados
+            print(f"  ❌ Estructura JSON inesperada en '{file_name}'. Se esperaba 'data' y 'es'. Se omitirá.")
+            return True, 0, []
+
+    with metricas.etapa("lectura", file_path), abrir_texto(file_path) as f:
+        content = f.read()
+
+    reparado = streaming
+    if streaming:
+        # El recorrido incremental ya detectó el error: se repara directamente.
+        with metricas.etapa("reparacion", file_path):
+            data = repair_json_string(content, metricas, file_path)
+    else:
+        try:
+            with metricas.etapa("decodificacion", file_path):
+                data = decodificar_compacto(content)
+        # Si la carga falla, intentar reparar
+        except json.JSONDecodeError as e:
+            print(f"  ❌ Error de formato JSON en '{file_name}': {e}. Intentando reparar...")
+            with metricas.etapa("reparacion", file_path):
+                data = repair_json_string(content, metricas, file_path)
+            reparado = True
+    del content
+
+    if data is None:
+        print(f"  ❌ No se pudo reparar '{file_name}'. Se omitirá.")
+        return False, 0, []
+    if reparado:
+        print(f"  ✔ '{file_name}' reparado exitosamente.")
+
+    # Asumiendo que la estructura principal es {"data": {"es": {"YYYY-MM-DD": [...]}}}
+    if isinstance(data, dict) and "data" in data and "es" in data["data"]:
+        leidos, agregados = _fusionar_devocionales(_devocionales_es(data), file_name, all_devotionals, all_verses_data,
+                                                   huellas, metricas, file_path, "recorrido", descartados)
+        print(f"  '{file_name}' procesado. Devocionales leídos: {leidos}")
+        return True, leidos, agregados
+    print(f"  ❌ Estructura JSON inesperada en '{file_name}'. Se esperaba 'data' y 'es'. Se omitirá.")
+    return True, 0, []
+
+
+def _procesar_archivo_aislado(file_path, streaming, exact_repeats=False):
+    """
+    Versión de _procesar_archivo para los procesos del pool: trabaja con acumuladores
+    propios del archivo y captura sus mensajes para imprimirlos luego en orden.
+    Devuelve (mensajes, procesado, leídos, fechas, entradas, métricas, descartados) donde
+    entradas es la lista (fecha, clave única, versículo original, devocional, huella) de lo
+    que el archivo aporta, métricas son los tiempos y contadores del archivo, para sumarlos
+    en el proceso principal, y descartados la lista (huella, contador) de _fusionar_devocionales.
+    """
+    all_devotionals = {}
+    all_verses_data = {}
+    metricas = Metricas()
+    descartados = []
+    salida = io.StringIO()
+    with redirect_stdout(salida):
+        procesado, leidos, agregados = _procesar_archivo(file_path, streaming, all_devotionals, all_verses_data,
+                                                         set() if exact_repeats else None, metricas, descartados)
+    entradas = [(date_key, unique_key, all_verses_data[unique_key], devocional, contenido)
+                for date_key, unique_key, devocional, contenido in agregados]
+    return salida.getvalue(), procesado, leidos, list(all_devotionals), entradas, metricas.total, descartados
+
+
+def _usar_procesos(file_paths, workers):
+    """Decide si conviene el pool de procesos: en lotes pequeños el arranque cuesta más que lo que se gana."""
+    if workers <= 1 or len(file_paths) < 2:
+        return False
+    total_bytes = 0
+    for file_path in file_paths:
+        try:
+            total_bytes += os.path.getsize(file_path)
+        except OSError:
+            pass
+    return total_bytes >= MIN_BYTES_PARALELO
+
+
+def _casi_duplicados(all_devotionals, umbral):
+    """
+    Busca devocionales cuyo texto (reflexión y oración) es casi igual al de otro anterior
+    en el orden de salida, aunque tengan otra fecha o versículo (ver duplicados_similares).
+    Devuelve las entradas del reporte: fecha, id y versículo de cada casi duplicado y
+    del original que se conserva, con la similitud estimada.
+    """
+    elementos = (((date_key, i), devocional) for date_key in sorted(all_devotionals)
+                 for i, devocional in enumerate(all_devotionals[date_key]))
+
+    def describir(clave):
+        date_key, i = clave
+        devocional = all_devotionals[date_key][i]
+        return {"fecha": date_key, "posicion": i, "id": devocional.get("id"), "versiculo": devocional.get("versiculo")}
+
+    return [dict(describir(clave), similitud=round(similitud, 4), original=describir(original))
+            for clave, original, similitud in buscar_casi_duplicados(elementos, umbral)]
+
+
+def _descartar_casi_duplicados(all_devotionals, all_verses_data, casi_duplicados):
+    """Quita los casi duplicados del consolidado y sus versículos de la lista (las fechas vacías se eliminan)."""
+    por_fecha = {}
+    for entrada in casi_duplicados:
+        por_fecha.setdefault(entrada["fecha"], set()).add(entrada["posicion"])
+    for date_key, posiciones in por_fecha.items():
+        conservados = []
+        for i, devocional in enumerate(all_devotionals[date_key]):
+            if i in posiciones:
+                del all_verses_data[(date_key, devocional.referencia)]
+            else:
+                conservados.append(devocional)
+        if conservados:
+            all_devotionals[date_key] = conservados
+        else:
+            del all_devotionals[date_key]
+
 
+# Contadores de un archivo que dependen solo de su contenido: se guardan en la caché para
+# que una ejecución que la usa informe lo mismo que una que vuelve a leer el archivo.
+CONTADORES_EN_CACHE = ("duplicados", "duplicados_exactos", "sin_referencia")
 
-def consolidate_devotionals(file_paths, output_dir):
+
+def _contribucion_a_json(contribucion, exact_repeats):
+    """
+    Forma serializable de la contribución de un archivo, para guardarla en la caché.
+    exact_repeats indica si se calculó con huellas (ver _fusionar_devocionales).
+    """
+    _, procesado, leidos, fechas, entradas, metricas_archivo, descartados = contribucion
+    return {
+        "procesado": procesado,
+        "leidos": leidos,
+        "contadores": {nombre: metricas_archivo.get("contadores", {}).get(nombre, 0) for nombre in CONTADORES_EN_CACHE},
+        "fechas": fechas,
+        "huellas": exact_repeats,
+        "entradas": [[date_key, list(unique_key[1]), verse_reference, devocional.a_dict(),
+                      contenido.hex() if contenido is not None else None]
+                     for date_key, unique_key, verse_reference, devocional, contenido in entradas],
+        "descartados": [[contenido.hex(), contador] for contenido, contador in descartados],
+    }
+
+
+def _contribucion_desde_json(datos, file_path):
+    """Reconstruye la contribución guardada en la caché (las claves vuelven a ser tuplas)."""
+    file_name = os.path.basename(file_path)
+    mensajes = (f"--------------------------------------------------\n"
+                f"Procesando '{file_name}'...\n"
+                f"  '{file_name}' sin cambios, se usa la caché. Devocionales leídos: {datos['leidos']}\n")
+    entradas = [(date_key, (date_key, Referencia(*referencia)), verse_reference, Devocional.desde_dict(devocional),
+                 bytes.fromhex(contenido) if contenido is not None else None)
+                for date_key, referencia, verse_reference, devocional, contenido in datos["entradas"]]
+    # Los duplicados dentro del archivo se contaron al procesarlo: se conservan en la caché.
+    metricas_archivo = {"contadores": datos["contadores"]}
+    descartados = [(bytes.fromhex(contenido), contador) for contenido, contador in datos["descartados"]]
+    return mensajes, datos["procesado"], datos["leidos"], datos["fechas"], entradas, metricas_archivo, descartados
+
+
+def _contribuciones(file_paths, streaming, workers, cache, metricas, exact_repeats=False):
+    """
+    Produce, en el orden de file_paths, la contribución aislada de cada archivo.
+    Las que están en la caché (calculadas con el mismo exact_repeats) se leen de ahí; el
+    resto se calcula (en paralelo si conviene) y se guarda en la caché para la próxima
+    ejecución.
+    """
+    guardadas = {}
+    pendientes = []
+    for i, file_path in enumerate(file_paths):
+        datos = None
+        if cache:
+            with metricas.etapa("cache", file_path):
+                datos = cache.buscar(file_path)
+        if datos is None or datos.get("huellas") != exact_repeats:
+            pendientes.append(file_path)
+        else:
+            guardadas[i] = datos
+            metricas.contar("archivos_en_cache", archivo=file_path)
+
+    executor = None
+    if _usar_procesos(pendientes, workers):
+        workers = min(workers, len(pendientes))
+        print(f"Leyendo archivos con {workers} procesos en paralelo...")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        calculadas = executor.map(_procesar_archivo_aislado, pendientes, repeat(streaming), repeat(exact_repeats))
+    else:
+        calculadas = map(_procesar_archivo_aislado, pendientes, repeat(streaming), repeat(exact_repeats))
+
+    try:
+        for i, file_path in enumerate(file_paths):
+            if i in guardadas:
+                yield _contribucion_desde_json(guardadas[i], file_path)
+                continue
+            contribucion = next(calculadas)
+            if cache:
+                with metricas.etapa("cache", file_path):
+                    cache.guardar(file_path, _contribucion_a_json(contribucion, exact_repeats))
+            yield contribucion
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def consolidate_devotionals(file_paths, output_dir, streaming=True, workers=None, cache_dir=None,
+                            compression=None, compact=False, sharded=False, metricas=None, date_index=False,
+                            near_duplicates=None, drop_near_duplicates=False, salidas=(), delta=None,
+                            exact_repeats=False):
     """
     Consolida devocionales de múltiples archivos JSON.
+    Con streaming=True cada archivo se recorre de forma incremental y los devocionales
+    pasan de a uno a la deduplicación, sin cargar el documento completo en memoria.
+    Si un archivo no es un JSON válido se vuelve a leer completo para intentar repararlo.
+
+    workers indica cuántos procesos usar para leer y normalizar archivos en paralelo
+    (None = uno por CPU, 1 = en serie). Los resultados se fusionan en el orden de
+    file_paths, así que "el primer archivo gana" y la salida es idéntica a la de una
+    ejecución en serie. Los lotes pequeños siempre se procesan en serie.
+
+    Con cache_dir se guarda allí un manifiesto (tamaño, fecha y hash de cada entrada) y
+    la contribución ya normalizada de cada archivo: en la siguiente ejecución solo se
+    procesan los archivos nuevos o modificados, y si nada cambió no se escribe una
+    nueva salida.
+
+    Las entradas pueden venir comprimidas (.json.gz / .json.xz). compression ('gz' o 'xz')
+    comprime las salidas y compact=True escribe el JSON sin indentación.
+
+    Con sharded=True, en lugar de un único devocionales_consolidados_*.json se escribe un
+    shard por idioma y mes en output_dir/devocionales_shards, con un index.json que lista
+    el rango de fechas, los registros y el hash de cada shard.
+
+    Con date_index=True (solo para la salida sin comprimir ni shards) se escribe junto al
+    JSON consolidado su índice de fechas (.indice): el offset y la longitud de cada fecha,
+    para leer un día con lectura_json.LectorIndexado sin decodificar el documento.
+
+    Con near_duplicates (un umbral de similitud entre 0 y 1) se buscan además devocionales
+    con texto casi igual al de otro, aunque cambie la fecha o el versículo, con firmas
+    MinHash y LSH por bandas (sin comparar todos los pares), y se escribe el reporte
+    casi_duplicados_*.json. Con drop_near_duplicates también se quitan del consolidado.
+
+    salidas es una lista de salidas adicionales (salidas_devocionales.Salida, por ejemplo
+    SalidaExcluidos o SalidaTraducidos) que se arman con los devocionales consolidados en
+    la misma ejecución: la lista de excluidos y las traducidas salen sin volver a leer ni
+    interpretar el JSON consolidado. El resumen informa la ruta de cada una por su clave.
+
+    Con delta (True para usar el consolidado más reciente de output_dir, o la ruta de un
+    consolidado anterior) se escribe junto a la salida nueva un delta (.delta.json) con
+    los devocionales agregados, modificados y eliminados por (idioma, fecha, versión):
+    con delta_devocionales.aplicar_delta, el anterior más el delta reproducen la salida
+    nueva byte a byte. No se combina con sharded.
+
+    Con exact_repeats=True las repeticiones exactas (misma fecha y mismo texto JSON) se
+    descartan por huella antes de normalizarlas y el resumen las cuenta aparte. Calcular
+    la huella cuesta más que normalizar un devocional, así que solo conviene cuando buena
+    parte del corpus son copias exactas (por ejemplo, lotes reexportados); la salida es la
+    misma con y sin huellas.
+
+    Si se pasa un objeto metricas.Metricas, se registran en él los tiempos de reloj y CPU
+    de cada etapa (lectura y decodificación, reparación, normalización, deduplicación,
+    fusión, caché y escritura), los bytes leídos y escritos y los registros, duplicados y
+    reparaciones, por archivo y en total.
     """
+    if delta and sharded:
+        raise ValueError("El delta solo se escribe para la salida sin shards")
+    if date_index and (compression or sharded):
+        raise ValueError("El índice de fechas solo se escribe para la salida sin comprimir ni shards")
+    if near_duplicates is not None and not 0 < near_duplicates <= 1:
+        raise ValueError("El umbral de casi duplicados debe estar entre 0 y 1")
+    if metricas is None:
+        metricas = Metricas()
+    with metricas.etapa("total"):
+        return _consolidar(file_paths, output_dir, streaming, workers, cache_dir, compression, compact, sharded,
+                           metricas, date_index, near_duplicates, drop_near_duplicates, salidas, delta, exact_repeats)
+
+
+def _bytes_salida(ruta, sharded):
+    """Bytes escritos de una salida; en modo shards, los de todos los shards más el índice."""
+    if not sharded:
+        return os.path.getsize(ruta)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        shards = json.load(f)["shards"]
+    return os.path.getsize(ruta) + sum(shard["bytes"] for shard in shards)
+
+
+def _consolidado_anterior(output_dir, compression):
+    """El consolidado más reciente de output_dir (por el nombre con fecha y hora), o None."""
+    extension = ".json" + (f".{compression}" if compression else "")
+    candidatos = [ruta for ruta in glob.glob(os.path.join(glob.escape(output_dir), "devocionales_consolidados_*" + extension))
+                  if not ruta.endswith(".delta" + extension)]
+    return max(candidatos, default=None)
+
+
+def _consolidar(file_paths, output_dir, streaming, workers, cache_dir, compression, compact, sharded, metricas,
+                date_index=False, near_duplicates=None, drop_near_duplicates=False, salidas=(), delta=None,
+                exact_repeats=False):
     total_devotionals_loaded = 0
     total_processed_files = 0
     all_devotionals = {}  # Usaremos un diccionario para almacenar devocionales por fecha y luego el objeto completo.
     all_verses_data = {}  # Para almacenar versículos únicos normalizados para la lista final
+    # Huellas (fecha + contenido) ya leídas, para descartar repeticiones exactas
+    huellas = set() if exact_repeats else None
 
-    for file_path in file_paths:
-        print(f"--------------------------------------------------")
-        print(f"Procesando '{os.path.basename(file_path)}'...")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            data = json.loads(content)
-            
-            # Si la carga falla, intentar reparar
-        except json.JSONDecodeError as e:
-            print(f"  ❌ Error de formato JSON en '{os.path.basename(file_path)}': {e}. Intentando reparar...")
-            data = repair_json_string(content)
-            if data is None:
-                print(f"  ❌ No se pudo reparar '{os.path.basename(file_path)}'. Se omitirá.")
-                continue # Saltar al siguiente archivo si no se pudo reparar
-            else:
-                print(f"  ✔ '{os.path.basename(file_path)}' reparado exitosamente.")
-
-        total_processed_files += 1
-
-        # Asumiendo que la estructura principal es {"data": {"es": {"YYYY-MM-DD": [...]}}}
-        if "data" in data and "es" in data["data"]:
-            for date_key, devotionals_list in data["data"]["es"].items():
-                if date_key not in all_devotionals:
-                    all_devotionals[date_key] = []
-
-                for devocional in devotionals_list:
-                    total_devotionals_loaded += 1
-                    
-                    # Extraer y normalizar el versículo para la unicidad
-                    verse_reference = devocional.get("versiculo")
-                    normalized_verse = normalize_verse_reference(verse_reference)
-
-                    if normalized_verse:
-                        # Usar una clave que combine la fecha y el versículo normalizado
-                        unique_key = f"{date_key}_{normalized_verse}"
-                        if unique_key not in all_verses_data:
-                            all_devotionals[date_key].append(devocional)
-                            all_verses_data[unique_key] = verse_reference # Guardar la versión original del versículo para la lista final
-                        # else:
-                            # print(f"    Advertencia: Devocional duplicado para '{normalized_verse}' en '{date_key}'. Se omitirá.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(file_paths))
+    cache = CacheConsolidacion(cache_dir) if cache_dir else None
+
+    if cache is None and not _usar_procesos(file_paths, workers):
+        for file_path in file_paths:
+            procesado, leidos, _ = _procesar_archivo(file_path, streaming, all_devotionals, all_verses_data, huellas,
+                                                     metricas)
+            total_processed_files += procesado
+            total_devotionals_loaded += leidos
+            metricas.contar("registros_leidos", leidos, archivo=file_path)
+    else:
+        contribuciones = _contribuciones(file_paths, streaming, workers, cache, metricas, exact_repeats)
+        for file_path, (mensajes, procesado, leidos, fechas, entradas, metricas_archivo,
+                        descartados) in zip(file_paths, contribuciones):
+            print(mensajes, end="")
+            total_processed_files += procesado
+            total_devotionals_loaded += leidos
+            metricas.incorporar(file_path, metricas_archivo)
+            metricas.contar("registros_leidos", leidos, archivo=file_path)
+            # Los duplicados dentro del archivo ya se contaron al procesarlo; aquí se
+            # descartan los que ya aportó un archivo anterior (primero por huella). Lo que
+            # el archivo descartó por su cuenta pero ya había leído un archivo anterior es,
+            # como en la lectura en serie, una repetición exacta. Sin huellas no hay
+            # descartados ni contenido que comparar.
+            duplicados = exactos = 0
+            reclasificados = {}
+            with metricas.etapa("fusion", file_path):
+                for contenido, contador in descartados:
+                    if contenido in huellas:
+                        exactos += 1
+                        reclasificados[contador] = reclasificados.get(contador, 0) + 1
                     else:
-                        print(f"  ¡ADVERTENCIA! Devocional sin referencia de versículo válida para unicidad en '{os.path.basename(file_path)}'. Se omitirá: {verse_reference}")
-            
-            print(f"  '{os.path.basename(file_path)}' procesado. Devocionales agregados: {len(devotionals_list)}")
-        else:
-            print(f"  ❌ Estructura JSON inesperada en '{os.path.basename(file_path)}'. Se esperaba 'data' y 'es'. Se omitirá.")
-            
-    # Reorganizar los devocionales consolidados para la salida final
-    final_consolidated_data = {"data": {"es": {}}}
-    total_unique_devotionals = 0
-    for date_key in sorted(all_devotionals.keys()):
-        final_consolidated_data["data"]["es"][date_key] = all_devotionals[date_key]
-        total_unique_devotionals += len(all_devotionals[date_key])
+                        huellas.add(contenido)
+                for date_key in fechas:
+                    if date_key not in all_devotionals:
+                        all_devotionals[date_key] = []
+                for date_key, unique_key, verse_reference, devocional, contenido in entradas:
+                    if contenido is not None:
+                        if contenido in huellas:
+                            exactos += 1
+                            continue
+                        huellas.add(contenido)
+                    if unique_key not in all_verses_data:
+                        all_devotionals[date_key].append(devocional)
+                        all_verses_data[unique_key] = verse_reference
+                    else:
+                        duplicados += 1
+            metricas.contar("duplicados", duplicados, archivo=file_path)
+            metricas.contar("duplicados_exactos", exactos, archivo=file_path)
+            for contador, cantidad in reclasificados.items():
+                metricas.contar(contador, -cantidad, archivo=file_path)
+
+    casi_duplicados = None
+    if near_duplicates is not None:
+        with metricas.etapa("casi_duplicados"):
+            casi_duplicados = _casi_duplicados(all_devotionals, near_duplicates)
+            if drop_near_duplicates:
+                _descartar_casi_duplicados(all_devotionals, all_verses_data, casi_duplicados)
+        metricas.contar("casi_duplicados", len(casi_duplicados))
+        print(f"Casi duplicados encontrados (similitud >= {near_duplicates}): {len(casi_duplicados)}"
+              + (" (descartados)" if drop_near_duplicates else ""))
+
+    # Los devocionales se escriben directamente ordenados por fecha, sin armar otra copia
+    total_unique_devotionals = sum(len(lista) for lista in all_devotionals.values())
 
     total_devotionals_discarded_duplicates = total_devotionals_loaded - total_unique_devotionals
+    if casi_duplicados and drop_near_duplicates:
+        total_devotionals_discarded_duplicates -= len(casi_duplicados)
 
-    # Guardar el JSON consolidado
-    consolidated_json_filename_full_path = None
-    try:
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        consolidated_json_filename_full_path = get_next_versioned_filename("devocionales_consolidados", "json", output_dir)
-        with open(consolidated_json_filename_full_path, 'w', encoding='utf-8') as f:
-            json.dump(final_consolidated_data, f, ensure_ascii=False, indent=4)
-        print(f"✔ Devocionales consolidados guardados en: '{consolidated_json_filename_full_path}'")
-    except Exception as e:
-        print(f"❌ ERROR al guardar el JSON consolidado: {e}")
+    # Con caché: si ninguna entrada cambió y se pide la misma salida, la anterior sigue siendo válida
+    opciones_salida = {
+        "compression": compression,
+        "compact": compact,
+        "sharded": sharded,
+        "date_index": date_index,
+        "drop_near_duplicates": near_duplicates if drop_near_duplicates else None,
+    }
+    salidas_previas = cache.salida_vigente(file_paths, output_dir, opciones_salida) if cache else None
+    if near_duplicates is not None:
+        # El reporte de casi duplicados se escribe siempre (y con descarte, la salida cambia).
+        salidas_previas = None
+    date_index_filename = near_duplicates_filename = None
+    delta_anterior = delta_filename = resumen_delta = None
+    if salidas_previas:
+        consolidated_json_filename_full_path, list_verses_filename = salidas_previas[:2]
+        if date_index:
+            date_index_filename = salidas_previas[2]
+        print(f"✔ Sin cambios en las entradas. Se conserva: '{consolidated_json_filename_full_path}'")
+        print(f"✔ Sin cambios en las entradas. Se conserva: '{list_verses_filename}'")
+    else:
+        # Guardar el JSON consolidado
+        consolidated_json_filename_full_path = None
+        try:
+            fechas_ordenadas = ((date_key, all_devotionals[date_key]) for date_key in sorted(all_devotionals))
+            with metricas.etapa("escritura_json"):
+                if sharded:
+                    consolidated_json_filename_full_path = escribir_shards(
+                        os.path.join(output_dir, CARPETA_SHARDS), [("es", fechas_ordenadas)],
+                        compacto=compact, compresion=compression)
+                else:
+                    desplazamientos = {} if date_index else None
+                    if delta:
+                        delta_anterior = delta if isinstance(delta, str) else _consolidado_anterior(output_dir, compression)
+                    consolidated_json_filename_full_path = publicar_versionado(
+                        "devocionales_consolidados", "json", output_dir,
+                        lambda f: volcar_devocionales(f, [("es", fechas_ordenadas)], compacto=compact,
+                                                      desplazamientos=desplazamientos),
+                        compresion=compression)
+                    if date_index:
+                        date_index_filename = escribir_indice_fechas(consolidated_json_filename_full_path, desplazamientos)
+            metricas.contar("bytes_escritos", _bytes_salida(consolidated_json_filename_full_path, sharded))
+            print(f"✔ Devocionales consolidados guardados en: '{consolidated_json_filename_full_path}'")
+            if date_index_filename:
+                print(f"✔ Índice de fechas guardado en: '{date_index_filename}'")
+        except Exception as e:
+            print(f"❌ ERROR al guardar el JSON consolidado: {e}")
 
-    # Guardar la lista de versículos utilizados
-    list_verses_filename = None
-    try:
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        list_verses_filename = get_next_versioned_filename("lista_versiculos", "txt", output_dir)
-        with open(list_verses_filename, 'w', encoding='utf-8') as f:
-            f.write("==================================================\n")
-            f.write("           LISTA DE VERSÍCULOS UTILIZADOS         \n")
-            f.write("--------------------------------------------------\n")
-            
-            sorted_verses = sorted(all_verses_data.values()) 
-            
-            for i, display_verse in enumerate(sorted_verses):
-                f.write(f"{i+1}. {display_verse}\n")
-        print(f"✔ Lista de versículos utilizada guardada en: '{list_verses_filename}'")
-    except Exception as e:
-        print(f"❌ ERROR al guardar la lista de versículos: {e}")
+        # Guardar el delta contra el consolidado anterior
+        if delta and consolidated_json_filename_full_path:
+            if delta_anterior:
+                try:
+                    with metricas.etapa("escritura_delta"):
+                        delta_filename, datos_delta = escribir_delta(delta_anterior, consolidated_json_filename_full_path)
+                    resumen_delta = resumir(datos_delta)
+                    metricas.contar("bytes_escritos", os.path.getsize(delta_filename))
+                    print(f"✔ Delta contra '{delta_anterior}' guardado en: '{delta_filename}' "
+                          f"({resumen_delta['agregados']} agregados, {resumen_delta['modificados']} modificados, "
+                          f"{resumen_delta['eliminados']} eliminados)")
+                except Exception as e:
+                    print(f"❌ ERROR al guardar el delta: {e}")
+            else:
+                print("No hay un consolidado anterior en la carpeta de salida: no se escribe delta.")
+
+        # Guardar la lista de versículos utilizados
+        list_verses_filename = None
+        try:
+            with metricas.etapa("escritura_lista"):
+                list_verses_filename = publicar_versionado("lista_versiculos", "txt", output_dir,
+                                                           lambda f: escribir_lista_versiculos(f, all_verses_data.values()),
+                                                           compresion=compression)
+            metricas.contar("bytes_escritos", os.path.getsize(list_verses_filename))
+            print(f"✔ Lista de versículos utilizada guardada en: '{list_verses_filename}'")
+        except Exception as e:
+            print(f"❌ ERROR al guardar la lista de versículos: {e}")
+
+        # Guardar el reporte de casi duplicados
+        if casi_duplicados is not None:
+            reporte = {"umbral": near_duplicates, "descartados": drop_near_duplicates, "casi_duplicados": casi_duplicados}
+            try:
+                near_duplicates_filename = publicar_versionado("casi_duplicados", "json", output_dir,
+                                                               lambda f: volcar_json(reporte, f, compacto=compact),
+                                                               compresion=compression)
+                print(f"✔ Reporte de casi duplicados guardado en: '{near_duplicates_filename}'")
+            except Exception as e:
+                print(f"❌ ERROR al guardar el reporte de casi duplicados: {e}")
+
+        if cache:
+            rutas_cache = [consolidated_json_filename_full_path, list_verses_filename]
+            if date_index:
+                rutas_cache.append(date_index_filename)
+            cache.registrar_ejecucion(file_paths, output_dir, rutas_cache, opciones_salida)
+
+    # Salidas adicionales: se arman en una sola pasada sobre lo consolidado (se escriben
+    # aunque las entradas no hayan cambiado, no forman parte de la caché)
+    salidas_adicionales = {}
+    if salidas:
+        with metricas.etapa("salidas_adicionales"):
+            alimentar(salidas, ((date_key, all_devotionals[date_key]) for date_key in sorted(all_devotionals)))
+        for salida in salidas:
+            salidas_adicionales[salida.clave] = None
+            try:
+                with metricas.etapa(f"escritura_{salida.clave}"):
+                    os.makedirs(output_dir, exist_ok=True)
+                    salidas_adicionales[salida.clave] = salida.escribir(output_dir, compression, compact)
+                metricas.contar("bytes_escritos", os.path.getsize(salidas_adicionales[salida.clave]))
+                print(f"✔ Salida '{salida.clave}' guardada en: '{salidas_adicionales[salida.clave]}'")
+            except Exception as e:
+                print(f"❌ ERROR al guardar la salida '{salida.clave}': {e}")
+    if cache and cache.cambios:
+        cache.guardar_manifiesto()
 
     # --- Resumen Final ---
     print("\n" + "=" * 50)
@@ -234,26 +720,53 @@ def consolidate_devotionals(file_paths, output_dir):
     print(f"Total de devocionales leídos de archivos: {total_devotionals_loaded}")
     print(f"Devocionales únicos consolidados: {total_unique_devotionals}")
     print(f"Devocionales descartados por duplicado (mismo versículo normalizado): {total_devotionals_discarded_duplicates}")
+    print(f"  de ellos, repeticiones exactas (misma fecha y contenido): {metricas.como_dict()['contadores'].get('duplicados_exactos', 0)}")
     print(f"Versículos únicos extraídos para la lista: {len(all_verses_data)}") 
+    if casi_duplicados is not None:
+        print(f"Casi duplicados (texto similar, umbral {near_duplicates}): {len(casi_duplicados)}"
+              + (" descartados" if drop_near_duplicates else ""))
+    print("-" * 50)
+    for etapa, tiempos in metricas.como_dict()["etapas"].items():
+        cpu = f" (CPU {tiempos['cpu_segundos']:.3f} s)" if tiempos['cpu_segundos'] else ""
+        print(f"  {etapa:<24} {tiempos['segundos']:>9.3f} s{cpu}")
     print("=" * 50)
     print("Proceso completado.")
-    messagebox.showinfo("Proceso Completado", "El proceso de fusión de devocionales ha finalizado.\n"
-                                           f"Devocionales consolidados: {consolidated_json_filename_full_path}\n"
-                                           f"Lista de versículos: {list_verses_filename}\n"
-                                           f"Total de devocionales únicos: {total_unique_devotionals}")
+
+    return {
+        "archivos_seleccionados": len(file_paths),
+        "archivos_procesados": total_processed_files,
+        "devocionales_leidos": total_devotionals_loaded,
+        "devocionales_unicos": total_unique_devotionals,
+        "duplicados_descartados": total_devotionals_discarded_duplicates,
+        "duplicados_exactos": metricas.como_dict()["contadores"].get("duplicados_exactos", 0),
+        "versiculos_unicos": len(all_verses_data),
+        "salida_json": consolidated_json_filename_full_path,
+        "salida_lista": list_verses_filename,
+        "salida_indice_fechas": date_index_filename,
+        "casi_duplicados": None if casi_duplicados is None else len(casi_duplicados),
+        "salida_casi_duplicados": near_duplicates_filename,
+        "salidas_adicionales": salidas_adicionales,
+        "delta_anterior": delta_anterior,
+        "salida_delta": delta_filename,
+        "delta": resumen_delta,
+        "sin_cambios": bool(salidas_previas),
+    }
 
 
 def select_files_and_merge():
     """
     Función para la interfaz gráfica que permite seleccionar archivos y ejecutar la consolidación.
     """
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
     root = tk.Tk()
     root.withdraw() # Oculta la ventana principal de Tkinter
 
     messagebox.showinfo("Seleccionar Archivos", "Por favor, selecciona los archivos JSON de devocionales a consolidar.")
     file_paths = filedialog.askopenfilenames(
         title="Seleccionar Archivos JSON de Devocionales",
-        filetypes=[("Archivos JSON", "*.json")]
+        filetypes=[("Archivos JSON", "*.json *.json.gz *.json.xz")]
     )
 
     if not file_paths:
@@ -274,11 +787,107 @@ def select_files_and_merge():
     print(f"Archivos JSON seleccionados para procesar: {', '.join([os.path.basename(p) for p in file_paths])}")
     print(f"Los archivos de salida se guardarán en: '{output_directory}'")
     
-    consolidate_devotionals(file_paths, output_directory)
+    resumen = consolidate_devotionals(file_paths, output_directory)
+    messagebox.showinfo("Proceso Completado", "El proceso de fusión de devocionales ha finalizado.\n"
+                                           f"Devocionales consolidados: {resumen['salida_json']}\n"
+                                           f"Lista de versículos: {resumen['salida_lista']}\n"
+                                           f"Total de devocionales únicos: {resumen['devocionales_unicos']}")
+
+
+def main(argv=None):
+    """
+    Modo por lotes, sin interfaz gráfica. Los mensajes de avance van a stderr y el
+    resumen se imprime en stdout como JSON. Código de salida: 0 si todo se procesó y
+    guardó, 1 si algún archivo se omitió o una salida no pudo guardarse, 2 si los
+    argumentos no son válidos.
+    """
+    parser = argparse.ArgumentParser(description="Consolida archivos JSON de devocionales sin interfaz gráfica.")
+    parser.add_argument("entradas", nargs="+", help="Archivos o patrones glob de entrada (.json, .json.gz, .json.xz)")
+    parser.add_argument("-o", "--salida", required=True, help="Carpeta de salida")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para leer en paralelo (por defecto, uno por CPU; 1 = en serie)")
+    parser.add_argument("--formato", choices=("indentado", "compacto"), default="indentado", help="Formato del JSON de salida")
+    parser.add_argument("--compresion", choices=COMPRESIONES, default=None, help="Comprimir las salidas")
+    parser.add_argument("--shards", action="store_true", help="Escribir un shard por idioma y mes con index.json")
+    parser.add_argument("--cache", default=None, help="Carpeta de caché para re-consolidar solo lo que cambió")
+    parser.add_argument("--indice-fechas", action="store_true",
+                        help="Escribir junto al JSON consolidado su índice de fechas (.indice) para leer un día sin decodificar todo")
+    parser.add_argument("--casi-duplicados", type=float, nargs="?", const=UMBRAL_POR_DEFECTO, default=None, metavar="UMBRAL",
+                        help="Buscar devocionales con texto casi igual (MinHash/LSH) y escribir casi_duplicados_*.json; "
+                             f"UMBRAL es la similitud mínima entre 0 y 1 (por defecto {UMBRAL_POR_DEFECTO})")
+    parser.add_argument("--descartar-casi-duplicados", action="store_true",
+                        help="Quitar del consolidado los casi duplicados (requiere --casi-duplicados)")
+    parser.add_argument("--excluidos", action="store_true",
+                        help="Escribir también excluded_verses.json con los versículos consolidados (sin volver a leer la salida)")
+    parser.add_argument("--indice-excluidos", action="store_true",
+                        help="Escribir también excluded_verses.idx, el bitset de versículos usados (requiere --excluidos)")
+    parser.add_argument("--traducidos", choices=FORMATOS_TRADUCIDOS, nargs="?", const="json", default=None,
+                        help="Escribir también las listas de versículos traducidas a otros idiomas: "
+                             "versiculos_traducidos.json o, con 'codigo', versiculos_traducidos.txt listo para copiar")
+    parser.add_argument("--delta", nargs="?", const=True, default=None, metavar="ANTERIOR",
+                        help="Escribir también el delta (.delta.json) contra el consolidado ANTERIOR "
+                             "(por defecto, el más reciente de la carpeta de salida)")
+    parser.add_argument("--repeticiones-exactas", action="store_true",
+                        help="Descartar por huella las repeticiones exactas antes de normalizarlas "
+                             "(conviene cuando buena parte del corpus son copias exactas)")
+    parser.add_argument("--sin-streaming", action="store_true", help="Cargar cada archivo completo en lugar de recorrerlo de forma incremental")
+    parser.add_argument("--metricas", default=None,
+                        help="Guardar tiempos por etapa y contadores en este archivo (.json, o .jsonl para una línea por archivo)")
+    parser.add_argument("--perfil", default=None,
+                        help="Perfilar la ejecución con cProfile y tracemalloc: escribe PERFIL.prof, PERFIL.prof.txt y "
+                             "PERFIL.memoria.txt (solo el proceso principal; conviene --workers 1)")
+    args = parser.parse_args(argv)
+    if args.indice_fechas and (args.compresion or args.shards):
+        parser.error("--indice-fechas no se puede combinar con --compresion ni --shards")
+    if args.casi_duplicados is not None and not 0 < args.casi_duplicados <= 1:
+        parser.error("--casi-duplicados debe estar entre 0 y 1")
+    if args.descartar_casi_duplicados and args.casi_duplicados is None:
+        parser.error("--descartar-casi-duplicados requiere --casi-duplicados")
+    if args.delta and args.shards:
+        parser.error("--delta no se puede combinar con --shards")
+    if isinstance(args.delta, str) and not os.path.isfile(args.delta):
+        parser.error(f"No existe el consolidado anterior '{args.delta}'")
+    if args.indice_excluidos and not args.excluidos:
+        parser.error("--indice-excluidos requiere --excluidos")
+
+    try:
+        file_paths = expandir_entradas(args.entradas)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    salidas = []
+    if args.excluidos:
+        salidas.append(SalidaExcluidos(indice=args.indice_excluidos))
+    if args.traducidos:
+        salidas.append(SalidaTraducidos(formato=args.traducidos))
+
+    metricas = Metricas()
+    with redirect_stdout(sys.stderr), (perfilar(args.perfil) if args.perfil else nullcontext()):
+        resumen = consolidate_devotionals(file_paths, args.salida, streaming=not args.sin_streaming,
+                                          workers=args.workers, cache_dir=args.cache,
+                                          compression=args.compresion, compact=args.formato == "compacto",
+                                          sharded=args.shards, metricas=metricas, date_index=args.indice_fechas,
+                                          near_duplicates=args.casi_duplicados,
+                                          drop_near_duplicates=args.descartar_casi_duplicados, salidas=salidas,
+                                          delta=args.delta, exact_repeats=args.repeticiones_exactas)
+    if args.metricas:
+        metricas.guardar(args.metricas)
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+
+    completo = (resumen["archivos_procesados"] == resumen["archivos_seleccionados"]
+                and resumen["salida_json"] and resumen["salida_lista"]
+                and (resumen["salida_indice_fechas"] or not args.indice_fechas)
+                and (resumen["salida_casi_duplicados"] or args.casi_duplicados is None)
+                and all(resumen["salidas_adicionales"].values())
+                and (resumen["salida_delta"] or not resumen["delta_anterior"]))
+    return 0 if completo else 1
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     try:
         select_files_and_merge()
     except Exception as e:
+        from tkinter import messagebox
         messagebox.showerror("Error Crítico", f"Ha ocurrido un error inesperado: {e}\nPor favor, revisa la consola para más detalles.")
         print(f"ERROR CRÍTICO INESPERADO: {e}")
\ No newline at end of file
@@ -1,8 +1,144 @@
+import argparse
+import io
 import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime
-import re # Importar la librería de expresiones regulares
 
-def adjust_json_for_multi_version(input_filepath, output_filepath):
+from catalogo_libros import IDIOMAS, idiomas_del_libro
+from escritura_json import (COMPRESIONES, abrir_salida, compresion_por_extension, escribir_indice_fechas, escribir_shards,
+                            volcar_devocionales)
+from lectura_json import abrir_texto, expandir_entradas, iter_elementos
+from orden_externo import agrupar_por_clave, ordenar_en_disco
+from referencias_biblicas import parse_referencia
+from registro_devocional import Devocional, cargar_compacto, compactar
+
+# Idioma que se usa cuando una exportación no está etiquetada y no se puede detectar.
+IDIOMA_POR_DEFECTO = 'es'
+
+# En modo lote, por debajo de este total de bytes no vale la pena arrancar procesos.
+MIN_BYTES_PARALELO = 4 * 1024 * 1024
+
+# Rutas que usa la línea de comandos sin argumentos.
+ENTRADA_POR_DEFECTO = 'devocionales_consolidados_20250602_104839.json'
+SALIDA_POR_DEFECTO = 'devocionales_multi_version_structure_rvr1960.json'
+
+# Entrada etiquetada con su idioma en la línea de comandos, ej. "en:exports/en_2025.json".
+_PATRON_ETIQUETA = re.compile(r"^([a-z]{2,3}):(.+)$")
+
+def _completar_version(devocional):
+    """Añade el campo 'version' si no existe o está vacío."""
+    if 'version' not in devocional or not devocional['version']:
+        # Intenta extraer la versión de la referencia si existe (ej. "Juan 3:16 (RVR1960)").
+        # Un Devocional ya trae la referencia interpretada al cargarlo (patrón compilado y memorizado).
+        if type(devocional) is Devocional:
+            referencia = devocional.referencia
+        else:
+            referencia = parse_referencia(devocional.get('versiculo', ''))
+        if referencia and referencia.version:
+            # Usar la versión indicada junto a la referencia
+            devocional['version'] = referencia.version
+        else:
+            # Asignar 'RVR1960' como valor por defecto si no se puede extraer
+            devocional['version'] = 'RVR1960' # Asignación por defecto correcta
+
+
+def _con_fecha(devocionales, resumen):
+    """
+    Produce (fecha, devocional) para cada devocional con fecha, ya con su versión.
+    Cuenta en resumen los devocionales agrupados y los omitidos.
+    """
+    for devocional in devocionales:
+        devocional = compactar(devocional)
+        # Asegurarse de que el devocional tenga una fecha válida
+        date_str = devocional.get('date')
+        if not date_str:
+            print(f"Advertencia: Devocional con ID '{devocional.get('id', 'N/A')}' no tiene campo 'date'. Se omite.")
+            resumen["devocionales_omitidos"] += 1
+            continue
+        _completar_version(devocional)
+        resumen["devocionales"] += 1
+        yield date_str, devocional
+
+
+def _contar_fechas(fechas, resumen):
+    for fecha, lista in fechas:
+        resumen["fechas"] += 1
+        yield fecha, lista
+
+
+def _indexar_por_version(fechas, resumen):
+    """
+    Convierte (fecha, lista) en (fecha, {versión: devocional}) para la salida por versión.
+    Si una fecha repite una versión se conserva el primero, se avisa y se cuenta en
+    resumen["duplicados_version"].
+    """
+    for fecha, lista in fechas:
+        por_version = {}
+        for devocional in lista:
+            version = devocional['version']
+            if version in por_version:
+                print(f"Advertencia: la fecha '{fecha}' ya tiene un devocional en la versión '{version}' "
+                      f"(ID '{por_version[version].get('id', 'N/A')}'). Se omite el ID '{devocional.get('id', 'N/A')}'.")
+                resumen["duplicados_version"] += 1
+                continue
+            por_version[version] = devocional
+        yield fecha, por_version
+
+
+def _validar_indice_fechas(output_filepath, sharded):
+    if sharded or compresion_por_extension(output_filepath):
+        raise ValueError("El índice de fechas solo se escribe para una salida sin comprimir ni shards")
+
+
+def _volcar_salida(output_filepath, idiomas, compact, date_index, resumen):
+    """Escribe la salida única y, con date_index, su índice de fechas (.indice) al lado."""
+    desplazamientos = {} if date_index else None
+    with abrir_salida(output_filepath) as f:
+        volcar_devocionales(f, idiomas, compacto=compact, desplazamientos=desplazamientos)
+    if date_index:
+        resumen["indice_fechas"] = escribir_indice_fechas(output_filepath, desplazamientos)
+        print(f"Índice de fechas guardado en: {resumen['indice_fechas']}")
+
+
+def _ajustar_en_disco(input_filepath, output_filepath, compact, sharded, compression, memory_limit, temp_dir,
+                      date_index=False, by_version=False):
+    """
+    Modo de memoria acotada: lee la lista de entrada de a un devocional, vuelca tramos
+    ordenados por fecha a archivos temporales y escribe la salida a medida que los
+    mezcla. En memoria solo quedan un tramo de hasta memory_limit bytes y la lista de
+    una fecha. Las fechas salen en orden y, dentro de cada fecha, en el orden de entrada.
+    """
+    resumen = {"entrada": input_filepath, "devocionales": 0, "devocionales_omitidos": 0, "fechas": 0,
+               "duplicados_version": 0, "salida": None, "indice_fechas": None}
+    if temp_dir is None:
+        temp_dir = output_filepath if sharded else os.path.dirname(os.path.abspath(output_filepath))
+    os.makedirs(temp_dir, exist_ok=True)
+
+    pares = _con_fecha(iter_elementos(input_filepath), resumen)
+    with ordenar_en_disco(pares, memory_limit, temp_dir) as ordenados:
+        fechas = _contar_fechas(agrupar_por_clave(ordenados), resumen)
+        if by_version:
+            fechas = _indexar_por_version(fechas, resumen)
+        if sharded:
+            ruta_indice = escribir_shards(output_filepath, [('es', fechas)], compacto=compact, compresion=compression)
+            print(f"Shards por mes escritos en '{output_filepath}' (índice: {ruta_indice})")
+            resumen["salida"] = ruta_indice
+            return resumen
+        _volcar_salida(output_filepath, [('es', fechas)], compact, date_index, resumen)
+
+    print(f"Archivo ajustado para múltiples versiones (con 'RVR1960' como default) guardado exitosamente en: {output_filepath}")
+    print(f"Ordenado en disco: {resumen['devocionales']} devocionales en {resumen['fechas']} fechas.")
+    resumen["salida"] = output_filepath
+    return resumen
+
+
+def adjust_json_for_multi_version(input_filepath, output_filepath, compact=False, sharded=False, compression=None,
+                                  memory_limit=None, temp_dir=None, date_index=False, by_version=False):
     """
     Ajusta la estructura de un archivo JSON para soportar múltiples versiones
     de devocionales por fecha. La estructura de salida será:
@@ -12,50 +148,89 @@ def adjust_json_for_multi_version(input_filepath, output_filepath):
     Args:
         input_filepath (str): La ruta del archivo JSON de entrada (tu archivo actual).
         output_filepath (str): La ruta donde se guardará el nuevo archivo JSON ajustado.
+            Si termina en .gz o .xz se escribe comprimido.
+        compact (bool): Escribe el JSON sin indentación.
+        sharded (bool): Si es True, output_filepath es una carpeta donde se escribe un
+            shard por idioma y mes más un index.json (ver escritura_json.escribir_shards).
+        compression (str): 'gz' o 'xz' para comprimir los shards.
+        memory_limit (int): Si se indica, usa el modo de memoria acotada: la entrada se
+            lee de forma incremental y se ordena por fecha en disco en tramos de hasta
+            memory_limit bytes, para convertir exportaciones que no entran en memoria.
+            Las fechas de la salida quedan en orden cronológico.
+        temp_dir (str): Carpeta para los tramos temporales del modo de memoria acotada
+            (por defecto, la de la salida).
+        date_index (bool): Escribe junto a la salida (sin comprimir ni shards) su índice
+            de fechas (.indice) para leer un día con lectura_json.LectorIndexado.
+        by_version (bool): Cada fecha se escribe como un objeto {versión: devocional}
+            en lugar de una lista, así que buscar una versión es un acceso directo
+            (ver lectura_json.cargar_por_version). Si una fecha repite una versión se
+            conserva el primero y se cuenta en "duplicados_version".
+
+    El archivo de entrada también puede estar comprimido (.json.gz / .json.xz).
+
+    Returns:
+        dict: Resumen con los devocionales agrupados y omitidos, las fechas y la ruta
+        escrita (el index.json en modo shards), o None si ocurrió un error.
     """
     try:
-        with open(input_filepath, 'r', encoding='utf-8') as f:
-            original_devocionales_list = json.load(f)
+        if date_index:
+            _validar_indice_fechas(output_filepath, sharded)
+        if memory_limit:
+            return _ajustar_en_disco(input_filepath, output_filepath, compact, sharded, compression,
+                                     memory_limit, temp_dir, date_index, by_version)
+
+        with abrir_texto(input_filepath) as f:
+            original_devocionales_list = cargar_compacto(f)
 
         # Crear un diccionario para agrupar devocionales por fecha
         devocionales_por_fecha = {}
+        omitidos = 0
 
         for devocional in original_devocionales_list:
+            devocional = compactar(devocional)
             # Asegurarse de que el devocional tenga una fecha válida
             date_str = devocional.get('date')
             if not date_str:
                 print(f"Advertencia: Devocional con ID '{devocional.get('id', 'N/A')}' no tiene campo 'date'. Se omite.")
+                omitidos += 1
                 continue
 
             # Añadir el campo 'version' si no existe o asegurar que sea el correcto
-            if 'version' not in devocional or not devocional['version']:
-                versiculo = devocional.get('versiculo', '')
-                # Intenta extraer la versión del paréntesis si existe (ej. "(RVR1960)")
-                match = re.search(r'\((.*?)\)', versiculo)
-                if match:
-                    # Usar el texto dentro del paréntesis como la versión
-                    devocional['version'] = match.group(1).strip()
-                else:
-                    # Asignar 'RVR1960' como valor por defecto si no se puede extraer
-                    devocional['version'] = 'RVR1960' # Asignación por defecto correcta
+            _completar_version(devocional)
 
             if date_str not in devocionales_por_fecha:
                 devocionales_por_fecha[date_str] = []
             
             devocionales_por_fecha[date_str].append(devocional)
 
-        # Crear la nueva estructura anidada
-        adjusted_data = {
-            'data': {
-                'es': devocionales_por_fecha
-            }
+        resumen = {
+            "entrada": input_filepath,
+            "devocionales": sum(len(lista) for lista in devocionales_por_fecha.values()),
+            "devocionales_omitidos": omitidos,
+            "fechas": len(devocionales_por_fecha),
+            "duplicados_version": 0,
+            "salida": None,
+            "indice_fechas": None,
         }
+        fechas = devocionales_por_fecha.items()
+        if by_version:
+            fechas = _indexar_por_version(fechas, resumen)
 
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            json.dump(adjusted_data, f, indent=4, ensure_ascii=False)
+        if sharded:
+            fechas_ordenadas = sorted(fechas)
+            ruta_indice = escribir_shards(output_filepath, [('es', fechas_ordenadas)],
+                                          compacto=compact, compresion=compression)
+            print(f"Shards por mes escritos en '{output_filepath}' (índice: {ruta_indice})")
+            resumen["salida"] = ruta_indice
+            return resumen
+
+        # Crear la nueva estructura anidada {'data': {'es': devocionales_por_fecha}}
+        _volcar_salida(output_filepath, [('es', fechas)], compact, date_index, resumen)
 
         print(f"Archivo ajustado para múltiples versiones (con 'RVR1960' como default) guardado exitosamente en: {output_filepath}")
         print("Este archivo está listo para ser consumido por un DevocionalProvider flexible.")
+        resumen["salida"] = output_filepath
+        return resumen
 
     except FileNotFoundError:
         print(f"Error: El archivo de entrada no se encontró en '{input_filepath}'.")
@@ -63,10 +238,243 @@ def adjust_json_for_multi_version(input_filepath, output_filepath):
         print(f"Error: No se pudo decodificar el JSON del archivo '{input_filepath}'.")
     except Exception as e:
         print(f"Ocurrió un error inesperado: {e}")
+    return None
 
-if __name__ == "__main__":
-    # Define las rutas de tus archivos
-    input_file = 'devocionales_consolidados_20250602_104839.json' # Tu archivo original
-    output_file = 'devocionales_multi_version_structure_rvr1960.json' # Nuevo nombre para el archivo ajustado
+def _detectar_idioma(devocionales):
+    """
+    Idioma de una exportación sin etiqueta: el campo 'language' (o 'idioma') más
+    frecuente entre sus devocionales; si no lo tienen, el idioma del catálogo en el que
+    se reconocen más nombres de libro de sus versículos. None si no hay indicios.
+    """
+    campos = Counter()
+    libros = Counter()
+    for devocional in devocionales:
+        if not isinstance(devocional, (dict, Devocional)):
+            continue
+        idioma = devocional.get('language') or devocional.get('idioma')
+        if isinstance(idioma, str) and idioma:
+            campos[idioma] += 1
+        elif not campos and isinstance(devocional.get('versiculo'), str):
+            libros.update(idiomas_del_libro(devocional['versiculo'].lstrip(' "\'“«')))
+    if campos:
+        return campos.most_common(1)[0][0]
+    if libros:
+        # A igual cantidad de votos gana el primero del catálogo.
+        return min(libros, key=lambda idioma: (-libros[idioma], IDIOMAS.index(idioma)))
+    return None
+
+
+def _convertir_entrada(input_filepath, idioma=None):
+    """
+    Lee una exportación plana y agrupa sus devocionales por fecha. En modo lote corre
+    en un proceso del pool, así que los mensajes se devuelven en vez de imprimirse.
+    Devuelve (mensajes, devocionales_por_fecha, resumen); si el archivo no se pudo
+    leer, resumen['error'] indica el motivo.
+    """
+    resumen = {"entrada": input_filepath, "idioma": idioma, "idioma_detectado": False,
+               "devocionales": 0, "devocionales_omitidos": 0, "fechas": 0, "error": None}
+    devocionales_por_fecha = {}
+    salida = io.StringIO()
+    with redirect_stdout(salida):
+        try:
+            with abrir_texto(input_filepath) as f:
+                original_devocionales_list = cargar_compacto(f)
+            if not isinstance(original_devocionales_list, list):
+                raise ValueError("se esperaba una lista de devocionales")
+            if idioma is None:
+                idioma = _detectar_idioma(original_devocionales_list)
+                if idioma is None:
+                    idioma = IDIOMA_POR_DEFECTO
+                    print(f"Advertencia: no se pudo detectar el idioma de '{input_filepath}'. Se usa '{idioma}'.")
+                else:
+                    print(f"Idioma detectado en '{input_filepath}': {idioma}")
+                resumen["idioma"] = idioma
+                resumen["idioma_detectado"] = True
+            for date_str, devocional in _con_fecha(original_devocionales_list, resumen):
+                devocionales_por_fecha.setdefault(date_str, []).append(devocional)
+            resumen["fechas"] = len(devocionales_por_fecha)
+        except FileNotFoundError:
+            resumen["error"] = "no encontrado"
+            print(f"Error: El archivo de entrada no se encontró en '{input_filepath}'.")
+        except json.JSONDecodeError:
+            resumen["error"] = "JSON inválido"
+            print(f"Error: No se pudo decodificar el JSON del archivo '{input_filepath}'.")
+        except Exception as e:
+            resumen["error"] = str(e)
+            print(f"Ocurrió un error inesperado con '{input_filepath}': {e}")
+    return salida.getvalue(), devocionales_por_fecha, resumen
+
+
+def _usar_procesos(input_filepaths, workers):
+    """Como en el consolidador: en lotes pequeños el arranque del pool cuesta más que lo que se gana."""
+    if workers <= 1 or len(input_filepaths) < 2:
+        return False
+    total_bytes = 0
+    for file_path in input_filepaths:
+        try:
+            total_bytes += os.path.getsize(file_path)
+        except OSError:
+            pass
+    return total_bytes >= MIN_BYTES_PARALELO
+
+
+def adjust_json_batch(inputs, output_filepath, compact=False, sharded=False, compression=None, workers=None,
+                      date_index=False, by_version=False):
+    """
+    Convierte varias exportaciones planas, en uno o más idiomas, en un único archivo
+    {'data': {idioma: {'YYYY-MM-DD': [...]}}} (o en shards por idioma y mes con
+    sharded=True), leyendo cada entrada una vez y escribiendo la salida una sola vez.
+
+    Args:
+        inputs: Rutas o pares (ruta, idioma). Si el idioma es None se detecta (ver
+            _detectar_idioma). Las entradas de un mismo idioma se combinan por fecha
+            en el orden indicado.
+        output_filepath (str): Archivo de salida (.json, .json.gz o .json.xz) o, con
+            sharded, la carpeta de los shards.
+        compact, sharded, compression, date_index, by_version: Como en
+            adjust_json_for_multi_version (los duplicados por versión se cuentan por idioma).
+        workers (int): Procesos para leer las entradas en paralelo (por defecto, uno
+            por CPU; 1 = en serie).
+
+    Returns:
+        dict: Resumen por entrada y por idioma y la ruta escrita (None si no se pudo
+        escribir o ninguna entrada se leyó).
+    """
+    if date_index:
+        _validar_indice_fechas(output_filepath, sharded)
+    entradas = [(entrada, None) if isinstance(entrada, str) else tuple(entrada) for entrada in inputs]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    rutas = [ruta for ruta, _ in entradas]
+
+    executor = None
+    if _usar_procesos(rutas, workers):
+        workers = min(workers, len(entradas))
+        print(f"Convirtiendo {len(entradas)} archivos con {workers} procesos en paralelo...")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        resultados = executor.map(_convertir_entrada, rutas, [idioma for _, idioma in entradas])
+    else:
+        resultados = map(_convertir_entrada, rutas, [idioma for _, idioma in entradas])
 
-    adjust_json_for_multi_version(input_file, output_file)
+    por_idioma = {}
+    resumenes = []
+    try:
+        for mensajes, devocionales_por_fecha, resumen_entrada in resultados:
+            print(mensajes, end="")
+            resumenes.append(resumen_entrada)
+            if resumen_entrada["error"]:
+                continue
+            fechas = por_idioma.setdefault(resumen_entrada["idioma"], {})
+            for date_str, lista in devocionales_por_fecha.items():
+                fechas.setdefault(date_str, []).extend(lista)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    resumen = {
+        "entradas": resumenes,
+        "idiomas": {idioma: {"devocionales": sum(len(lista) for lista in fechas.values()), "fechas": len(fechas),
+                             "duplicados_version": 0}
+                    for idioma, fechas in por_idioma.items()},
+        "salida": None,
+        "indice_fechas": None,
+    }
+    if not por_idioma:
+        print("Error: no se pudo leer ninguna entrada; no se escribe la salida.")
+        return resumen
+
+    # Las fechas de cada idioma se escriben en orden, como en los shards.
+    idiomas = [(idioma, sorted(fechas.items())) for idioma, fechas in por_idioma.items()]
+    if by_version:
+        idiomas = [(idioma, _indexar_por_version(fechas, resumen["idiomas"][idioma])) for idioma, fechas in idiomas]
+    try:
+        if sharded:
+            resumen["salida"] = escribir_shards(output_filepath, idiomas, compacto=compact, compresion=compression)
+            print(f"Shards por idioma y mes escritos en '{output_filepath}' (índice: {resumen['salida']})")
+        else:
+            _volcar_salida(output_filepath, idiomas, compact, date_index, resumen)
+            resumen["salida"] = output_filepath
+            print(f"Archivo multi-idioma ({', '.join(por_idioma)}) guardado exitosamente en: {output_filepath}")
+    except Exception as e:
+        print(f"Error: no se pudo escribir '{output_filepath}': {e}")
+    return resumen
+
+
+def _entradas_etiquetadas(patrones):
+    """Expande los patrones [idioma:]ruta de la línea de comandos en pares (ruta, idioma o None)."""
+    entradas = []
+    for patron in patrones:
+        match = _PATRON_ETIQUETA.match(patron)
+        idioma, patron = match.groups() if match else (None, patron)
+        entradas.extend((ruta, idioma) for ruta in expandir_entradas([patron]))
+    return entradas
+
+
+def main(argv=None):
+    """
+    Línea de comandos. Los mensajes van a stderr y el resumen se imprime en stdout como
+    JSON. Código de salida: 0 si el archivo se ajustó y guardó, 1 si hubo un error (en
+    modo lote, también si alguna entrada no se pudo leer), 2 si los argumentos no son válidos.
+    """
+    parser = argparse.ArgumentParser(description="Ajusta un JSON de devocionales a la estructura por idioma y fecha con varias versiones.")
+    # Sin argumentos se usan las rutas de siempre
+    parser.add_argument("entrada", nargs="?", default=None,
+                        help=f"Archivo JSON de entrada (.json, .json.gz o .json.xz). Por defecto: {ENTRADA_POR_DEFECTO}")
+    parser.add_argument("salida", nargs="?", default=None,
+                        help=f"Archivo de salida (.json, .json.gz o .json.xz) o carpeta con --shards. Por defecto: {SALIDA_POR_DEFECTO}")
+    parser.add_argument("--formato", choices=("indentado", "compacto"), default="indentado", help="Formato del JSON de salida")
+    parser.add_argument("--compresion", choices=COMPRESIONES, default=None, help="Comprimir los shards (con --shards)")
+    parser.add_argument("--shards", action="store_true", help="Escribir un shard por mes con index.json en la carpeta de salida")
+    parser.add_argument("--memoria-maxima", type=int, default=None, metavar="MB",
+                        help="Memoria acotada: ordenar por fecha en disco en tramos de hasta MB megabytes")
+    parser.add_argument("--temporal", default=None, help="Carpeta para los tramos temporales (con --memoria-maxima)")
+    parser.add_argument("--lote", nargs="+", default=None, metavar="[IDIOMA:]ENTRADA",
+                        help="Modo lote: varias exportaciones o patrones glob, cada uno opcionalmente con su "
+                             "idioma (ej. en:exportes/en_*.json); sin idioma se detecta. Requiere -o")
+    parser.add_argument("-o", dest="salida_lote", default=None,
+                        help="Salida del modo lote: archivo multi-idioma o carpeta con --shards")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del modo lote (por defecto, uno por CPU; 1 = en serie)")
+    parser.add_argument("--indice-fechas", action="store_true",
+                        help="Escribir junto a la salida su índice de fechas (.indice) para leer un día sin decodificar todo")
+    parser.add_argument("--por-version", action="store_true",
+                        help="Escribir cada fecha como un objeto {versión: devocional} en lugar de una lista")
+    args = parser.parse_args(argv)
+    if args.memoria_maxima is not None and args.memoria_maxima <= 0:
+        parser.error("--memoria-maxima debe ser mayor que 0")
+    if args.indice_fechas:
+        salida = args.salida_lote if args.lote is not None else args.salida or SALIDA_POR_DEFECTO
+        if args.shards or compresion_por_extension(salida):
+            parser.error("--indice-fechas no se puede combinar con --shards ni con una salida comprimida")
+
+    if args.lote is not None:
+        if not args.salida_lote:
+            parser.error("--lote requiere -o SALIDA")
+        if args.entrada or args.salida or args.memoria_maxima:
+            parser.error("--lote no admite entrada/salida posicionales ni --memoria-maxima")
+        try:
+            entradas = _entradas_etiquetadas(args.lote)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        with redirect_stdout(sys.stderr):
+            resumen = adjust_json_batch(entradas, args.salida_lote, compact=args.formato == "compacto",
+                                        sharded=args.shards, compression=args.compresion, workers=args.workers,
+                                        date_index=args.indice_fechas, by_version=args.por_version)
+        print(json.dumps(resumen, ensure_ascii=False, indent=4))
+        completo = resumen["salida"] and not any(entrada["error"] for entrada in resumen["entradas"])
+        return 0 if completo else 1
+
+    with redirect_stdout(sys.stderr):
+        resumen = adjust_json_for_multi_version(args.entrada or ENTRADA_POR_DEFECTO, args.salida or SALIDA_POR_DEFECTO,
+                                                compact=args.formato == "compacto",
+                                                sharded=args.shards, compression=args.compresion,
+                                                memory_limit=args.memoria_maxima and args.memoria_maxima * 1024 * 1024,
+                                                temp_dir=args.temporal, date_index=args.indice_fechas,
+                                                by_version=args.por_version)
+    if resumen is None:
+        return 1
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
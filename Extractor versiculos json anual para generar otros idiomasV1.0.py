@@ -1,195 +1,83 @@
+import argparse
 import json
-import re
+import sys
 from typing import Dict, Set
 import os
-from tkinter import filedialog, Tk
+from contextlib import redirect_stdout
+
+from catalogo_libros import CATALOGO, IDIOMAS
+from escritura_json import abrir_salida, volcar_json
+from lectura_json import abrir_texto, expandir_entradas
+from referencias_biblicas import Referencia, formatear_para_codigo, traducir_referencias
+from registro_devocional import Devocional, cargar_compacto
 
 class ExtractorVersiculos:
-    def __init__(self):
-        """Inicializa el extractor con traducciones de libros bíblicos."""
-        self.traducciones_libros = {
-            "Mateo": "Matthew", "Marcos": "Mark", "Lucas": "Luke", "Juan": "John", 
-            "Hechos": "Acts", "Romanos": "Romans", "1 Corintios": "1 Corinthians", 
-            "2 Corintios": "2 Corinthians", "Gálatas": "Galatians", "Efesios": "Ephesians", 
-            "Filipenses": "Philippians", "Colosenses": "Colossians", "1 Tesalonicenses": "1 Thessalonians", 
-            "2 Tesalonicenses": "2 Thessalonians", "1 Timoteo": "1 Timothy", "2 Timoteo": "2 Timothy", 
-            "Tito": "Titus", "Filemón": "Philemon", "Hebreos": "Hebrews", "Santiago": "James", 
-            "1 Pedro": "1 Peter", "2 Pedro": "2 Peter", "1 Juan": "1 John", "2 Juan": "2 John", 
-            "3 Juan": "3 John", "Judas": "Jude", "Apocalipsis": "Revelation"
-        }
-        
-        # Para portugués
-        self.traducciones_pt = {
-            "Mateo": "Mateus", "Marcos": "Marcos", "Lucas": "Lucas", "Juan": "João", 
-            "Hechos": "Atos", "Romanos": "Romanos", "1 Corintios": "1 Coríntios", 
-            "2 Corintios": "2 Coríntios", "Gálatas": "Gálatas", "Efesios": "Efésios", 
-            "Filipenses": "Filipenses", "Colosenses": "Colossenses", "1 Tesalonicenses": "1 Tessalonicenses", 
-            "2 Tesalonicenses": "2 Tessalonicenses", "1 Timoteo": "1 Timóteo", "2 Timoteo": "2 Timóteo", 
-            "Tito": "Tito", "Filemón": "Filemon", "Hebreos": "Hebreus", "Santiago": "Tiago", 
-            "1 Pedro": "1 Pedro", "2 Pedro": "2 Pedro", "1 Juan": "1 João", "2 Juan": "2 João", 
-            "3 Juan": "3 João", "Judas": "Judas", "Apocalipsis": "Apocalipse"
-        }
-        
-        # Para francés
-        self.traducciones_fr = {
-            "Mateo": "Matthieu", "Marcos": "Marc", "Lucas": "Luc", "Juan": "Jean", 
-            "Hechos": "Actes", "Romanos": "Romains", "1 Corintios": "1 Corinthiens", 
-            "2 Corintios": "2 Corinthiens", "Gálatas": "Galates", "Efesios": "Éphésiens", 
-            "Filipenses": "Philippiens", "Colosenses": "Colossiens", "1 Tesalonicenses": "1 Thessaloniciens", 
-            "2 Tesalonicenses": "2 Thessaloniciens", "1 Timoteo": "1 Timothée", "2 Timoteo": "2 Timothée", 
-            "Tito": "Tite", "Filemón": "Philémon", "Hebreos": "Hébreux", "Santiago": "Jacques", 
-            "1 Pedro": "1 Pierre", "2 Pedro": "2 Pierre", "1 Juan": "1 Jean", "2 Juan": "2 Jean", 
-            "3 Juan": "3 Jean", "Judas": "Jude", "Apocalipsis": "Apocalypse"
-        }
-        
-        # Para chino simplificado
-        self.traducciones_zh = {
-            "Mateo": "马太福音", "Marcos": "马可福音", "Lucas": "路加福音", "Juan": "约翰福音",
-            "Hechos": "使徒行传", "Romanos": "罗马书", "1 Corintios": "哥林多前书",
-            "2 Corintios": "哥林多后书", "Gálatas": "加拉太书", "Efesios": "以弗所书",
-            "Filipenses": "腓立比书", "Colosenses": "歌罗西书", "1 Tesalonicenses": "帖撒罗尼迦前书",
-            "2 Tesalonicenses": "帖撒罗尼迦后书", "1 Timoteo": "提摩太前书", "2 Timoteo": "提摩太后书",
-            "Tito": "提多书", "Filemón": "腓利门书", "Hebreos": "希伯来书", "Santiago": "雅各书",
-            "1 Pedro": "彼得前书", "2 Pedro": "彼得后书", "1 Juan": "约翰一书", "2 Juan": "约翰二书",
-            "3 Juan": "约翰三书", "Judas": "犹大书", "Apocalipsis": "启示录"
-        }
-        
-        # Para japonés
-        self.traducciones_ja = {
-            "Mateo": "マタイの福音書", "Marcos": "マルコの福音書", "Lucas": "ルカの福音書", "Juan": "ヨハネの福音書",
-            "Hechos": "使徒の働き", "Romanos": "ローマ人への手紙", "1 Corintios": "コリント人への手紙第一",
-            "2 Corintios": "コリント人への手紙第二", "Gálatas": "ガラテヤ人への手紙", "Efesios": "エペソ人への手紙",
-            "Filipenses": "ピリピ人への手紙", "Colosenses": "コロサイ人への手紙", "1 Tesalonicenses": "テサロニケ人への手紙第一",
-            "2 Tesalonicenses": "テサロニケ人への手紙第二", "1 Timoteo": "テモテへの手紙第一", "2 Timoteo": "テモテへの手紙第二",
-            "Tito": "テトスへの手紙", "Filemón": "ピレモンへの手紙", "Hebreos": "ヘブル人への手紙", "Santiago": "ヤコブの手紙",
-            "1 Pedro": "ペテロの手紙第一", "2 Pedro": "ペテロの手紙第二", "1 Juan": "ヨハネの手紙第一", "2 Juan": "ヨハネの手紙第二",
-            "3 Juan": "ヨハネの手紙第三", "Judas": "ユダの手紙", "Apocalipsis": "ヨハネの黙示録"
-        }
+    def __init__(self, idiomas=IDIOMAS):
+        """
+        Inicializa el extractor con los idiomas de destino. Los nombres de los libros
+        salen del catálogo compartido (catalogo_libros), que cubre los 66 libros.
+        """
+        self.idiomas = tuple(idiomas)
 
     def seleccionar_archivo(self) -> str:
         """Abre selector de archivos."""
+        # tkinter solo se importa al abrir el selector: el modo por lotes no necesita pantalla.
+        from tkinter import filedialog, Tk
         root = Tk()
         root.withdraw()
         root.attributes('-topmost', True)
         
         archivo = filedialog.askopenfilename(
             title="Selecciona el archivo JSON",
-            filetypes=[("Archivos JSON", "*.json"), ("Todos los archivos", "*.*")]
+            filetypes=[("Archivos JSON", "*.json *.json.gz *.json.xz"), ("Todos los archivos", "*.*")]
         )
         root.destroy()
         return archivo
 
-    def extraer_versiculos_del_json(self, archivo_json: str) -> Set[str]:
-        """Extrae versículos únicos del JSON."""
-        versiculos = set()
-        
+    def extraer_versiculos_del_json(self, archivo_json: str) -> Set[Referencia]:
+        """Extrae versículos únicos del JSON como referencias (sin versión)."""
         try:
-            with open(archivo_json, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
-            
-            print(f"✅ Archivo cargado: {os.path.basename(archivo_json)}")
-            
-            # Navegar estructura: data -> idiomas -> fechas -> devocionales
-            if 'data' in datos:
-                for idioma, fechas in datos['data'].items():
-                    for fecha, devocionales in fechas.items():
-                        if isinstance(devocionales, list):
-                            for devocional in devocionales:
-                                if isinstance(devocional, dict) and 'versiculo' in devocional:
-                                    texto_versiculo = devocional['versiculo']
-                                    
-                                    # Extraer libro, capítulo y versículo
-                                    patron = r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s\d]+?)\s+(\d+):(\d+(?:-\d+)?)'
-                                    match = re.search(patron, texto_versiculo)
-                                    
-                                    if match:
-                                        libro = match.group(1).strip()
-                                        capitulo = match.group(2)
-                                        versiculo = match.group(3)
-                                        
-                                        cita = f"{libro} {capitulo}:{versiculo}"
-                                        versiculos.add(cita)
-            
-            print(f"📊 Extraídos {len(versiculos)} versículos únicos")
-            return versiculos
-            
+            return self.leer_versiculos(archivo_json)
         except Exception as e:
             print(f"❌ Error: {e}")
             return set()
 
-    def traducir_versiculos(self, versiculos_es: Set[str]) -> Dict[str, Set[str]]:
-        """Traduce versículos a otros idiomas."""
-        versiculos_traducidos = {
-            'es': set(),
-            'en': set(),
-            'pt': set(),
-            'fr': set(),
-            'zh': set(),
-            'ja': set()
-        }
-        
-        for versiculo in versiculos_es:
-            # Extraer partes del versículo
-            match = re.match(r'(.+?)\s+(\d+:\d+(?:-\d+)?)', versiculo)
-            if match:
-                libro = match.group(1).strip()
-                cap_vers = match.group(2)
-                
-                # Español (original)
-                versiculos_traducidos['es'].add(f"{libro} {cap_vers}")
-                
-                # Inglés
-                libro_en = self.traducciones_libros.get(libro, libro)
-                versiculos_traducidos['en'].add(f"{libro_en} {cap_vers}")
-                
-                # Portugués
-                libro_pt = self.traducciones_pt.get(libro, libro)
-                versiculos_traducidos['pt'].add(f"{libro_pt} {cap_vers}")
-                
-                # Francés
-                libro_fr = self.traducciones_fr.get(libro, libro)
-                versiculos_traducidos['fr'].add(f"{libro_fr} {cap_vers}")
-                
-                # Chino simplificado
-                libro_zh = self.traducciones_zh.get(libro, libro)
-                versiculos_traducidos['zh'].add(f"{libro_zh} {cap_vers}")
-                
-                # Japonés
-                libro_ja = self.traducciones_ja.get(libro, libro)
-                versiculos_traducidos['ja'].add(f"{libro_ja} {cap_vers}")
+    def leer_versiculos(self, archivo_json: str) -> Set[Referencia]:
+        """Como extraer_versiculos_del_json, pero deja pasar los errores de lectura."""
+        versiculos = set()
         
-        return versiculos_traducidos
-
-    def formatear_para_codigo(self, versiculos: Set[str], idioma: str) -> str:
-        """Formatea versículos en el estilo solicitado."""
-        if not versiculos:
-            return f"# No hay versículos en {idioma}"
+        with abrir_texto(archivo_json) as f:
+            datos = cargar_compacto(f)
         
-        # Ordenar versículos
-        versiculos_ordenados = sorted(list(versiculos))
+        print(f"✅ Archivo cargado: {os.path.basename(archivo_json)}")
         
-        # Formatear en líneas de 10 elementos máximo
-        lineas = []
-        for i in range(0, len(versiculos_ordenados), 10):
-            grupo = versiculos_ordenados[i:i+10]
-            elementos = ', '.join(f'"{v}"' for v in grupo)
-            if i + 10 >= len(versiculos_ordenados):
-                lineas.append(f"    {elementos}")
-            else:
-                lineas.append(f"    {elementos},")
+        # Navegar estructura: data -> idiomas -> fechas -> devocionales
+        if 'data' in datos:
+            for idioma, fechas in datos['data'].items():
+                for fecha, devocionales in fechas.items():
+                    if isinstance(devocionales, list):
+                        for devocional in devocionales:
+                            if isinstance(devocional, Devocional):
+                                # Libro, capítulo y versículo ya interpretados al cargar
+                                referencia = devocional.referencia
+                                
+                                if referencia and referencia.verse_start:
+                                    versiculos.add(Referencia(*referencia.pasaje))
         
-        return '\n'.join(lineas)
+        print(f"📊 Extraídos {len(versiculos)} versículos únicos")
+        return versiculos
+
+    def traducir_versiculos(self, versiculos_es: Set[Referencia]) -> Dict[str, Set[str]]:
+        """Traduce versículos a los idiomas del extractor (ver traducir_referencias)."""
+        return traducir_referencias(versiculos_es, self.idiomas)
+
+    def formatear_para_codigo(self, versiculos: Set[str], idioma: str) -> str:
+        """Formatea versículos en el estilo solicitado (ver referencias_biblicas.formatear_para_codigo)."""
+        return formatear_para_codigo(versiculos, idioma)
 
     def mostrar_resultados(self, versiculos_traducidos: Dict[str, Set[str]]):
         """Muestra los resultados formateados."""
-        idiomas = {
-            'es': 'ESPAÑOL',
-            'en': 'INGLÉS', 
-            'pt': 'PORTUGUÉS',
-            'fr': 'FRANCÉS',
-            'zh': 'CHINO (简体中文)',
-            'ja': 'JAPONÉS (日本語)'
-        }
+        idiomas = {codigo: CATALOGO[codigo]['idioma'] for codigo in self.idiomas}
         
         print(f"\n" + "="*80)
         print("📋 VERSÍCULOS EXTRAÍDOS Y TRADUCIDOS - LISTOS PARA COPIAR")
@@ -207,7 +95,7 @@ class ExtractorVersiculos:
         print("✨ ¡Listo! Copia y pega el formato que necesites en tu código")
         print("="*80)
 
-def main():
+def modo_interactivo():
     """Función principal - Simple y directo."""
     print("🔍 EXTRACTOR SIMPLE DE VERSÍCULOS")
     print("="*40)
@@ -239,5 +127,76 @@ def main():
     
     input("\n⏎ Presiona Enter para salir...")
 
+def procesar_lote(archivos, salida=None, compacto=False):
+    """
+    Extrae y traduce los versículos de varios archivos sin interacción. Si se indica
+    salida, escribe ahí un JSON {idioma: [versículos ordenados]} (comprimido si termina
+    en .gz o .xz); si no, muestra las listas formateadas. Devuelve un resumen.
+    """
+    extractor = ExtractorVersiculos()
+    versiculos_es = set()
+    omitidos = []
+    for archivo in archivos:
+        try:
+            versiculos_es |= extractor.leer_versiculos(archivo)
+        except Exception as e:
+            print(f"❌ Error en {os.path.basename(archivo)}: {e}")
+            omitidos.append(archivo)
+
+    versiculos_traducidos = extractor.traducir_versiculos(versiculos_es)
+    ruta_salida = None
+    if salida:
+        try:
+            with abrir_salida(salida) as f:
+                volcar_json({idioma: sorted(versiculos) for idioma, versiculos in versiculos_traducidos.items()},
+                            f, compacto=compacto)
+            ruta_salida = salida
+            print(f"✅ Versículos traducidos guardados en: {salida}")
+        except Exception as e:
+            print(f"❌ No se pudo guardar '{salida}': {e}")
+    else:
+        extractor.mostrar_resultados(versiculos_traducidos)
+
+    return {
+        "archivos_seleccionados": len(archivos),
+        "archivos_procesados": len(archivos) - len(omitidos),
+        "archivos_omitidos": omitidos,
+        "versiculos_unicos": len(versiculos_es),
+        "versiculos_por_idioma": {idioma: len(versiculos) for idioma, versiculos in versiculos_traducidos.items()},
+        "salida": ruta_salida,
+    }
+
+
+def main(argv=None):
+    """
+    Sin argumentos abre el selector de archivos (modo interactivo). Con argumentos
+    trabaja por lotes: los mensajes van a stderr y el resumen se imprime en stdout como
+    JSON. Código de salida: 0 si todo se procesó (y guardó), 1 si algún archivo se
+    omitió o la salida no pudo guardarse, 2 si los argumentos no son válidos.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        modo_interactivo()
+        return 0
+
+    parser = argparse.ArgumentParser(description="Extrae los versículos de archivos de devocionales y los traduce a otros idiomas.")
+    parser.add_argument("entradas", nargs="+", help="Archivos o patrones glob de entrada (.json, .json.gz, .json.xz)")
+    parser.add_argument("-o", "--salida", default=None,
+                        help="Archivo JSON donde guardar las listas traducidas (.json, .json.gz o .json.xz)")
+    parser.add_argument("--formato", choices=("indentado", "compacto"), default="indentado", help="Formato del JSON de salida")
+    args = parser.parse_args(argv)
+
+    try:
+        archivos = expandir_entradas(args.entradas)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    with redirect_stdout(sys.stderr):
+        resumen = procesar_lote(archivos, args.salida, compacto=args.formato == "compacto")
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+
+    completo = not resumen["archivos_omitidos"] and (resumen["salida"] or not args.salida)
+    return 0 if completo else 1
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+from itertools import groupby
+
+from cache_consolidacion import hash_archivo
+from catalogo_libros import IDIOMAS
+from escritura_json import (COMPRESIONES, abrir_salida, escribir_lista_versiculos, publicar_versionado,
+                            volcar_devocionales, volcar_json)
+from lectura_json import abrir_texto, cargar_json_tolerante, expandir_entradas, iter_devocionales
+from referencias_biblicas import Referencia, formatear_referencia, parse_referencia, traducir_referencias
+
+# Cambiar este valor obliga a volver a ingestar (la base se recrea si no coincide).
+VERSION_ESQUEMA = 1
+
+NOMBRE_EXCLUIDOS = "excluded_verses.json"
+NOMBRE_TRADUCIDOS = "versiculos_traducidos.json"
+
+# El id de cada devocional es (id del archivo << 32) | posición en el archivo: ordenar
+# por id reproduce el orden de lectura (archivos en el orden de su primera ingesta y,
+# dentro de cada uno, en el orden del documento).
+_BITS_POSICION = 32
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    ruta TEXT NOT NULL UNIQUE,
+    tamano INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    devocionales INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS devocionales (
+    id INTEGER PRIMARY KEY,
+    idioma TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    version TEXT,
+    book_id INTEGER,
+    chapter INTEGER,
+    verse_start INTEGER,
+    verse_end INTEGER,
+    ref_version TEXT,
+    versiculo TEXT,
+    json TEXT NOT NULL
+);
+-- (idioma, fecha) seguido de la clave del versículo: la consolidación agrupa por
+-- fecha y versículo recorriendo este índice, sin ordenar en una tabla temporal.
+CREATE INDEX IF NOT EXISTS idx_idioma_fecha
+    ON devocionales (idioma, fecha, book_id, chapter, verse_start, verse_end, ref_version);
+CREATE INDEX IF NOT EXISTS idx_versiculo
+    ON devocionales (book_id, chapter, verse_start, verse_end, ref_version);
+CREATE INDEX IF NOT EXISTS idx_version ON devocionales (version);
+"""
+
+# Primer devocional (en orden de lectura) de cada (fecha, versículo) de un idioma.
+_CONSULTA_CONSOLIDADOS = """
+SELECT fecha, versiculo, json FROM devocionales
+WHERE id IN (SELECT MIN(id) FROM devocionales
+             WHERE idioma = ? AND book_id IS NOT NULL
+             GROUP BY fecha, book_id, chapter, verse_start, verse_end, ref_version)
+ORDER BY fecha, id
+"""
+
+
+def _fila(id_devocional, idioma, fecha, devocional):
+    """Fila de la tabla devocionales; el registro original se guarda como JSON compacto."""
+    versiculo = devocional.get("versiculo")
+    referencia = parse_referencia(versiculo) if "versiculo" in devocional else None
+    version = devocional.get("version")
+    return (id_devocional, idioma, fecha, version if isinstance(version, str) else None,
+            *(referencia or (None,) * 5), versiculo if isinstance(versiculo, str) else None,
+            json.dumps(devocional, ensure_ascii=False, separators=(",", ":")))
+
+
+def _devocionales_de_documento(data):
+    """Como iter_devocionales, pero sobre un documento ya cargado (por ejemplo, reparado)."""
+    idiomas = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(idiomas, dict):
+        return
+    for idioma, fechas in idiomas.items():
+        if not isinstance(fechas, dict):
+            continue
+        for fecha, lista in fechas.items():
+            if isinstance(lista, list):
+                for devocional in lista:
+                    yield idioma, fecha, devocional
+
+
+class AlmacenDevocionales:
+    """
+    Corpus de devocionales en una base SQLite local. Los archivos JSON se leen una sola
+    vez (ingestar) y las salidas de las herramientas se generan con consultas sobre los
+    índices de (idioma, fecha), versículo y versión, sin volver a interpretar el JSON.
+    Un archivo ya ingestado con el mismo contenido se omite; si cambió, se reemplazan
+    sus devocionales conservando su lugar en el orden de lectura.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode = WAL")
+        self.conexion.execute("PRAGMA synchronous = NORMAL")
+        version = self.conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version != VERSION_ESQUEMA:
+            with self.conexion:
+                self.conexion.execute("DROP TABLE IF EXISTS devocionales")
+                self.conexion.execute("DROP TABLE IF EXISTS archivos")
+                self.conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        self.conexion.executescript(_ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _archivo(self, ruta):
+        return self.conexion.execute("SELECT id, tamano, mtime_ns, hash FROM archivos WHERE ruta = ?",
+                                     (ruta,)).fetchone()
+
+    def _insertar(self, previo, ruta, estado, hash_contenido, devocionales):
+        """
+        Registra el archivo y reemplaza sus devocionales en una sola transacción.
+        Si la lectura falla a mitad no queda nada escrito, ni siquiera la fila del
+        archivo, y la próxima ejecución lo vuelve a intentar. Devuelve cuántos insertó.
+        """
+        with self.conexion:
+            if previo:
+                archivo_id = previo[0]
+            else:
+                archivo_id = self.conexion.execute(
+                    "INSERT INTO archivos (ruta, tamano, mtime_ns, hash, devocionales) VALUES (?, ?, ?, ?, 0)",
+                    (ruta, estado.st_size, estado.st_mtime_ns, hash_contenido)).lastrowid
+            base = archivo_id << _BITS_POSICION
+            filas = (_fila(base | posicion, idioma, fecha, devocional)
+                     for posicion, (idioma, fecha, devocional) in enumerate(devocionales)
+                     if isinstance(devocional, dict))
+            self.conexion.execute("DELETE FROM devocionales WHERE id BETWEEN ? AND ?",
+                                  (base, base | ((1 << _BITS_POSICION) - 1)))
+            cantidad = self.conexion.executemany(
+                "INSERT INTO devocionales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas).rowcount
+            self.conexion.execute("UPDATE archivos SET tamano = ?, mtime_ns = ?, hash = ?, devocionales = ? WHERE id = ?",
+                                  (estado.st_size, estado.st_mtime_ns, hash_contenido, cantidad, archivo_id))
+        return cantidad
+
+    def ingestar_archivo(self, file_path, log=print):
+        """
+        Carga un archivo en la base. Devuelve 'sin_cambios', 'ingestado' o 'reparado'.
+        Si el JSON no es válido se deshace la transacción y se reintenta con la lectura
+        tolerante; si tampoco se puede leer, se propaga el json.JSONDecodeError.
+        """
+        ruta = os.path.abspath(file_path)
+        nombre = os.path.basename(file_path)
+        estado = os.stat(file_path)
+        previo = self._archivo(ruta)
+        if previo and (previo[1], previo[2]) == (estado.st_size, estado.st_mtime_ns):
+            log(f"  '{nombre}' sin cambios.")
+            return "sin_cambios"
+        hash_contenido = hash_archivo(file_path)
+        if previo and previo[3] == hash_contenido:
+            with self.conexion:
+                self.conexion.execute("UPDATE archivos SET mtime_ns = ? WHERE id = ?", (estado.st_mtime_ns, previo[0]))
+            log(f"  '{nombre}' sin cambios.")
+            return "sin_cambios"
+
+        resultado = "ingestado"
+        try:
+            cantidad = self._insertar(previo, ruta, estado, hash_contenido, iter_devocionales(file_path))
+        except json.JSONDecodeError as e:
+            log(f"  ❌ Error de formato JSON en '{nombre}': {e}. Intentando reparar...")
+            with abrir_texto(file_path) as f:
+                data, _ = cargar_json_tolerante(f.read())
+            cantidad = self._insertar(previo, ruta, estado, hash_contenido, _devocionales_de_documento(data))
+            resultado = "reparado"
+        log(f"  '{nombre}' {resultado}. Devocionales: {cantidad}")
+        return resultado
+
+    def olvidar_otros(self, file_paths):
+        """Elimina de la base los archivos que no están en file_paths. Devuelve cuántos eliminó."""
+        conservar = {os.path.abspath(p) for p in file_paths}
+        eliminados = 0
+        with self.conexion:
+            for archivo_id, ruta in self.conexion.execute("SELECT id, ruta FROM archivos").fetchall():
+                if ruta not in conservar:
+                    base = archivo_id << _BITS_POSICION
+                    self.conexion.execute("DELETE FROM devocionales WHERE id BETWEEN ? AND ?",
+                                          (base, base | ((1 << _BITS_POSICION) - 1)))
+                    self.conexion.execute("DELETE FROM archivos WHERE id = ?", (archivo_id,))
+                    eliminados += 1
+        return eliminados
+
+    def ingestar(self, file_paths, log=print, reemplazar=False):
+        """
+        Ingesta varios archivos y devuelve un resumen. Con reemplazar, la base queda con
+        exactamente esos archivos (se olvidan los que ya no se indican).
+        """
+        resumen = {"archivos_seleccionados": len(file_paths), "ingestados": 0, "reparados": 0,
+                   "sin_cambios": 0, "archivos_omitidos": [], "archivos_eliminados": 0}
+        for file_path in file_paths:
+            try:
+                resultado = self.ingestar_archivo(file_path, log)
+            except (OSError, json.JSONDecodeError) as e:
+                log(f"  ❌ No se pudo ingestar '{os.path.basename(file_path)}': {e}. Se omitirá.")
+                resumen["archivos_omitidos"].append(file_path)
+                continue
+            resumen[{"ingestado": "ingestados", "reparado": "reparados"}.get(resultado, resultado)] += 1
+        if reemplazar:
+            resumen["archivos_eliminados"] = self.olvidar_otros(file_paths)
+        resumen["devocionales"] = self.conexion.execute("SELECT COUNT(*) FROM devocionales").fetchone()[0]
+        return resumen
+
+    # --- Consultas ---
+
+    def fechas(self, idioma):
+        """Fechas con algún devocional en el idioma, ordenadas."""
+        return [fila[0] for fila in self.conexion.execute(
+            "SELECT DISTINCT fecha FROM devocionales WHERE idioma = ? ORDER BY fecha", (idioma,))]
+
+    def consolidados(self, idioma="es"):
+        """
+        Produce (fecha, [devocionales]) en orden de fecha con el primer devocional de cada
+        (fecha, versículo), igual que la consolidación. Las fechas cuyos devocionales no
+        tienen referencia válida aparecen con la lista vacía, como en la consolidación.
+        """
+        filas = groupby(self.conexion.execute(_CONSULTA_CONSOLIDADOS, (idioma,)), key=lambda fila: fila[0])
+        siguiente = next(filas, None)
+        for fecha in self.fechas(idioma):
+            if siguiente and siguiente[0] == fecha:
+                yield fecha, [json.loads(fila[2]) for fila in siguiente[1]]
+                siguiente = next(filas, None)
+            else:
+                yield fecha, []
+
+    def versiculos_consolidados(self, idioma="es"):
+        """El campo 'versiculo' original de cada devocional consolidado."""
+        return [fila[1] for fila in self.conexion.execute(_CONSULTA_CONSOLIDADOS, (idioma,))]
+
+    def referencias(self):
+        """Pares (idioma, referencia) de todos los devocionales, de todos los idiomas, con repeticiones."""
+        return [(fila[0], Referencia(*fila[1:])) for fila in self.conexion.execute(
+            "SELECT idioma, book_id, chapter, verse_start, verse_end, ref_version FROM devocionales"
+            " WHERE book_id IS NOT NULL")]
+
+    def pasajes_distintos(self):
+        """Pasajes distintos (sin versión ni capítulos completos) de todos los idiomas."""
+        return [Referencia(*fila) for fila in self.conexion.execute(
+            "SELECT DISTINCT book_id, chapter, verse_start, verse_end FROM devocionales WHERE verse_start > 0")]
+
+    def contar(self, idioma=None):
+        """Cantidad de devocionales (de un idioma o de todos)."""
+        if idioma is None:
+            return self.conexion.execute("SELECT COUNT(*) FROM devocionales").fetchone()[0]
+        return self.conexion.execute("SELECT COUNT(*) FROM devocionales WHERE idioma = ?", (idioma,)).fetchone()[0]
+
+    def por_version(self, version):
+        """Los devocionales de una versión (campo 'version'), en orden de idioma y fecha."""
+        for (fila,) in self.conexion.execute(
+                "SELECT json FROM devocionales WHERE version = ? ORDER BY idioma, fecha, id", (version,)):
+            yield json.loads(fila)
+
+
+def exportar(almacen, output_dir, idioma="es", compression=None, compact=False, idiomas=IDIOMAS):
+    """
+    Genera desde la base las salidas de las herramientas: el JSON consolidado y la lista
+    de versículos (consolidador), excluded_verses.json (extractor de excluidos) y las
+    listas traducidas (extractor de idiomas). Devuelve un resumen con las rutas; una
+    salida que no pudo escribirse queda en None.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    resumen = {"devocionales": almacen.contar(), "salidas": {}}
+    extension = f".{compression}" if compression else ""
+
+    def escribir(clave, generar):
+        try:
+            resumen["salidas"][clave] = generar()
+            print(f"✔ {clave} guardado en: '{resumen['salidas'][clave]}'")
+        except Exception as e:
+            resumen["salidas"][clave] = None
+            print(f"❌ ERROR al guardar {clave}: {e}")
+
+    def excluidos():
+        ruta = os.path.join(output_dir, NOMBRE_EXCLUIDOS + extension)
+        with abrir_salida(ruta) as f:
+            volcar_json(sorted(formatear_referencia(referencia, idioma=idioma_referencia)
+                               for idioma_referencia, referencia in almacen.referencias()),
+                        f, compacto=compact)
+        return ruta
+
+    def traducidos():
+        ruta = os.path.join(output_dir, NOMBRE_TRADUCIDOS + extension)
+        traducidas = traducir_referencias(almacen.pasajes_distintos(), idiomas)
+        with abrir_salida(ruta) as f:
+            volcar_json({idioma: sorted(textos) for idioma, textos in traducidas.items()}, f, compacto=compact)
+        return ruta
+
+    escribir("consolidado", lambda: publicar_versionado(
+        "devocionales_consolidados", "json", output_dir,
+        lambda f: volcar_devocionales(f, [(idioma, almacen.consolidados(idioma))], compacto=compact),
+        compresion=compression))
+    escribir("lista_versiculos", lambda: publicar_versionado(
+        "lista_versiculos", "txt", output_dir,
+        lambda f: escribir_lista_versiculos(f, almacen.versiculos_consolidados(idioma)),
+        compresion=compression))
+    escribir("excluidos", excluidos)
+    escribir("traducidos", traducidos)
+    return resumen
+
+
+def main(argv=None):
+    """
+    ingestar: carga archivos de devocionales en la base. exportar: genera las salidas
+    de las herramientas desde la base. Los mensajes van a stderr y el resumen se imprime
+    en stdout como JSON. Código de salida: 0 si todo se procesó y guardó, 1 si algún
+    archivo se omitió o alguna salida no pudo guardarse, 2 si los argumentos no son válidos.
+    """
+    parser = argparse.ArgumentParser(description="Corpus de devocionales en SQLite: se ingesta una vez y se consulta por índices.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    ingestar = subparsers.add_parser("ingestar", help="Cargar (o actualizar) archivos de devocionales en la base")
+    ingestar.add_argument("base", help="Archivo SQLite (se crea si no existe)")
+    ingestar.add_argument("entradas", nargs="+", help="Archivos o patrones glob de entrada (.json, .json.gz, .json.xz)")
+    ingestar.add_argument("--reemplazar", action="store_true",
+                          help="Olvidar los archivos ingestados antes que no estén entre las entradas")
+
+    exportar_parser = subparsers.add_parser("exportar", help="Generar las salidas de las herramientas desde la base")
+    exportar_parser.add_argument("base", help="Archivo SQLite ya ingestado")
+    exportar_parser.add_argument("-o", "--salida", required=True, help="Carpeta de salida")
+    exportar_parser.add_argument("--idioma", default="es", help="Idioma a consolidar (por defecto: es)")
+    exportar_parser.add_argument("--formato", choices=("indentado", "compacto"), default="indentado",
+                                 help="Formato de los JSON de salida")
+    exportar_parser.add_argument("--compresion", choices=COMPRESIONES, default=None, help="Comprimir las salidas")
+    args = parser.parse_args(argv)
+
+    if args.comando == "ingestar":
+        try:
+            file_paths = expandir_entradas(args.entradas)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        with redirect_stdout(sys.stderr), AlmacenDevocionales(args.base) as almacen:
+            resumen = almacen.ingestar(file_paths, reemplazar=args.reemplazar)
+        completo = not resumen["archivos_omitidos"]
+    else:
+        if not os.path.exists(args.base):
+            parser.error(f"No existe la base '{args.base}'")
+        with redirect_stdout(sys.stderr), AlmacenDevocionales(args.base) as almacen:
+            resumen = exportar(almacen, args.salida, idioma=args.idioma, compression=args.compresion,
+                               compact=args.formato == "compacto")
+        completo = all(resumen["salidas"].values())
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+    return 0 if completo else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
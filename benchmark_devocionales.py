@@ -0,0 +1,336 @@
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+from escritura_json import COMPRESIONES, publicar_versionado, volcar_json
+from lectura_json import abrir_texto
+from referencias_biblicas import LIBROS_ES, limpiar_cache_referencias
+from registro_devocional import cargar_compacto
+from salidas_devocionales import SalidaExcluidos, SalidaTraducidos
+
+CARPETA_HERRAMIENTAS = os.path.dirname(os.path.abspath(__file__))
+
+
+def benchmark_formatos(ruta_json):
+    """
+    Reescribe un JSON de devocionales en cada formato de salida (indentado o compacto,
+    sin comprimir, gzip o xz) y mide los bytes en disco y el tiempo de carga de cada uno.
+    """
+    with abrir_texto(ruta_json) as f:
+        datos = json.load(f)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for compacto in (False, True):
+            for compresion in (None,) + COMPRESIONES:
+                modo = f"{'compacto' if compacto else 'indentado'}{'+' + compresion if compresion else ''}"
+                inicio = time.perf_counter()
+                ruta = publicar_versionado("benchmark", "json", carpeta,
+                                           lambda f: volcar_json(datos, f, compacto=compacto),
+                                           compresion=compresion)
+                escritura = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                with abrir_texto(ruta) as f:
+                    json.load(f)
+                carga = time.perf_counter() - inicio
+                resultados[modo] = {
+                    "bytes": os.path.getsize(ruta),
+                    "segundos_escritura": round(escritura, 4),
+                    "segundos_carga": round(carga, 4),
+                }
+    return resultados
+
+
+def benchmark_registros(rutas):
+    """
+    Carga los archivos indicados como dicts (json.load) y como registros compactos
+    (registro_devocional.cargar_compacto) y mide con tracemalloc la memoria que queda
+    retenida con todos los documentos cargados, el pico y el tiempo de carga.
+    La memoria de los registros compactos incluye la Referencia de cada uno.
+    """
+    resultados = {}
+    for modo, cargar in (("dicts", json.load), ("compactos", cargar_compacto)):
+        limpiar_cache_referencias()
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        documentos = []
+        for ruta in rutas:
+            try:
+                with abrir_texto(ruta) as f:
+                    documentos.append(cargar(f))
+            except ValueError:
+                pass
+        segundos = time.perf_counter() - inicio
+        # La caché de referencias se vacía para contar solo lo que retienen los registros.
+        limpiar_cache_referencias()
+        retenida, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del documentos
+        resultados[modo] = {"segundos_carga": round(segundos, 4), "memoria_retenida_bytes": retenida,
+                            "pico_memoria_bytes": pico}
+    resultados["reduccion_memoria"] = round(
+        1 - resultados["compactos"]["memoria_retenida_bytes"] / resultados["dicts"]["memoria_retenida_bytes"], 4)
+    return resultados
+
+
+def _devocional(rng, fecha, idioma, version, tamano):
+    libro = rng.choice(LIBROS_ES)
+    capitulo = rng.randint(1, 50)
+    inicio = rng.randint(1, 30)
+    referencia = f"{libro} {capitulo}:{inicio}" + (f"-{inicio + rng.randint(1, 4)}" if rng.random() < 0.3 else "")
+    return {
+        "id": f"{idioma}-{fecha}-{version}",
+        "date": fecha,
+        "language": idioma,
+        "version": version,
+        "versiculo": f'{referencia} {version}: "Texto del versículo"',
+        "reflexion": "".join(rng.choice("abcdefghijklmnopqrstuvwxyz      ") for _ in range(tamano)),
+        "oracion": "Amén",
+    }
+
+
+def _romper(texto, rng, cantidad=3):
+    """Agrega comas finales en algunos objetos para que el archivo necesite reparación."""
+    partes = texto.split('"Amén"\n')
+    rotas = set(rng.sample(range(len(partes) - 1), min(cantidad, len(partes) - 1)))
+    return "".join(parte + ('"Amén",\n' if i in rotas else '"Amén"\n')
+                   for i, parte in enumerate(partes[:-1])) + partes[-1]
+
+
+def generar_corpus(carpeta, anios=(2025,), idiomas=("es",), versiones=("RVR1960",), tamano=600,
+                   tasa_duplicados=0.1, proporcion_malformados=0.1, semilla=0):
+    """
+    Genera un corpus sintético de devocionales en carpeta: un archivo por (año, idioma)
+    con la estructura {"data": {idioma: {fecha: [un devocional por versión]}}}.
+
+    tamano es la cantidad de caracteres de la reflexión de cada devocional. Una fracción
+    tasa_duplicados de los devocionales se repite en un archivo adicional por idioma
+    (como cuando se vuelve a exportar un lote), y una fracción proporcion_malformados de
+    los archivos se escribe con comas finales para que el consolidador tenga que
+    repararlos. También escribe plano.json, la lista de devocionales en español que
+    espera el script de ajuste. La generación es determinista para una misma semilla.
+
+    Devuelve {"archivos": [...], "plano": ruta, "devocionales": n, "malformados": n}.
+    """
+    rng = random.Random(semilla)
+    os.makedirs(carpeta, exist_ok=True)
+    archivos = []
+    plano = []
+    total = 0
+    lotes = []
+    for idioma in idiomas:
+        repetidos = {}
+        for anio in anios:
+            fechas = {}
+            dia = date(anio, 1, 1)
+            while dia.year == anio:
+                fecha = dia.isoformat()
+                fechas[fecha] = [_devocional(rng, fecha, idioma, version, tamano) for version in versiones]
+                for devocional in fechas[fecha]:
+                    if rng.random() < tasa_duplicados:
+                        repetidos.setdefault(fecha, []).append(devocional)
+                dia += timedelta(days=1)
+            total += sum(len(lista) for lista in fechas.values())
+            if idioma == "es":
+                plano.extend(devocional for lista in fechas.values() for devocional in lista)
+            lotes.append((f"devocionales_{anio}_{idioma}.json", {"data": {idioma: fechas}}))
+        if repetidos:
+            total += sum(len(lista) for lista in repetidos.values())
+            lotes.append((f"devocionales_{idioma}_reexportado.json", {"data": {idioma: repetidos}}))
+
+    malformados = set(rng.sample(range(len(lotes)), round(len(lotes) * proporcion_malformados)))
+    for i, (nombre, datos) in enumerate(lotes):
+        texto = json.dumps(datos, ensure_ascii=False, indent=4)
+        if i in malformados:
+            texto = _romper(texto, rng)
+        ruta = os.path.join(carpeta, nombre)
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(texto)
+        archivos.append(ruta)
+
+    ruta_plano = os.path.join(carpeta, "plano.json")
+    with open(ruta_plano, "w", encoding="utf-8") as f:
+        json.dump(plano, f, ensure_ascii=False, indent=4)
+    return {"archivos": archivos, "plano": ruta_plano, "devocionales": total, "malformados": len(malformados)}
+
+
+def _cargar_herramienta(nombre_archivo, nombre_modulo):
+    """
+    Importa uno de los scripts de la carpeta (sus nombres no son módulos válidos). Se
+    registra en sys.modules con nombre_modulo para que pickle encuentre sus funciones al
+    mandarlas a los procesos del pool del consolidador.
+    """
+    if nombre_modulo in sys.modules:
+        return sys.modules[nombre_modulo]
+    spec = importlib.util.spec_from_file_location(nombre_modulo, os.path.join(CARPETA_HERRAMIENTAS, nombre_archivo))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre_modulo] = modulo
+    try:
+        spec.loader.exec_module(modulo)
+    except BaseException:
+        del sys.modules[nombre_modulo]
+        raise
+    return modulo
+
+
+def _medir(funcion, registros):
+    """
+    Ejecuta funcion() dos veces: una para el tiempo (sin tracemalloc, que lo distorsiona)
+    y otra con tracemalloc para el pico de memoria de Python. Los mensajes se descartan.
+    """
+    with redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+        tracemalloc.start()
+        try:
+            funcion()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "segundos": round(segundos, 4),
+        "registros": registros,
+        "registros_por_segundo": round(registros / segundos) if segundos else None,
+        "pico_memoria_bytes": pico,
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CARPETA_HERRAMIENTAS,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_suite(anios=(2025,), idiomas=("es",), versiones=("RVR1960",), tamano=600,
+                    tasa_duplicados=0.1, proporcion_malformados=0.1, semilla=0, workers=1):
+    """
+    Genera un corpus sintético y ejecuta sobre él, sin interfaz gráfica, las cuatro
+    herramientas: el consolidador, el ajuste para providers, la extracción de versículos
+    excluidos y el extractor para otros idiomas, y el consolidador con esas dos salidas
+    en la misma pasada (canal_unico). Devuelve los parámetros, el commit y,
+    por herramienta, los segundos, registros por segundo y pico de memoria (tracemalloc;
+    con workers > 1 solo cuenta el proceso principal).
+    En "registros" compara la memoria del corpus cargado como dicts y como registros
+    compactos (ver benchmark_registros).
+    """
+    consolidador = _cargar_herramienta("--conslidador archivos Json. V2.0.py", "consolidador")
+    ajuste = _cargar_herramienta("Ajuste de json para cumplir con formato providers.py", "ajuste_providers")
+    excluidos = _cargar_herramienta("--Excludes verses cargando archivo.py", "excludes_verses")
+    extractor = _cargar_herramienta("Extractor versiculos json anual para generar otros idiomasV1.0.py", "extractor_idiomas")
+
+    parametros = {
+        "anios": list(anios), "idiomas": list(idiomas), "versiones": list(versiones), "tamano": tamano,
+        "tasa_duplicados": tasa_duplicados, "proporcion_malformados": proporcion_malformados,
+        "semilla": semilla, "workers": workers,
+    }
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        corpus = generar_corpus(os.path.join(carpeta, "corpus"), anios, idiomas, versiones, tamano,
+                                tasa_duplicados, proporcion_malformados, semilla)
+        archivos = corpus["archivos"]
+        salida = os.path.join(carpeta, "salida")
+        with open(corpus["plano"], encoding="utf-8") as f:
+            cantidad_plano = len(json.load(f))
+
+        resultados["consolidador"] = _medir(
+            lambda: consolidador.consolidate_devotionals(archivos, salida, workers=workers), corpus["devocionales"])
+        resultados["ajuste_providers"] = _medir(
+            lambda: ajuste.adjust_json_for_multi_version(corpus["plano"], os.path.join(salida, "ajustado.json")),
+            cantidad_plano)
+        # Los archivos malformados no son JSON válido para estas dos herramientas y se omiten.
+        resultados["versiculos_excluidos"] = _medir(
+            lambda: excluidos.extraer_versiculos_excluidos(archivos, salida, log=lambda mensaje: None),
+            corpus["devocionales"])
+        # Solo la búsqueda de 'versiculo' sobre documentos ya cargados, sin la lectura.
+        documentos = []
+        for ruta in archivos:
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    documentos.append(json.load(f))
+            except ValueError:
+                pass
+        resultados["busqueda_versiculos"] = _medir(
+            lambda: [excluidos.buscar_versiculos(documento, [], lambda mensaje: None) for documento in documentos],
+            sum(len(lista) for documento in documentos for fechas in documento["data"].values()
+                for lista in fechas.values()))
+        resultados["extractor_idiomas"] = _medir(
+            lambda: extractor.procesar_lote(archivos, os.path.join(salida, "traducidos.json")),
+            corpus["devocionales"])
+        # El consolidador con los excluidos y las traducidas en la misma pasada.
+        resultados["canal_unico"] = _medir(
+            lambda: consolidador.consolidate_devotionals(
+                archivos, os.path.join(carpeta, "canal"), workers=workers,
+                salidas=[SalidaExcluidos(), SalidaTraducidos()]),
+            corpus["devocionales"])
+        registros = benchmark_registros(archivos)
+
+    return {
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parametros": parametros,
+        "corpus": {"archivos": len(corpus["archivos"]), "devocionales": corpus["devocionales"],
+                   "malformados": corpus["malformados"]},
+        "resultados": resultados,
+        "registros": registros,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las herramientas de devocionales.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    formatos = subparsers.add_parser("formatos", help="Compara tamaño y tiempos de los formatos de salida de un JSON")
+    formatos.add_argument("archivo", help="JSON de devocionales")
+
+    suite = subparsers.add_parser("suite", help="Genera un corpus sintético y mide las cuatro herramientas")
+    suite.add_argument("--anios", type=int, nargs="+", default=[2025])
+    suite.add_argument("--idiomas", nargs="+", default=["es"])
+    suite.add_argument("--versiones", nargs="+", default=["RVR1960"])
+    suite.add_argument("--tamano", type=int, default=600, help="Caracteres de la reflexión de cada devocional")
+    suite.add_argument("--duplicados", type=float, default=0.1, help="Fracción de devocionales repetidos")
+    suite.add_argument("--malformados", type=float, default=0.1, help="Fracción de archivos con comas finales")
+    suite.add_argument("--semilla", type=int, default=0)
+    suite.add_argument("--workers", type=int, default=1, help="Procesos del consolidador")
+    suite.add_argument("-o", "--resultados", default=None, help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    if args.comando == "formatos":
+        for modo, datos in benchmark_formatos(args.archivo).items():
+            print(f"{modo:<20} {datos['bytes']:>12,} bytes  carga {datos['segundos_carga']:.4f} s  "
+                  f"escritura {datos['segundos_escritura']:.4f} s")
+        return 0
+
+    informe = benchmark_suite(args.anios, args.idiomas, args.versiones, args.tamano, args.duplicados,
+                              args.malformados, args.semilla, args.workers)
+    for herramienta, datos in informe["resultados"].items():
+        print(f"{herramienta:<22} {datos['segundos']:>9.4f} s  {datos['registros_por_segundo'] or 0:>10,} registros/s  "
+              f"pico {datos['pico_memoria_bytes'] / 1024 / 1024:>8.1f} MiB")
+    registros = informe["registros"]
+    for modo in ("dicts", "compactos"):
+        print(f"registros ({modo}){'':<{11 - len(modo)}} {registros[modo]['segundos_carga']:>9.4f} s  "
+              f"retenida {registros[modo]['memoria_retenida_bytes'] / 1024 / 1024:>8.1f} MiB")
+    print(f"reducción de memoria de los registros compactos: {registros['reduccion_memoria']:.1%}")
+    if args.resultados:
+        with open(args.resultados, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=4)
+        print(f"Resultados guardados en {args.resultados}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
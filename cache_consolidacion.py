@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+
+# Cambiar este valor invalida las cachés existentes (por ejemplo, si cambia la
+# forma de normalizar los versículos y las contribuciones guardadas ya no sirven).
+VERSION_CACHE = 4
+
+NOMBRE_MANIFIESTO = "manifiesto.json"
+CARPETA_CONTRIBUCIONES = "contribuciones"
+
+
+def hash_archivo(file_path, tamano_bloque=1024 * 1024):
+    """Hash blake2b del contenido de un archivo, leído por bloques."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _escribir_json(ruta, datos):
+    """Escribe un JSON en un temporal y lo publica con os.replace para no dejar archivos a medias."""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+class CacheConsolidacion:
+    """
+    Caché persistente de la consolidación. El manifiesto guarda, por cada archivo de
+    entrada, su tamaño, fecha de modificación y hash de contenido; la contribución ya
+    normalizada de cada contenido se guarda aparte con el hash como nombre.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.carpeta_contribuciones = os.path.join(cache_dir, CARPETA_CONTRIBUCIONES)
+        os.makedirs(self.carpeta_contribuciones, exist_ok=True)
+        self.ruta_manifiesto = os.path.join(cache_dir, NOMBRE_MANIFIESTO)
+        self.manifiesto = {"version": VERSION_CACHE, "archivos": {}, "ultima_ejecucion": None}
+        try:
+            with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+            if manifiesto.get("version") == VERSION_CACHE:
+                self.manifiesto = manifiesto
+        except (OSError, json.JSONDecodeError):
+            pass
+        self.cambios = False  # el manifiesto tiene modificaciones sin guardar
+        self.contenido_nuevo = False  # algún archivo tuvo que procesarse de nuevo
+
+    def _ruta_contribucion(self, hash_contenido):
+        return os.path.join(self.carpeta_contribuciones, f"{hash_contenido}.json")
+
+    def buscar(self, file_path):
+        """
+        Devuelve la contribución guardada para el archivo si su contenido no cambió, o None.
+        Si el tamaño y la fecha coinciden con el manifiesto no se vuelve a leer el archivo;
+        si no coinciden se compara el hash del contenido.
+        """
+        clave = os.path.abspath(file_path)
+        entrada = self.manifiesto["archivos"].get(clave)
+        try:
+            estado = os.stat(file_path)
+        except OSError:
+            return None
+        if entrada is None:
+            return None
+        if (entrada["size"], entrada["mtime_ns"]) != (estado.st_size, estado.st_mtime_ns):
+            if entrada["size"] != estado.st_size or hash_archivo(file_path) != entrada["hash"]:
+                return None
+            # Mismo contenido con otra fecha (p. ej. copiado de nuevo): solo se actualiza la huella.
+            entrada["mtime_ns"] = estado.st_mtime_ns
+            self.cambios = True
+        try:
+            with open(self._ruta_contribucion(entrada["hash"]), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def guardar(self, file_path, contribucion):
+        """Guarda la contribución de un archivo recién procesado y actualiza el manifiesto."""
+        estado = os.stat(file_path)
+        hash_contenido = hash_archivo(file_path)
+        _escribir_json(self._ruta_contribucion(hash_contenido), contribucion)
+        self.manifiesto["archivos"][os.path.abspath(file_path)] = {
+            "size": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+            "hash": hash_contenido,
+        }
+        self.cambios = True
+        self.contenido_nuevo = True
+
+    def salida_vigente(self, file_paths, output_dir, opciones=None):
+        """
+        Si ningún archivo cambió y las entradas, la carpeta de salida y las opciones de
+        escritura (compresión, formato compacto, shards, índice...) son las mismas de la
+        última ejecución, devuelve las rutas de salida de esa ejecución (si todavía existen);
+        si no, None.
+        """
+        ultima = self.manifiesto.get("ultima_ejecucion")
+        if self.contenido_nuevo or not ultima:
+            return None
+        if ultima["entradas"] != [os.path.abspath(p) for p in file_paths]:
+            return None
+        if ultima["output_dir"] != os.path.abspath(output_dir):
+            return None
+        if ultima.get("opciones") != (opciones or {}):
+            return None
+        if not all(os.path.exists(ruta) for ruta in ultima["salidas"]):
+            return None
+        return ultima["salidas"]
+
+    def registrar_ejecucion(self, file_paths, output_dir, salidas, opciones=None):
+        """
+        Recuerda qué entradas, con qué opciones, produjeron qué archivos de salida y
+        persiste el manifiesto. Si alguna salida no pudo escribirse (ruta None) se olvida
+        la última ejecución.
+        """
+        self.manifiesto["ultima_ejecucion"] = {
+            "entradas": [os.path.abspath(p) for p in file_paths],
+            "output_dir": os.path.abspath(output_dir),
+            "opciones": dict(opciones or {}),
+            "salidas": list(salidas),
+        } if all(salidas) else None
+        self.guardar_manifiesto()
+
+    def guardar_manifiesto(self):
+        """Persiste el manifiesto y elimina las contribuciones que ya nadie referencia."""
+        _escribir_json(self.ruta_manifiesto, self.manifiesto)
+        en_uso = {f"{entrada['hash']}.json" for entrada in self.manifiesto["archivos"].values()}
+        for nombre in os.listdir(self.carpeta_contribuciones):
+            if nombre not in en_uso:
+                try:
+                    os.remove(os.path.join(self.carpeta_contribuciones, nombre))
+                except OSError:
+                    pass
+        self.cambios = False
@@ -0,0 +1,276 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Catálogo multilingüe de los 66 libros en el orden del canon protestante. El índice + 1
+# es el identificador numérico del libro que usan todas las herramientas. Cada idioma es
+# solo una entrada de datos: su nombre para mostrar, los 66 nombres en orden, las
+# abreviaturas habituales (también en orden, o None) y alias sueltos {variante: id}.
+# Agregar un idioma no requiere código nuevo.
+LIBROS_ES = [
+    "Génesis", "Éxodo", "Levítico", "Números", "Deuteronomio", "Josué", "Jueces", "Rut",
+    "1 Samuel", "2 Samuel", "1 Reyes", "2 Reyes", "1 Crónicas", "2 Crónicas", "Esdras",
+    "Nehemías", "Ester", "Job", "Salmos", "Proverbios", "Eclesiastés", "Cantares", "Isaías",
+    "Jeremías", "Lamentaciones", "Ezequiel", "Daniel", "Oseas", "Joel", "Amós", "Abdías",
+    "Jonás", "Miqueas", "Nahúm", "Habacuc", "Sofonías", "Hageo", "Zacarías", "Malaquías",
+    "Mateo", "Marcos", "Lucas", "Juan", "Hechos", "Romanos", "1 Corintios", "2 Corintios",
+    "Gálatas", "Efesios", "Filipenses", "Colosenses", "1 Tesalonicenses", "2 Tesalonicenses",
+    "1 Timoteo", "2 Timoteo", "Tito", "Filemón", "Hebreos", "Santiago", "1 Pedro", "2 Pedro",
+    "1 Juan", "2 Juan", "3 Juan", "Judas", "Apocalipsis",
+]
+
+CATALOGO = {
+    "es": {
+        "idioma": "ESPAÑOL",
+        "libros": LIBROS_ES,
+        "abreviaturas": [
+            "Gn", "Éx", "Lv", "Nm", "Dt", "Jos", "Jue", "Rt", "1 S", "2 S", "1 R", "2 R", "1 Cr",
+            "2 Cr", "Esd", "Neh", "Est", "Job", "Sal", "Pr", "Ec", "Cnt", "Is", "Jer", "Lm", "Ez",
+            "Dn", "Os", "Jl", "Am", "Abd", "Jon", "Mi", "Nah", "Hab", "Sof", "Hag", "Zac", "Mal",
+            "Mt", "Mr", "Lc", "Jn", "Hch", "Ro", "1 Co", "2 Co", "Gá", "Ef", "Fil", "Col", "1 Ts",
+            "2 Ts", "1 Ti", "2 Ti", "Tit", "Flm", "He", "Stg", "1 P", "2 P", "1 Jn", "2 Jn", "3 Jn",
+            "Jud", "Ap",
+        ],
+        "alias": {"Salmo": 19, "Cantar de los Cantares": 22, "Cantar": 22},
+    },
+    "en": {
+        "idioma": "INGLÉS",
+        "libros": [
+            "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy", "Joshua", "Judges", "Ruth",
+            "1 Samuel", "2 Samuel", "1 Kings", "2 Kings", "1 Chronicles", "2 Chronicles", "Ezra",
+            "Nehemiah", "Esther", "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon",
+            "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel", "Amos",
+            "Obadiah", "Jonah", "Micah", "Nahum", "Habakkuk", "Zephaniah", "Haggai", "Zechariah",
+            "Malachi", "Matthew", "Mark", "Luke", "John", "Acts", "Romans", "1 Corinthians",
+            "2 Corinthians", "Galatians", "Ephesians", "Philippians", "Colossians",
+            "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy", "Titus", "Philemon",
+            "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John", "3 John", "Jude",
+            "Revelation",
+        ],
+        "abreviaturas": [
+            "Gen", "Exod", "Lev", "Num", "Deut", "Josh", "Judg", "Ruth", "1 Sam", "2 Sam", "1 Kgs",
+            "2 Kgs", "1 Chr", "2 Chr", "Ezra", "Neh", "Esth", "Job", "Ps", "Prov", "Eccl", "Song",
+            "Isa", "Jer", "Lam", "Ezek", "Dan", "Hos", "Joel", "Amos", "Obad", "Jonah", "Mic", "Nah",
+            "Hab", "Zeph", "Hag", "Zech", "Mal", "Matt", "Mark", "Luke", "John", "Acts", "Rom",
+            "1 Cor", "2 Cor", "Gal", "Eph", "Phil", "Col", "1 Thess", "2 Thess", "1 Tim", "2 Tim",
+            "Titus", "Phlm", "Heb", "Jas", "1 Pet", "2 Pet", "1 John", "2 John", "3 John", "Jude",
+            "Rev",
+        ],
+        "alias": {"Psalm": 19, "Song of Songs": 22, "Canticles": 22, "Revelations": 66},
+    },
+    "pt": {
+        "idioma": "PORTUGUÉS",
+        "libros": [
+            "Gênesis", "Êxodo", "Levítico", "Números", "Deuteronômio", "Josué", "Juízes", "Rute",
+            "1 Samuel", "2 Samuel", "1 Reis", "2 Reis", "1 Crônicas", "2 Crônicas", "Esdras",
+            "Neemias", "Ester", "Jó", "Salmos", "Provérbios", "Eclesiastes", "Cânticos", "Isaías",
+            "Jeremias", "Lamentações", "Ezequiel", "Daniel", "Oséias", "Joel", "Amós", "Obadias",
+            "Jonas", "Miquéias", "Naum", "Habacuque", "Sofonias", "Ageu", "Zacarias", "Malaquias",
+            "Mateus", "Marcos", "Lucas", "João", "Atos", "Romanos", "1 Coríntios", "2 Coríntios",
+            "Gálatas", "Efésios", "Filipenses", "Colossenses", "1 Tessalonicenses",
+            "2 Tessalonicenses", "1 Timóteo", "2 Timóteo", "Tito", "Filemon", "Hebreus", "Tiago",
+            "1 Pedro", "2 Pedro", "1 João", "2 João", "3 João", "Judas", "Apocalipse",
+        ],
+        "abreviaturas": [
+            "Gn", "Êx", "Lv", "Nm", "Dt", "Js", "Jz", "Rt", "1 Sm", "2 Sm", "1 Rs", "2 Rs", "1 Cr",
+            "2 Cr", "Ed", "Ne", "Et", "Jó", "Sl", "Pv", "Ec", "Ct", "Is", "Jr", "Lm", "Ez", "Dn",
+            "Os", "Jl", "Am", "Ob", "Jn", "Mq", "Na", "Hc", "Sf", "Ag", "Zc", "Ml", "Mt", "Mc", "Lc",
+            "Jo", "At", "Rm", "1 Co", "2 Co", "Gl", "Ef", "Fp", "Cl", "1 Ts", "2 Ts", "1 Tm", "2 Tm",
+            "Tt", "Fm", "Hb", "Tg", "1 Pe", "2 Pe", "1 Jo", "2 Jo", "3 Jo", "Jd", "Ap",
+        ],
+        "alias": {"Salmo": 19, "Cantares": 22, "Oseias": 28, "Miqueias": 33},
+    },
+    "fr": {
+        "idioma": "FRANCÉS",
+        "libros": [
+            "Genèse", "Exode", "Lévitique", "Nombres", "Deutéronome", "Josué", "Juges", "Ruth",
+            "1 Samuel", "2 Samuel", "1 Rois", "2 Rois", "1 Chroniques", "2 Chroniques", "Esdras",
+            "Néhémie", "Esther", "Job", "Psaumes", "Proverbes", "Ecclésiaste",
+            "Cantique des Cantiques", "Ésaïe", "Jérémie", "Lamentations", "Ézéchiel", "Daniel",
+            "Osée", "Joël", "Amos", "Abdias", "Jonas", "Michée", "Nahum", "Habacuc", "Sophonie",
+            "Aggée", "Zacharie", "Malachie", "Matthieu", "Marc", "Luc", "Jean", "Actes", "Romains",
+            "1 Corinthiens", "2 Corinthiens", "Galates", "Éphésiens", "Philippiens", "Colossiens",
+            "1 Thessaloniciens", "2 Thessaloniciens", "1 Timothée", "2 Timothée", "Tite",
+            "Philémon", "Hébreux", "Jacques", "1 Pierre", "2 Pierre", "1 Jean", "2 Jean", "3 Jean",
+            "Jude", "Apocalypse",
+        ],
+        "abreviaturas": [
+            "Gn", "Ex", "Lv", "Nb", "Dt", "Jos", "Jg", "Rt", "1 S", "2 S", "1 R", "2 R", "1 Ch",
+            "2 Ch", "Esd", "Né", "Est", "Jb", "Ps", "Pr", "Ec", "Ct", "Es", "Jr", "Lm", "Ez", "Dn",
+            "Os", "Jl", "Am", "Ab", "Jon", "Mi", "Na", "Ha", "So", "Ag", "Za", "Ml", "Mt", "Mc",
+            "Lc", "Jn", "Ac", "Rm", "1 Co", "2 Co", "Ga", "Ep", "Ph", "Col", "1 Th", "2 Th", "1 Tm",
+            "2 Tm", "Tt", "Phm", "He", "Jc", "1 P", "2 P", "1 Jn", "2 Jn", "3 Jn", "Jude", "Ap",
+        ],
+        "alias": {"Psaume": 19, "Cantique": 22, "Isaïe": 23},
+    },
+    "zh": {
+        "idioma": "CHINO (简体中文)",
+        "libros": [
+            "创世记", "出埃及记", "利未记", "民数记", "申命记", "约书亚记", "士师记", "路得记",
+            "撒母耳记上", "撒母耳记下", "列王纪上", "列王纪下", "历代志上", "历代志下", "以斯拉记",
+            "尼希米记", "以斯帖记", "约伯记", "诗篇", "箴言", "传道书", "雅歌", "以赛亚书", "耶利米书",
+            "耶利米哀歌", "以西结书", "但以理书", "何西阿书", "约珥书", "阿摩司书", "俄巴底亚书",
+            "约拿书", "弥迦书", "那鸿书", "哈巴谷书", "西番雅书", "哈该书", "撒迦利亚书", "玛拉基书",
+            "马太福音", "马可福音", "路加福音", "约翰福音", "使徒行传", "罗马书", "哥林多前书",
+            "哥林多后书", "加拉太书", "以弗所书", "腓立比书", "歌罗西书", "帖撒罗尼迦前书",
+            "帖撒罗尼迦后书", "提摩太前书", "提摩太后书", "提多书", "腓利门书", "希伯来书", "雅各书",
+            "彼得前书", "彼得后书", "约翰一书", "约翰二书", "约翰三书", "犹大书", "启示录",
+        ],
+        "abreviaturas": [
+            "创", "出", "利", "民", "申", "书", "士", "得", "撒上", "撒下", "王上", "王下", "代上",
+            "代下", "拉", "尼", "斯", "伯", "诗", "箴", "传", "歌", "赛", "耶", "哀", "结", "但",
+            "何", "珥", "摩", "俄", "拿", "弥", "鸿", "哈", "番", "该", "亚", "玛", "太", "可", "路",
+            "约", "徒", "罗", "林前", "林后", "加", "弗", "腓", "西", "帖前", "帖后", "提前", "提后",
+            "多", "门", "来", "雅", "彼前", "彼后", "约壹", "约贰", "约叁", "犹", "启",
+        ],
+        "alias": {},
+    },
+    "ja": {
+        "idioma": "JAPONÉS (日本語)",
+        "libros": [
+            "創世記", "出エジプト記", "レビ記", "民数記", "申命記", "ヨシュア記", "士師記", "ルツ記",
+            "サムエル記第一", "サムエル記第二", "列王記第一", "列王記第二", "歴代誌第一", "歴代誌第二",
+            "エズラ記", "ネヘミヤ記", "エステル記", "ヨブ記", "詩篇", "箴言", "伝道者の書", "雅歌",
+            "イザヤ書", "エレミヤ書", "哀歌", "エゼキエル書", "ダニエル書", "ホセア書", "ヨエル書",
+            "アモス書", "オバデヤ書", "ヨナ書", "ミカ書", "ナホム書", "ハバクク書", "ゼパニヤ書",
+            "ハガイ書", "ゼカリヤ書", "マラキ書", "マタイの福音書", "マルコの福音書", "ルカの福音書",
+            "ヨハネの福音書", "使徒の働き", "ローマ人への手紙", "コリント人への手紙第一",
+            "コリント人への手紙第二", "ガラテヤ人への手紙", "エペソ人への手紙", "ピリピ人への手紙",
+            "コロサイ人への手紙", "テサロニケ人への手紙第一", "テサロニケ人への手紙第二",
+            "テモテへの手紙第一", "テモテへの手紙第二", "テトスへの手紙", "ピレモンへの手紙",
+            "ヘブル人への手紙", "ヤコブの手紙", "ペテロの手紙第一", "ペテロの手紙第二",
+            "ヨハネの手紙第一", "ヨハネの手紙第二", "ヨハネの手紙第三", "ユダの手紙", "ヨハネの黙示録",
+        ],
+        "abreviaturas": None,
+        "alias": {"使徒行伝": 44, "ヨハネの黙示": 66},
+    },
+}
+
+TOTAL_LIBROS = len(LIBROS_ES)
+IDIOMAS = tuple(CATALOGO)
+
+# Nombres precalculados por idioma: traducir un libro es NOMBRES_POR_IDIOMA[idioma][book_id - 1].
+NOMBRES_POR_IDIOMA = {idioma: tuple(datos["libros"]) for idioma, datos in CATALOGO.items()}
+
+for _idioma, _datos in CATALOGO.items():
+    if len(_datos["libros"]) != TOTAL_LIBROS or len(_datos["abreviaturas"] or _datos["libros"]) != TOTAL_LIBROS:
+        raise ValueError(f"El catálogo de '{_idioma}' no tiene los {TOTAL_LIBROS} libros")
+
+
+def clave_libro(nombre):
+    """Forma canónica de un nombre de libro: sin acentos, sin puntos ni espacios, en minúsculas."""
+    sin_acentos = unicodedata.normalize("NFD", nombre)
+    sin_acentos = "".join(c for c in sin_acentos if not unicodedata.combining(c))
+    return re.sub(r"[\s.]+", "", sin_acentos).casefold()
+
+
+@lru_cache(maxsize=4096)
+def _normalizar_caracter(c):
+    """La parte de clave_libro que corresponde a un solo carácter ('' si se ignora)."""
+    return clave_libro(c)
+
+
+def _variantes(datos):
+    """Nombres, alias y abreviaturas de un idioma como (texto, book_id), en orden de prioridad."""
+    for i, nombre in enumerate(datos["libros"]):
+        yield nombre, i + 1
+    yield from datos["alias"].items()
+    for i, abreviatura in enumerate(datos["abreviaturas"] or ()):
+        yield abreviatura, i + 1
+
+
+# Trie de todas las variantes de todos los idiomas, con las claves ya normalizadas. Cada
+# nodo es un dict carácter -> nodo; el que termina una variante guarda en la clave "" un
+# dict {idioma: book_id}. Dentro de un idioma gana la primera variante: un nombre completo
+# tiene prioridad sobre una abreviatura que se normalice igual (en portugués 'Jó' frente a
+# 'Jo', de João).
+_TRIE = {}
+for _idioma, _datos in CATALOGO.items():
+    for _texto, _book_id in _variantes(_datos):
+        _nodo = _TRIE
+        for _c in clave_libro(_texto):
+            _nodo = _nodo.setdefault(_c, {})
+        _nodo.setdefault("", {}).setdefault(_idioma, _book_id)
+
+
+def _elegir(idiomas, idioma):
+    """
+    El libro de un nodo final: el del idioma preferido si lo tiene; si no, el único al
+    que apuntan todos los idiomas. None si la variante es ambigua ('Jn' es Juan en
+    español y Jonás en portugués).
+    """
+    if idioma in idiomas:
+        return idiomas[idioma]
+    ids = set(idiomas.values())
+    return ids.pop() if len(ids) == 1 else None
+
+
+def _es_ancho(c):
+    return unicodedata.east_asian_width(c) in "WF"
+
+
+def _coincidencias(texto, inicio):
+    """
+    Recorre el trie una sola vez desde texto[inicio] y produce ({idioma: book_id}, fin)
+    por cada variante reconocida, de la más corta a la más larga. Ignora acentos,
+    mayúsculas, espacios y puntos como clave_libro. En alfabetos con espacios la
+    variante debe terminar en un límite de palabra ('Juan' no se reconoce dentro de
+    'Juana'); en chino y japonés no hace falta.
+    """
+    nodo = _TRIE
+    for posicion in range(inicio, len(texto)):
+        normalizado = _normalizar_caracter(texto[posicion])
+        for c in normalizado:
+            nodo = nodo.get(c)
+            if nodo is None:
+                return
+        if not normalizado or "" not in nodo:
+            continue
+        siguiente = texto[posicion + 1] if posicion + 1 < len(texto) else ""
+        if siguiente.isalpha() and not (_es_ancho(siguiente) or _es_ancho(texto[posicion])):
+            continue
+        yield nodo[""], posicion + 1
+
+
+def resolver_libro(texto, inicio=0, idioma=None):
+    """
+    Reconoce el nombre de libro más largo que empieza en texto[inicio:], en cualquier
+    idioma del catálogo. Devuelve (book_id, fin) con fin el índice siguiente al nombre,
+    o None. idioma desempata las variantes ambiguas.
+    """
+    encontrado = None
+    for idiomas, fin in _coincidencias(texto, inicio):
+        book_id = _elegir(idiomas, idioma)
+        if book_id is not None:
+            encontrado = (book_id, fin)
+    return encontrado
+
+
+def idiomas_del_libro(texto, inicio=0):
+    """
+    Idiomas del catálogo en los que el nombre de libro más largo al inicio del texto es
+    válido (ej. 'Jean 3:16' -> {'fr'}, 'Daniel 2' -> {'es', 'en', 'pt', 'fr'}). Conjunto
+    vacío si no hay.
+    """
+    # _coincidencias va de la más corta a la más larga: queda la última
+    ultimo = set()
+    for idiomas, _ in _coincidencias(texto, inicio):
+        ultimo = idiomas
+    return set(ultimo)
+
+
+def id_por_nombre(nombre, idioma=None):
+    """Identificador del libro cuyo nombre (o alias o abreviatura) es exactamente `nombre`, o None."""
+    nodo = _TRIE
+    for c in clave_libro(nombre):
+        nodo = nodo.get(c)
+        if nodo is None:
+            return None
+    return _elegir(nodo[""], idioma) if "" in nodo else None
+
+
+def nombre_en(book_id, idioma):
+    """Nombre de un libro del catálogo en el idioma indicado, o None si el libro no está."""
+    if 1 <= book_id <= TOTAL_LIBROS:
+        return NOMBRES_POR_IDIOMA[idioma][book_id - 1]
+    return None
@@ -0,0 +1,312 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+from escritura_json import abrir_salida, compresion_por_extension, escribir_comprimido, volcar_devocionales, volcar_json
+from lectura_json import abrir_texto
+from registro_devocional import como_json
+
+# Cambiar este valor invalida los deltas ya publicados (aplicar_delta los rechaza).
+FORMATO_DELTA = 1
+
+
+def ruta_delta(ruta):
+    """Ruta del delta de una salida: devocionales_X.json(.gz) -> devocionales_X.delta.json(.gz)."""
+    compresion = compresion_por_extension(ruta)
+    extension = f".{compresion}" if compresion else ""
+    base = ruta[:-len(extension)] if extension else ruta
+    if base.endswith(".json"):
+        base = base[:-len(".json")]
+    return f"{base}.delta.json{extension}"
+
+
+def _leer(ruta):
+    """
+    Lee un archivo consolidado {"data": {idioma: {fecha: [devocionales]}}} (comprimido o
+    no) y devuelve sus bytes sin comprimir y el dict de idiomas.
+    """
+    with abrir_texto(ruta) as f:
+        contenido = f.buffer.read()
+    datos = json.loads(contenido)
+    idiomas = datos.get("data") if isinstance(datos, dict) and list(datos) == ["data"] else None
+    if not isinstance(idiomas, dict) or not all(
+            isinstance(fechas, dict) and all(isinstance(lista, list) for lista in fechas.values())
+            for fechas in idiomas.values()):
+        raise ValueError(f"'{ruta}' no tiene la estructura {{\"data\": {{idioma: {{fecha: [...]}}}}}}")
+    return contenido, idiomas
+
+
+def _hash_archivo(contenido):
+    return "sha256:" + hashlib.sha256(contenido).hexdigest()
+
+
+def _huella(devocionales):
+    """Hash del contenido tal como se escribe (respeta el orden de las claves)."""
+    texto = json.dumps(devocionales, ensure_ascii=False, separators=(",", ":"), default=como_json)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _version(devocional):
+    """La versión con la que se identifica un devocional en el delta (None si no tiene)."""
+    version = devocional.get("version") if isinstance(devocional, dict) else None
+    if version is None or type(version) is str:
+        return version
+    return json.dumps(version, ensure_ascii=False, sort_keys=True)
+
+
+def _agrupar(devocionales):
+    """La versión de cada devocional, en orden, y {versión: [devocionales]}."""
+    versiones = [_version(devocional) for devocional in devocionales]
+    grupos = {}
+    for version, devocional in zip(versiones, devocionales):
+        grupos.setdefault(version, []).append(devocional)
+    return versiones, grupos
+
+
+def _orden_por_defecto(versiones_anteriores, grupos):
+    """
+    Orden de una fecha al aplicar el delta si no trae uno explícito: el anterior para
+    las versiones que siguen y, al final, lo que sobra de cada grupo en el orden de grupos.
+    """
+    restantes = {version: len(lista) for version, lista in grupos.items()}
+    orden = []
+    for version in versiones_anteriores:
+        if restantes.get(version):
+            orden.append(version)
+            restantes[version] -= 1
+    for version, cantidad in restantes.items():
+        orden.extend([version] * cantidad)
+    return orden
+
+
+def crear_delta(ruta_anterior, ruta_nueva):
+    """
+    Compara dos archivos consolidados y devuelve el delta que transforma el anterior en
+    el nuevo. Cada devocional se identifica por (idioma, fecha, versión); si una fecha
+    tiene varios con la misma versión, van juntos en la misma entrada. El delta lista:
+
+    - agregados, modificados y eliminados: {idioma, fecha, version, hash} (más
+      hash_anterior en los modificados) y, salvo en los eliminados, los devocionales.
+    - fechas_agregadas y fechas_eliminadas, para las fechas que aparecen o desaparecen
+      (también las que no tienen devocionales).
+    - orden: el orden de las versiones de una fecha cuando no es el que resulta por
+      defecto (el anterior, con lo nuevo al final); orden_fechas, el de las fechas de un
+      idioma cuando no están ordenadas.
+
+    anterior y nuevo llevan el hash sha256 de cada archivo (sin comprimir); nuevo además
+    los idiomas y el formato (indentado o compacto), para reconstruirlo byte a byte.
+    """
+    contenido_anterior, anterior = _leer(ruta_anterior)
+    contenido_nuevo, nuevo = _leer(ruta_nueva)
+
+    delta = {
+        "formato": FORMATO_DELTA,
+        "anterior": {"archivo": os.path.basename(ruta_anterior), "hash": _hash_archivo(contenido_anterior)},
+        "nuevo": {"archivo": os.path.basename(ruta_nueva), "hash": _hash_archivo(contenido_nuevo),
+                  "compacto": contenido_nuevo.startswith(b'{"data":'), "idiomas": list(nuevo)},
+        "agregados": [],
+        "modificados": [],
+        "eliminados": [],
+        "fechas_agregadas": [],
+        "fechas_eliminadas": [],
+        "orden": [],
+        "orden_fechas": {},
+    }
+
+    for idioma, fechas in anterior.items():
+        fechas_nuevas = nuevo.get(idioma, {})
+        for fecha, lista in fechas.items():
+            if fecha in fechas_nuevas:
+                continue
+            delta["fechas_eliminadas"].append({"idioma": idioma, "fecha": fecha})
+            for version, grupo in _agrupar(lista)[1].items():
+                delta["eliminados"].append({"idioma": idioma, "fecha": fecha, "version": version,
+                                            "hash": _huella(grupo)})
+
+    for idioma, fechas in nuevo.items():
+        if list(fechas) != sorted(fechas):
+            delta["orden_fechas"][idioma] = list(fechas)
+        fechas_anteriores = anterior.get(idioma, {})
+        for fecha, lista in fechas.items():
+            if fecha in fechas_anteriores:
+                versiones_anteriores, grupos_anteriores = _agrupar(fechas_anteriores[fecha])
+            else:
+                delta["fechas_agregadas"].append({"idioma": idioma, "fecha": fecha})
+                versiones_anteriores, grupos_anteriores = [], {}
+            versiones, grupos = _agrupar(lista)
+
+            # Los grupos como quedan al aplicar el delta: modificados en su lugar, nuevos al final
+            reconstruidos = {}
+            for version, grupo in grupos_anteriores.items():
+                if version not in grupos:
+                    delta["eliminados"].append({"idioma": idioma, "fecha": fecha, "version": version,
+                                                "hash": _huella(grupo)})
+                    continue
+                huella_anterior, huella = _huella(grupo), _huella(grupos[version])
+                if huella != huella_anterior:
+                    delta["modificados"].append({"idioma": idioma, "fecha": fecha, "version": version,
+                                                 "hash_anterior": huella_anterior, "hash": huella,
+                                                 "devocionales": grupos[version]})
+                reconstruidos[version] = grupos[version]
+            for version, grupo in grupos.items():
+                if version not in grupos_anteriores:
+                    delta["agregados"].append({"idioma": idioma, "fecha": fecha, "version": version,
+                                               "hash": _huella(grupo), "devocionales": grupo})
+                    reconstruidos[version] = grupo
+
+            if _orden_por_defecto(versiones_anteriores, reconstruidos) != versiones:
+                delta["orden"].append({"idioma": idioma, "fecha": fecha, "versiones": versiones})
+    return delta
+
+
+def reconstruir(anterior, delta):
+    """
+    Aplica el delta a los idiomas del archivo anterior (el dict bajo "data", que se
+    modifica) y devuelve los bytes sin comprimir del archivo nuevo. Lanza ValueError si
+    el delta no encaja con los datos o si el resultado no coincide con el hash del nuevo.
+    """
+    if delta.get("formato") != FORMATO_DELTA:
+        raise ValueError(f"Formato de delta desconocido: {delta.get('formato')}")
+
+    grupos = {}  # (idioma, fecha) -> (versiones anteriores, {versión: [devocionales]})
+    fechas = {idioma: dict.fromkeys(anterior.get(idioma, {})) for idioma in (*anterior, *delta["nuevo"]["idiomas"])}
+    for entrada in delta["fechas_eliminadas"]:
+        if fechas.get(entrada["idioma"], {}).pop(entrada["fecha"], False) is not None:
+            raise ValueError(f"El delta elimina una fecha que no existe: {entrada['idioma']} {entrada['fecha']}")
+    for entrada in delta["fechas_agregadas"]:
+        if entrada["idioma"] not in fechas or entrada["fecha"] in fechas[entrada["idioma"]]:
+            raise ValueError(f"El delta agrega una fecha que ya existe: {entrada['idioma']} {entrada['fecha']}")
+        fechas[entrada["idioma"]][entrada["fecha"]] = None
+
+    def grupos_de(idioma, fecha):
+        clave = (idioma, fecha)
+        if clave not in grupos:
+            grupos[clave] = _agrupar(anterior.get(idioma, {}).get(fecha, []))
+        return grupos[clave][1]
+
+    for entrada in delta["eliminados"]:
+        grupo = grupos_de(entrada["idioma"], entrada["fecha"]).pop(entrada["version"], None)
+        if grupo is None or _huella(grupo) != entrada["hash"]:
+            raise ValueError(f"El delta no corresponde al archivo anterior: {entrada['idioma']} {entrada['fecha']} "
+                             f"{entrada['version']}")
+    for entrada in delta["modificados"]:
+        actuales = grupos_de(entrada["idioma"], entrada["fecha"])
+        if entrada["version"] not in actuales or _huella(actuales[entrada["version"]]) != entrada["hash_anterior"]:
+            raise ValueError(f"El delta no corresponde al archivo anterior: {entrada['idioma']} {entrada['fecha']} "
+                             f"{entrada['version']}")
+        actuales[entrada["version"]] = entrada["devocionales"]
+    for entrada in delta["agregados"]:
+        if entrada["fecha"] not in fechas.get(entrada["idioma"], {}):
+            raise ValueError(f"El delta agrega devocionales a una fecha inexistente: {entrada['idioma']} {entrada['fecha']}")
+        grupos_de(entrada["idioma"], entrada["fecha"])[entrada["version"]] = entrada["devocionales"]
+    ordenes = {(entrada["idioma"], entrada["fecha"]): entrada["versiones"] for entrada in delta["orden"]}
+
+    def lista_de(idioma, fecha):
+        clave = (idioma, fecha)
+        if clave not in grupos and clave not in ordenes:
+            return anterior.get(idioma, {}).get(fecha, [])
+        grupos_de(idioma, fecha)
+        versiones_anteriores, por_version = grupos[clave]
+        orden = ordenes.get(clave) or _orden_por_defecto(versiones_anteriores, por_version)
+        pendientes = {version: iter(grupo) for version, grupo in por_version.items()}
+        try:
+            return [next(pendientes[version]) for version in orden]
+        except (KeyError, StopIteration):
+            raise ValueError(f"El orden del delta no corresponde a los devocionales de {idioma} {fecha}") from None
+
+    def fechas_de(idioma):
+        orden = delta["orden_fechas"].get(idioma) or sorted(fechas[idioma])
+        return [(fecha, lista_de(idioma, fecha)) for fecha in orden]
+
+    buffer = io.StringIO()
+    volcar_devocionales(buffer, [(idioma, fechas_de(idioma)) for idioma in delta["nuevo"]["idiomas"]],
+                        compacto=delta["nuevo"]["compacto"])
+    contenido = buffer.getvalue().encode("utf-8")
+    if _hash_archivo(contenido) != delta["nuevo"]["hash"]:
+        raise ValueError("El resultado de aplicar el delta no coincide con el hash del archivo nuevo")
+    return contenido
+
+
+def resumir(delta):
+    """Cantidad de entradas de cada tipo de un delta."""
+    return {clave: len(delta[clave]) for clave in ("agregados", "modificados", "eliminados",
+                                                   "fechas_agregadas", "fechas_eliminadas")}
+
+
+def escribir_delta(ruta_anterior, ruta_nueva, ruta=None):
+    """
+    Crea el delta entre dos archivos consolidados y lo escribe en JSON compacto en ruta
+    (por defecto ruta_delta(ruta_nueva); comprimido si termina en .gz o .xz). Antes de
+    escribirlo se comprueba que aplicarlo al anterior reproduce el nuevo byte a byte.
+    Devuelve (ruta, delta).
+    """
+    if ruta is None:
+        ruta = ruta_delta(ruta_nueva)
+    delta = crear_delta(ruta_anterior, ruta_nueva)
+    reconstruir(_leer(ruta_anterior)[1], delta)
+    with abrir_salida(ruta) as f:
+        volcar_json(delta, f, compacto=True)
+    return ruta, delta
+
+
+def aplicar_delta(ruta_anterior, ruta_delta_entrada, ruta_salida):
+    """
+    Reconstruye el archivo nuevo a partir del anterior y el delta y lo escribe en
+    ruta_salida (comprimido si termina en .gz o .xz). Lanza ValueError si el delta se
+    creó sobre otro archivo o el resultado no coincide con el nuevo. Devuelve la ruta.
+    """
+    with abrir_texto(ruta_delta_entrada) as f:
+        delta = json.load(f)
+    contenido, anterior = _leer(ruta_anterior)
+    if _hash_archivo(contenido) != delta.get("anterior", {}).get("hash"):
+        raise ValueError(f"El delta se creó sobre otro archivo, no sobre '{ruta_anterior}'")
+    escribir_comprimido(ruta_salida, reconstruir(anterior, delta))
+    return ruta_salida
+
+
+def main(argv=None):
+    """
+    crear: escribe el delta entre dos archivos consolidados. aplicar: reconstruye el
+    nuevo desde el anterior y el delta. Los mensajes van a stderr y el resumen se imprime
+    en stdout como JSON. Código de salida: 0 si se escribió la salida, 1 si el delta no
+    corresponde o no pudo escribirse, 2 si los argumentos no son válidos.
+    """
+    parser = argparse.ArgumentParser(description="Deltas entre versiones del JSON consolidado de devocionales.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    crear = subparsers.add_parser("crear", help="Escribir el delta entre dos archivos consolidados")
+    crear.add_argument("anterior", help="Archivo consolidado anterior")
+    crear.add_argument("nuevo", help="Archivo consolidado nuevo")
+    crear.add_argument("-o", "--salida", default=None, help="Archivo del delta (por defecto, junto al nuevo)")
+
+    aplicar = subparsers.add_parser("aplicar", help="Reconstruir el archivo nuevo desde el anterior y el delta")
+    aplicar.add_argument("anterior", help="Archivo consolidado anterior")
+    aplicar.add_argument("delta", help="Archivo del delta")
+    aplicar.add_argument("-o", "--salida", required=True, help="Archivo reconstruido")
+    args = parser.parse_args(argv)
+
+    for ruta in (args.anterior, args.nuevo if args.comando == "crear" else args.delta):
+        if not os.path.exists(ruta):
+            parser.error(f"No existe '{ruta}'")
+
+    resumen = {"salida": None}
+    with redirect_stdout(sys.stderr):
+        try:
+            if args.comando == "crear":
+                resumen["salida"], delta = escribir_delta(args.anterior, args.nuevo, args.salida)
+                resumen.update(resumir(delta))
+            else:
+                resumen["salida"] = aplicar_delta(args.anterior, args.delta, args.salida)
+            print(f"✔ Guardado en: '{resumen['salida']}'")
+        except (OSError, ValueError) as e:
+            print(f"❌ ERROR: {e}")
+    print(json.dumps(resumen, ensure_ascii=False, indent=4))
+    return 0 if resumen["salida"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
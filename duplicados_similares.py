@@ -0,0 +1,153 @@
+import hashlib
+import re
+import struct
+import unicodedata
+
+# Campos de texto que se comparan: el cuerpo del devocional, no la referencia (que ya
+# se deduplica por fecha y versículo).
+CAMPOS_TEXTO = ("reflexion", "oracion")
+
+UMBRAL_POR_DEFECTO = 0.8
+
+# Palabras por shingle: con 3 un cambio aislado de palabra solo altera tres shingles.
+TAMANO_SHINGLE = 3
+
+# Cada blake2b de 64 bytes aporta 16 valores de 32 bits, así que la firma se arma con
+# NUM_PERMUTACIONES / 16 hashes por shingle (con distinta sal) en lugar de uno por permutación.
+NUM_PERMUTACIONES = 128
+_VALORES_POR_HASH = 16
+
+_PALABRA = re.compile(r"\w+")
+
+# Un candidato de más solo cuesta comparar dos firmas; un par que no llega a ser
+# candidato se pierde. Por eso al elegir las bandas pesan más los falsos negativos.
+_PESO_FALSOS_POSITIVOS = 0.1
+_PESO_FALSOS_NEGATIVOS = 0.9
+
+
+def _sales(num_permutaciones):
+    if num_permutaciones % _VALORES_POR_HASH:
+        raise ValueError(f"La cantidad de permutaciones debe ser múltiplo de {_VALORES_POR_HASH}")
+    return [i.to_bytes(16, "little") for i in range(num_permutaciones // _VALORES_POR_HASH)]
+
+
+def texto_devocional(devocional, campos=CAMPOS_TEXTO):
+    """Los campos de texto del devocional unidos (los que falten o no sean texto se ignoran)."""
+    return "\n".join(valor for valor in (devocional.get(campo) for campo in campos) if isinstance(valor, str))
+
+
+def shingles(texto, tamano=TAMANO_SHINGLE):
+    """
+    Conjunto de shingles de `tamano` palabras del texto, sin distinguir mayúsculas ni
+    tildes. Un texto más corto que un shingle produce un único shingle con todo el texto.
+    """
+    plano = "".join(c for c in unicodedata.normalize("NFKD", texto.casefold()) if not unicodedata.combining(c))
+    palabras = _PALABRA.findall(plano)
+    if len(palabras) <= tamano:
+        return {" ".join(palabras)} if palabras else set()
+    return {" ".join(palabras[i:i + tamano]) for i in range(len(palabras) - tamano + 1)}
+
+
+def firma_minhash(conjunto, num_permutaciones=NUM_PERMUTACIONES):
+    """
+    Firma MinHash de un conjunto de shingles: para cada una de las num_permutaciones
+    funciones de hash, el mínimo sobre todos los shingles. La fracción de posiciones
+    iguales entre dos firmas estima la similitud de Jaccard de los conjuntos.
+    """
+    sales = _sales(num_permutaciones)
+    enteros = struct.Struct(f"<{num_permutaciones}I")
+    filas = []
+    for shingle in conjunto:
+        datos = shingle.encode("utf-8")
+        filas.append(enteros.unpack(b"".join(hashlib.blake2b(datos, digest_size=64, salt=sal).digest()
+                                             for sal in sales)))
+    return tuple(map(min, zip(*filas)))
+
+
+def similitud_estimada(firma_a, firma_b):
+    """Similitud de Jaccard estimada a partir de dos firmas del mismo tamaño."""
+    return sum(a == b for a, b in zip(firma_a, firma_b)) / len(firma_a)
+
+
+def _integrar(funcion, desde, hasta, pasos=100):
+    """Integral aproximada por el método del punto medio."""
+    ancho = (hasta - desde) / pasos
+    return sum(funcion(desde + (i + 0.5) * ancho) for i in range(pasos)) * ancho
+
+
+def parametros_lsh(umbral, num_permutaciones=NUM_PERMUTACIONES):
+    """
+    Bandas y filas por banda para el umbral: dos firmas son candidatas si coinciden en
+    todas las filas de alguna banda, lo que ocurre con probabilidad 1 - (1 - s^filas)^bandas
+    para similitud s. Se elige la combinación que minimiza la suma ponderada de la
+    probabilidad de falsos positivos (s < umbral) y de falsos negativos (s >= umbral),
+    integradas sobre s.
+    """
+    if not 0 < umbral <= 1:
+        raise ValueError("El umbral de similitud debe estar entre 0 y 1")
+
+    def error(par):
+        bandas, filas = par
+        falsos_positivos = _integrar(lambda s: 1 - (1 - s ** filas) ** bandas, 0.0, umbral)
+        falsos_negativos = _integrar(lambda s: (1 - s ** filas) ** bandas, umbral, 1.0)
+        return _PESO_FALSOS_POSITIVOS * falsos_positivos + _PESO_FALSOS_NEGATIVOS * falsos_negativos
+
+    return min(((num_permutaciones // filas, filas) for filas in range(1, num_permutaciones + 1)), key=error)
+
+
+class IndiceLSH:
+    """
+    Índice LSH por bandas: cada firma se parte en bandas y cada banda se guarda en una
+    tabla hash. Buscar los candidatos de una firma cuesta una consulta por banda, sin
+    compararla contra todas las anteriores.
+    """
+
+    def __init__(self, umbral=UMBRAL_POR_DEFECTO, num_permutaciones=NUM_PERMUTACIONES):
+        self.bandas, self.filas = parametros_lsh(umbral, num_permutaciones)
+        self.cubetas = [{} for _ in range(self.bandas)]
+
+    def _bandas(self, firma):
+        for i in range(self.bandas):
+            yield self.cubetas[i], firma[i * self.filas:(i + 1) * self.filas]
+
+    def agregar(self, clave, firma):
+        for cubetas, banda in self._bandas(firma):
+            cubetas.setdefault(banda, []).append(clave)
+
+    def candidatos(self, firma):
+        """Claves ya agregadas que comparten al menos una banda con la firma."""
+        encontrados = {}
+        for cubetas, banda in self._bandas(firma):
+            for clave in cubetas.get(banda, ()):
+                encontrados[clave] = None
+        return list(encontrados)
+
+
+def buscar_casi_duplicados(elementos, umbral=UMBRAL_POR_DEFECTO, campos=CAMPOS_TEXTO,
+                           num_permutaciones=NUM_PERMUTACIONES):
+    """
+    Recorre elementos (clave, devocional) en orden y devuelve una lista de
+    (clave, clave_original, similitud) para cada devocional cuyo texto se parece al de
+    uno anterior con similitud estimada >= umbral. El original es el más parecido entre
+    los que se conservan: un casi duplicado no se agrega al índice, así que los que
+    quedan no se parecen entre sí. Los devocionales sin texto se ignoran.
+    """
+    indice = IndiceLSH(umbral, num_permutaciones)
+    firmas = {}
+    duplicados = []
+    for clave, devocional in elementos:
+        conjunto = shingles(texto_devocional(devocional, campos))
+        if not conjunto:
+            continue
+        firma = firma_minhash(conjunto, num_permutaciones)
+        mejor, similitud = None, 0.0
+        for candidato in indice.candidatos(firma):
+            estimada = similitud_estimada(firma, firmas[candidato])
+            if estimada > similitud:
+                mejor, similitud = candidato, estimada
+        if mejor is not None and similitud >= umbral:
+            duplicados.append((clave, mejor, similitud))
+            continue
+        firmas[clave] = firma
+        indice.agregar(clave, firma)
+    return duplicados
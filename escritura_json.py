@@ -0,0 +1,364 @@
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import tempfile
+from datetime import datetime
+from itertools import count
+
+from registro_devocional import como_json
+
+# Compresiones de salida admitidas (cada una es también la extensión que se agrega).
+COMPRESIONES = ("gz", "xz")
+
+
+def _leer_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# os.umask solo se puede leer cambiándola, y es un estado de todo el proceso: se lee una
+# vez al importar, antes de que las herramientas arranquen hilos que creen archivos.
+_UMASK = _leer_umask()
+
+
+def _temporal_en(directorio, nombre):
+    """
+    Crea un temporal exclusivo (mkstemp) en directorio para publicar luego nombre, con
+    los permisos habituales de un archivo nuevo (mkstemp lo crea solo para el usuario).
+    Devuelve (descriptor, ruta).
+    """
+    fd, temporal = tempfile.mkstemp(prefix=f".{nombre}_", suffix=".tmp", dir=directorio)
+    try:
+        os.chmod(temporal, 0o666 & ~_UMASK)
+    except BaseException:
+        os.close(fd)
+        os.remove(temporal)
+        raise
+    return fd, temporal
+
+
+def _compresor(binario, compresion):
+    """
+    Devuelve un flujo binario que escribe sobre `binario`, comprimiendo si se pide.
+    gzip se escribe sin nombre de archivo y con mtime=0 para que el mismo contenido
+    produzca los mismos bytes, se llame como se llame la salida.
+    """
+    if compresion == "gz":
+        return gzip.GzipFile(filename='', fileobj=binario, mode='wb', mtime=0)
+    if compresion == "xz":
+        return lzma.LZMAFile(binario, 'wb')
+    if compresion:
+        raise ValueError(f"Compresión no soportada: {compresion} (use {', '.join(COMPRESIONES)})")
+    return binario
+
+
+def _envolver(binario, compresion):
+    """
+    Devuelve un flujo de texto UTF-8 que escribe sobre `binario`, comprimiendo si se pide.
+    Los saltos de línea se escriben siempre como "\n" (también en Windows): los offsets
+    del índice de fechas y los hashes de los deltas se calculan sobre ese texto.
+    """
+    return io.TextIOWrapper(_compresor(binario, compresion), encoding='utf-8', newline='\n')
+
+
+def compresion_por_extension(ruta):
+    """Compresión que corresponde a una ruta de salida según su extensión (.gz / .xz)."""
+    extension = os.path.splitext(ruta)[1].lstrip(".").lower()
+    return extension if extension in COMPRESIONES else None
+
+
+def abrir_salida(ruta):
+    """Abre una ruta de salida como texto UTF-8, comprimiendo si termina en .gz o .xz."""
+    return _envolver(open(ruta, 'wb'), compresion_por_extension(ruta))
+
+
+def volcar_json(datos, f, compacto=False):
+    """
+    json.dump con el formato de salida de las herramientas: indentado o compacto.
+    Los Devocional (registro_devocional) se escriben como el dict que se leyó.
+    """
+    if compacto:
+        json.dump(datos, f, ensure_ascii=False, separators=(",", ":"), default=como_json)
+    else:
+        json.dump(datos, f, ensure_ascii=False, indent=4, default=como_json)
+
+
+def nombres_versionados(base_name, extension, directory="."):
+    """
+    Genera los nombres candidatos base_YYYYMMDD_HHMMSS.ext, base_YYYYMMDD_HHMMSS_1.ext, ...
+    con la fecha y hora actuales, sin listar la carpeta.
+    """
+    timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    current_base_name = f"{base_name}_{timestamp_str}"
+    yield os.path.join(directory, f"{current_base_name}.{extension}")
+    for version in count(1):
+        yield os.path.join(directory, f"{current_base_name}_{version}.{extension}")
+
+
+def _reclamar_nombre(temporal, base_name, extension, directory):
+    """
+    Publica el temporal con el primer nombre versionado libre. Cada intento es una
+    creación exclusiva (un enlace duro falla si el nombre ya existe), así que dos
+    ejecuciones simultáneas nunca se pisan y el archivo aparece ya completo.
+    """
+    for ruta in nombres_versionados(base_name, extension, directory):
+        try:
+            os.link(temporal, ruta)
+        except FileExistsError:
+            continue
+        except OSError:
+            # Sistemas de archivos sin enlaces duros: se reserva el nombre con O_EXCL
+            # y se reemplaza de forma atómica.
+            try:
+                os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                continue
+            os.replace(temporal, ruta)
+            return ruta
+        os.remove(temporal)
+        return ruta
+
+
+def publicar_versionado(base_name, extension, directory, escribir, compresion=None):
+    """
+    Escribe un archivo de salida de forma atómica: escribir(f) vuelca el contenido en un
+    temporal de la misma carpeta y solo al terminar se publica con el nombre versionado.
+    Si algo falla a mitad de camino no queda ningún archivo truncado. Devuelve la ruta final.
+    Con compresion ('gz' o 'xz') el contenido se comprime al escribirlo y la extensión
+    pasa a ser, por ejemplo, json.gz.
+    """
+    if compresion:
+        extension = f"{extension}.{compresion}"
+    os.makedirs(directory, exist_ok=True)
+    fd, temporal = _temporal_en(directory, base_name)
+    try:
+        with open(fd, 'wb') as binario:
+            f = _envolver(binario, compresion)
+            escribir(f)
+            f.flush()
+            subyacente = f.detach()
+            if subyacente is not binario:
+                # Cerrar el compresor escribe el final del flujo sin cerrar el archivo.
+                subyacente.close()
+            binario.flush()
+            os.fsync(binario.fileno())
+        return _reclamar_nombre(temporal, base_name, extension, directory)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def volcar_devocionales(f, idiomas, compacto=False, desplazamientos=None):
+    """
+    Escribe {"data": {idioma: {fecha: [devocionales]}}} de forma incremental.
+    idiomas es un iterable de (idioma, iterable de (fecha, lista)) ya en el orden de salida,
+    así que no hace falta armar una copia completa del corpus. El resultado es idéntico,
+    byte a byte, al de volcar_json con el mismo formato (indentado o compacto).
+
+    Si se pasa un dict en desplazamientos, se completa con {idioma: {fecha: (offset,
+    longitud)}}: la posición en bytes UTF-8 (desde el inicio de f) y el largo del valor
+    de cada fecha, para escribir el índice de fechas (ver escribir_indice_fechas).
+    """
+    posicion = 0
+
+    def escribir(texto):
+        nonlocal posicion
+        f.write(texto)
+        if desplazamientos is not None:
+            posicion += len(texto.encode("utf-8"))
+
+    def escribir_fecha(idioma, fecha, cuerpo):
+        inicio = posicion
+        escribir(cuerpo)
+        if desplazamientos is not None:
+            desplazamientos.setdefault(idioma, {})[fecha] = (inicio, posicion - inicio)
+
+    if compacto:
+        escribir('{"data":{')
+        primer_idioma = True
+        for idioma, fechas in idiomas:
+            escribir(("" if primer_idioma else ",") + json.dumps(idioma, ensure_ascii=False) + ":{")
+            primer_idioma = False
+            primera_fecha = True
+            for fecha, lista in fechas:
+                escribir(("" if primera_fecha else ",") + json.dumps(fecha, ensure_ascii=False) + ":")
+                escribir_fecha(idioma, fecha,
+                               json.dumps(lista, ensure_ascii=False, separators=(",", ":"), default=como_json))
+                primera_fecha = False
+            escribir("}")
+        escribir("}}")
+        return
+
+    indent = 4
+    sangria = " " * indent
+    escribir("{\n" + sangria + '"data": {')
+    primer_idioma = True
+    for idioma, fechas in idiomas:
+        escribir(("" if primer_idioma else ",") + "\n" + sangria * 2 + json.dumps(idioma, ensure_ascii=False) + ": {")
+        primer_idioma = False
+        primera_fecha = True
+        for fecha, lista in fechas:
+            cuerpo = json.dumps(lista, ensure_ascii=False, indent=indent, default=como_json).replace("\n", "\n" + sangria * 3)
+            escribir(("" if primera_fecha else ",") + "\n" + sangria * 3 + json.dumps(fecha, ensure_ascii=False) + ": ")
+            escribir_fecha(idioma, fecha, cuerpo)
+            primera_fecha = False
+        escribir("}" if primera_fecha else "\n" + sangria * 2 + "}")
+    escribir(("}" if primer_idioma else "\n" + sangria + "}") + "\n}")
+
+
+# Índice de fechas: archivo JSON junto a la salida con la posición de cada fecha.
+EXTENSION_INDICE_FECHAS = ".indice"
+FORMATO_INDICE_FECHAS = 1
+
+
+def ruta_indice_fechas(ruta):
+    """Ruta del índice de fechas de una salida (la misma ruta con .indice al final)."""
+    return ruta + EXTENSION_INDICE_FECHAS
+
+
+def escribir_indice_fechas(ruta, desplazamientos):
+    """
+    Escribe junto a la salida sin comprimir `ruta` su índice de fechas: para cada
+    (idioma, fecha), el offset en bytes y la longitud del valor de esa fecha, más el
+    tamaño del archivo para detectar un índice desactualizado. Con él,
+    lectura_json.LectorIndexado decodifica una sola fecha sin leer el documento.
+    Devuelve la ruta del índice.
+    """
+    indice = {
+        "formato": FORMATO_INDICE_FECHAS,
+        "tamano": os.path.getsize(ruta),
+        "idiomas": {idioma: {fecha: list(posicion) for fecha, posicion in fechas.items()}
+                    for idioma, fechas in desplazamientos.items()},
+    }
+    ruta_indice = ruta_indice_fechas(ruta)
+    _escribir_atomico(ruta_indice, json.dumps(indice, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return ruta_indice
+
+
+def escribir_lista_versiculos(f, versiculos):
+    """Escribe la lista numerada de versículos utilizados."""
+    f.write("==================================================\n")
+    f.write("           LISTA DE VERSÍCULOS UTILIZADOS         \n")
+    f.write("--------------------------------------------------\n")
+
+    sorted_verses = sorted(versiculos)
+
+    for i, display_verse in enumerate(sorted_verses):
+        f.write(f"{i+1}. {display_verse}\n")
+
+
+NOMBRE_INDICE_SHARDS = "index.json"
+
+
+def _comprimir(contenido, compresion):
+    """
+    Comprime los bytes igual que un flujo de _envolver al cerrarse (un flush y luego el
+    cierre), para que escribir de una vez o por partes dé el mismo archivo.
+    """
+    if not compresion:
+        return contenido
+    binario = io.BytesIO()
+    compresor = _compresor(binario, compresion)
+    compresor.write(contenido)
+    compresor.flush()
+    compresor.close()
+    return binario.getvalue()
+
+
+def _escribir_atomico(ruta, contenido):
+    """
+    Reemplaza un archivo de forma atómica con los bytes indicados. El temporal es único
+    (mkstemp), así que dos ejecuciones que escriben el mismo archivo no comparten uno a medias.
+    """
+    fd, temporal = _temporal_en(os.path.dirname(ruta) or ".", os.path.basename(ruta))
+    try:
+        with open(fd, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def escribir_comprimido(ruta, contenido):
+    """Escribe de forma atómica los bytes de contenido en ruta, comprimidos si termina en .gz o .xz."""
+    _escribir_atomico(ruta, _comprimir(contenido, compresion_por_extension(ruta)))
+
+
+def escribir_shards(carpeta, idiomas, compacto=False, compresion=None):
+    """
+    Escribe el corpus como un shard por (idioma, mes), cada uno con la misma estructura
+    {"data": {idioma: {fecha: [...]}}}, más un index.json con el rango de fechas, la
+    cantidad de registros y el hash de cada shard. Un cliente puede descargar solo el
+    shard que necesita.
+
+    idiomas es un iterable de (idioma, iterable de (fecha, lista)) con las fechas en orden.
+    Los shards cuyo contenido no cambió no se reescriben (conservan hash y fecha), y los
+    que ya no corresponden a ningún mes se eliminan. Devuelve la ruta del índice.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_indice = os.path.join(carpeta, NOMBRE_INDICE_SHARDS)
+    try:
+        with open(ruta_indice, 'r', encoding='utf-8') as f:
+            anteriores = {shard["archivo"]: shard["hash"] for shard in json.load(f)["shards"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        anteriores = {}
+
+    extension = "json" + (f".{compresion}" if compresion else "")
+    shards = []
+
+    def cerrar_shard(idioma, mes, fechas):
+        buffer = io.StringIO()
+        volcar_devocionales(buffer, [(idioma, fechas)], compacto=compacto)
+        contenido = _comprimir(buffer.getvalue().encode("utf-8"), compresion)
+        archivo = f"{idioma}/{mes}.{extension}"
+        hash_contenido = "sha256:" + hashlib.sha256(contenido).hexdigest()
+        ruta = os.path.join(carpeta, idioma, f"{mes}.{extension}")
+        if anteriores.get(archivo) != hash_contenido or not os.path.exists(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            _escribir_atomico(ruta, contenido)
+        shards.append({
+            "idioma": idioma,
+            "mes": mes,
+            "archivo": archivo,
+            "desde": fechas[0][0],
+            "hasta": fechas[-1][0],
+            "fechas": len(fechas),
+            "registros": sum(len(lista) for _, lista in fechas),
+            "bytes": len(contenido),
+            "hash": hash_contenido,
+        })
+
+    for idioma, fechas in idiomas:
+        mes_actual = None
+        fechas_mes = []
+        for fecha, lista in fechas:
+            mes = fecha[:7]
+            if mes != mes_actual and fechas_mes:
+                cerrar_shard(idioma, mes_actual, fechas_mes)
+                fechas_mes = []
+            mes_actual = mes
+            fechas_mes.append((fecha, lista))
+        if fechas_mes:
+            cerrar_shard(idioma, mes_actual, fechas_mes)
+
+    indice = {"compacto": compacto, "compresion": compresion, "shards": shards}
+    _escribir_atomico(ruta_indice, json.dumps(indice, ensure_ascii=False, indent=4).encode("utf-8"))
+
+    vigentes = {shard["archivo"] for shard in shards}
+    for archivo in anteriores:
+        # Solo se borran shards propios: rutas relativas dentro de la carpeta.
+        if archivo not in vigentes and not os.path.isabs(archivo) and ".." not in archivo.split("/"):
+            try:
+                os.remove(os.path.join(carpeta, archivo))
+            except OSError:
+                pass
+    return ruta_indice
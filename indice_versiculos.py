@@ -0,0 +1,209 @@
+import zlib
+from bisect import bisect_right
+from itertools import accumulate
+
+from referencias_biblicas import LIBROS_ES
+
+# Capítulos de cada libro, en el orden de LIBROS_ES (1189 en total).
+CAPITULOS_POR_LIBRO = [
+    50, 40, 27, 36, 34, 24, 21, 4, 31, 24, 22, 25, 29, 36, 10, 13, 10, 42, 150, 31, 12, 8, 66,
+    52, 5, 48, 12, 14, 3, 9, 1, 4, 7, 3, 3, 3, 2, 14, 4, 28, 16, 24, 21, 28, 16, 16, 13, 6, 6,
+    4, 4, 5, 3, 6, 4, 3, 1, 13, 5, 5, 3, 5, 1, 1, 1, 22,
+]
+
+# Cada capítulo ocupa un bloque fijo de bits del tamaño del capítulo más largo (Salmos 119).
+# Así el ordinal se calcula sin una tabla de versículos por capítulo, a costa de unos
+# bits sin usar: el índice completo ocupa 1189 * 176 bits (unos 26 KB sin comprimir).
+MAX_VERSICULOS_CAPITULO = 176
+
+# Índice global del primer capítulo de cada libro.
+_PRIMER_CAPITULO = [0] + list(accumulate(CAPITULOS_POR_LIBRO))[:-1]
+TOTAL_CAPITULOS = sum(CAPITULOS_POR_LIBRO)
+TOTAL_BITS = TOTAL_CAPITULOS * MAX_VERSICULOS_CAPITULO
+_TAMANO_BYTES = (TOTAL_BITS + 7) // 8
+
+# Cabecera del archivo persistente: firma, versión del formato y bitset comprimido con zlib.
+_FIRMA = b"VERSIDX"
+_VERSION_FORMATO = 1
+
+assert len(CAPITULOS_POR_LIBRO) == len(LIBROS_ES)
+
+
+def ordinal(book_id, chapter, verse):
+    """
+    Ordinal global de un versículo (desde 0), o None si está fuera del catálogo
+    (libro desconocido, capítulo inexistente o versículo fuera de rango).
+    """
+    if not 1 <= book_id <= len(CAPITULOS_POR_LIBRO) or not 1 <= chapter <= CAPITULOS_POR_LIBRO[book_id - 1]:
+        return None
+    if not 1 <= verse <= MAX_VERSICULOS_CAPITULO:
+        return None
+    return (_PRIMER_CAPITULO[book_id - 1] + chapter - 1) * MAX_VERSICULOS_CAPITULO + verse - 1
+
+
+def rango_ordinales(pasaje):
+    """
+    Ordinales que cubre un pasaje (book_id, chapter, verse_start, verse_end) como range.
+    Un capítulo completo (verse_start 0) cubre todo su bloque. None si no se puede indexar.
+    """
+    book_id, chapter, verse_start, verse_end = pasaje[:4]
+    if not verse_start:
+        verse_start, verse_end = 1, MAX_VERSICULOS_CAPITULO
+    inicio = ordinal(book_id, chapter, verse_start)
+    fin = ordinal(book_id, chapter, max(verse_start, verse_end))
+    if inicio is None or fin is None:
+        return None
+    return range(inicio, fin + 1)
+
+
+def pasaje_de_ordinal(numero):
+    """Convierte un ordinal en el pasaje de un solo versículo (book_id, chapter, verse, verse)."""
+    capitulo_global, versiculo = divmod(numero, MAX_VERSICULOS_CAPITULO)
+    book_id = bisect_right(_PRIMER_CAPITULO, capitulo_global)
+    chapter = capitulo_global - _PRIMER_CAPITULO[book_id - 1] + 1
+    return book_id, chapter, versiculo + 1, versiculo + 1
+
+
+class IndiceVersiculos:
+    """
+    Conjunto de versículos usados como bitset indexado por ordinal global. Consultar si
+    un versículo ya se usó es O(1); los rangos se expanden a sus bits al agregarlos; la
+    unión, intersección y diferencia entre índices (por ejemplo, de distintos años o
+    idiomas) se hacen sobre el bitset completo de una vez.
+    """
+
+    def __init__(self, bits=None):
+        self.bits = bytearray(bits) if bits is not None else bytearray(_TAMANO_BYTES)
+        if len(self.bits) != _TAMANO_BYTES:
+            raise ValueError("El bitset no corresponde al catálogo de versículos")
+
+    @classmethod
+    def desde_pasajes(cls, pasajes):
+        indice = cls()
+        for pasaje in pasajes:
+            indice.agregar(pasaje)
+        return indice
+
+    def _bit(self, numero):
+        return self.bits[numero >> 3] >> (numero & 7) & 1
+
+    def usado(self, book_id, chapter, verse):
+        """Indica si el versículo ya está en el índice."""
+        numero = ordinal(book_id, chapter, verse)
+        return numero is not None and bool(self._bit(numero))
+
+    def agregar(self, pasaje):
+        """Marca todos los versículos del pasaje. Devuelve False si no se puede indexar."""
+        rango = rango_ordinales(pasaje)
+        if rango is None:
+            return False
+        for numero in rango:
+            self.bits[numero >> 3] |= 1 << (numero & 7)
+        return True
+
+    def contiene(self, pasaje):
+        """Indica si todos los versículos del pasaje ya están en el índice."""
+        rango = rango_ordinales(pasaje)
+        return rango is not None and all(self._bit(numero) for numero in rango)
+
+    def se_superpone(self, pasaje):
+        """Indica si algún versículo del pasaje ya está en el índice."""
+        rango = rango_ordinales(pasaje)
+        return rango is not None and any(self._bit(numero) for numero in rango)
+
+    def _como_entero(self):
+        return int.from_bytes(self.bits, "little")
+
+    @classmethod
+    def _desde_entero(cls, valor):
+        return cls(valor.to_bytes(_TAMANO_BYTES, "little"))
+
+    def __or__(self, otro):
+        return self._desde_entero(self._como_entero() | otro._como_entero())
+
+    def __and__(self, otro):
+        return self._desde_entero(self._como_entero() & otro._como_entero())
+
+    def __sub__(self, otro):
+        return self._desde_entero(self._como_entero() & ~otro._como_entero())
+
+    union = __or__
+    interseccion = __and__
+    diferencia = __sub__
+
+    def __eq__(self, otro):
+        return isinstance(otro, IndiceVersiculos) and self.bits == otro.bits
+
+    def __len__(self):
+        """Cantidad de versículos marcados."""
+        return bin(self._como_entero()).count("1")
+
+    def ordinales(self):
+        """Ordinales marcados, en orden."""
+        for posicion, byte in enumerate(self.bits):
+            while byte:
+                bajo = byte & -byte
+                yield posicion * 8 + bajo.bit_length() - 1
+                byte ^= bajo
+
+    def pasajes(self):
+        """Los versículos marcados agrupados en pasajes de versículos consecutivos del mismo capítulo."""
+        actual = None
+        for numero in self.ordinales():
+            book_id, chapter, verse, _ = pasaje_de_ordinal(numero)
+            if actual and actual[:2] == (book_id, chapter) and actual[3] == verse - 1:
+                actual = (book_id, chapter, actual[2], verse)
+                continue
+            if actual:
+                yield actual
+            actual = (book_id, chapter, verse, verse)
+        if actual:
+            yield actual
+
+    def a_bytes(self):
+        """Forma persistente: firma, versión y el bitset comprimido."""
+        return _FIRMA + bytes([_VERSION_FORMATO]) + zlib.compress(bytes(self.bits), 9)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        if not datos.startswith(_FIRMA) or datos[len(_FIRMA)] != _VERSION_FORMATO:
+            raise ValueError("No es un índice de versículos o su versión no es compatible")
+        return cls(zlib.decompress(datos[len(_FIRMA) + 1:]))
+
+    def guardar(self, ruta):
+        with open(ruta, "wb") as f:
+            f.write(self.a_bytes())
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, "rb") as f:
+            return cls.desde_bytes(f.read())
+
+
+def detectar_superposiciones(pasajes):
+    """
+    Recorre los pasajes en orden y devuelve una lista (pasaje, [pasajes anteriores con los
+    que se superpone]) para cada pasaje que comparte versículos con otro distinto ya visto
+    (por ejemplo 'Juan 3:16' frente a 'Juan 3:14-18'). Las repeticiones exactas no se
+    informan aquí: son duplicados. Los pasajes que no se pueden indexar se ignoran.
+    """
+    duenos = {}
+    conflictos = []
+    vistos = set()
+    for pasaje in pasajes:
+        pasaje = tuple(pasaje[:4])
+        rango = rango_ordinales(pasaje)
+        if rango is None:
+            continue
+        if pasaje not in vistos:
+            previos = []
+            for numero in rango:
+                previo = duenos.get(numero)
+                if previo is not None and previo != pasaje and previo not in previos:
+                    previos.append(previo)
+            if previos:
+                conflictos.append((pasaje, previos))
+            vistos.add(pasaje)
+        for numero in rango:
+            duenos.setdefault(numero, pasaje)
+    return conflictos
@@ -0,0 +1,509 @@
+import glob
+import gzip
+import io
+import json
+import lzma
+import mmap
+import os
+import re
+from json.decoder import scanstring
+
+from escritura_json import FORMATO_INDICE_FECHAS, ruta_indice_fechas
+
+# Tamaño de cada lectura del archivo. Solo se mantiene en memoria el fragmento
+# pendiente de procesar más el devocional que se está decodificando.
+TAMANO_BLOQUE = 64 * 1024
+
+_ESPACIOS = " \t\n\r"
+_decodificador = json.JSONDecoder()
+
+
+def expandir_entradas(patrones):
+    """
+    Expande rutas y patrones glob de la línea de comandos (también en Windows, donde la
+    consola no los expande). Respeta el orden de los patrones y ordena las coincidencias
+    de cada uno. Lanza FileNotFoundError si un patrón no coincide con ningún archivo.
+    """
+    rutas = []
+    for patron in patrones:
+        coincidencias = sorted(glob.glob(patron)) if glob.has_magic(patron) else [patron]
+        if not coincidencias or not all(os.path.isfile(ruta) for ruta in coincidencias):
+            raise FileNotFoundError(f"No se encontraron archivos para '{patron}'")
+        rutas.extend(coincidencias)
+    return rutas
+
+
+_FIRMA_GZIP = b"\x1f\x8b"
+_FIRMA_XZ = b"\xfd7zXZ\x00"
+
+
+class _ArchivoConAvance(io.RawIOBase):
+    """Archivo binario de solo lectura que informa cada lectura con avance(bytes_leidos)."""
+
+    def __init__(self, file_path, avance):
+        self._archivo = io.FileIO(file_path, 'r')
+        self._avance = avance
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._archivo.readinto(b)
+        if n:
+            self._avance(n)
+        return n
+
+    def close(self):
+        self._archivo.close()
+        super().close()
+
+
+class _TextoSobreArchivo(io.TextIOWrapper):
+    """Texto sobre un descompresor que al cerrarse cierra también el archivo en disco."""
+
+    def __init__(self, descompresor, archivo):
+        super().__init__(descompresor, encoding='utf-8')
+        self._archivo = archivo
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._archivo.close()
+
+
+def abrir_texto(file_path, avance=None):
+    """
+    Abre un archivo de entrada como texto UTF-8, descomprimiéndolo al vuelo si es
+    .json.gz o .json.xz (se reconoce por su firma, no por la extensión). La
+    descompresión es incremental: nunca se carga el archivo comprimido completo.
+
+    Si se pasa avance, se llama con la cantidad de bytes leídos del archivo en disco
+    en cada lectura (comprimidos, si lo está), para mostrar el progreso por bytes.
+    """
+    if avance is None:
+        with open(file_path, 'rb') as f:
+            firma = f.read(len(_FIRMA_XZ))
+        if firma.startswith(_FIRMA_GZIP):
+            return io.TextIOWrapper(gzip.open(file_path, 'rb'), encoding='utf-8')
+        if firma.startswith(_FIRMA_XZ):
+            return io.TextIOWrapper(lzma.open(file_path, 'rb'), encoding='utf-8')
+        return open(file_path, 'r', encoding='utf-8')
+
+    archivo = io.BufferedReader(_ArchivoConAvance(file_path, avance))
+    firma = archivo.peek(len(_FIRMA_XZ))[:len(_FIRMA_XZ)]
+    if firma.startswith(_FIRMA_GZIP):
+        return _TextoSobreArchivo(gzip.GzipFile(fileobj=archivo, mode='rb'), archivo)
+    if firma.startswith(_FIRMA_XZ):
+        return _TextoSobreArchivo(lzma.LZMAFile(archivo, 'rb'), archivo)
+    return io.TextIOWrapper(archivo, encoding='utf-8')
+
+
+class _LectorIncremental:
+    """
+    Lector mínimo sobre un archivo de texto que mantiene un búfer acotado y
+    permite decodificar valores JSON completos uno a uno con raw_decode.
+    """
+
+    def __init__(self, f, tamano_bloque=TAMANO_BLOQUE):
+        self.f = f
+        self.tamano_bloque = tamano_bloque
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _rellenar(self, minimo=0):
+        """Lee más texto del archivo descartando la parte ya consumida del búfer."""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        trozo = self.f.read(max(self.tamano_bloque, minimo))
+        if not trozo:
+            self.eof = True
+            return False
+        self.buf += trozo
+        return True
+
+    def error(self, mensaje):
+        return json.JSONDecodeError(mensaje, self.buf, self.pos)
+
+    def siguiente(self):
+        """Devuelve el siguiente carácter significativo (sin consumirlo) o '' al final."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _ESPACIOS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._rellenar():
+                return ""
+
+    def consumir(self, caracter):
+        if self.siguiente() != caracter:
+            raise self.error(f"Se esperaba '{caracter}'")
+        self.pos += 1
+
+    def valor(self, con_texto=False):
+        """
+        Decodifica el siguiente valor JSON completo. Si el valor queda cortado
+        por el final del búfer se leen más bloques y se reintenta. Con con_texto
+        devuelve (valor, texto JSON tal como está en el archivo).
+        """
+        self.siguiente()
+        while True:
+            try:
+                obj, fin = _decodificador.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Crecimiento geométrico para que un valor grande no cueste
+                # un reintento por cada bloque leído.
+                if self._rellenar(len(self.buf) - self.pos):
+                    continue
+                raise
+            # Un número al final del búfer puede continuar en el siguiente bloque.
+            if fin == len(self.buf) and self._rellenar(len(self.buf) - self.pos):
+                continue
+            if con_texto:
+                obj = obj, self.buf[self.pos:fin]
+            self.pos = fin
+            return obj
+
+    def claves(self):
+        """Itera las claves de un objeto JSON dejando el lector sobre cada valor."""
+        self.consumir("{")
+        if self.siguiente() == "}":
+            self.pos += 1
+            return
+        while True:
+            clave = self.valor()
+            if not isinstance(clave, str):
+                raise self.error("Se esperaba una clave de texto")
+            self.consumir(":")
+            yield clave
+            caracter = self.siguiente()
+            self.pos += 1
+            if caracter == "}":
+                return
+            if caracter != ",":
+                self.pos -= 1
+                raise self.error("Se esperaba ',' o '}'")
+
+    def elementos(self, con_texto=False):
+        """Itera los elementos de un array JSON decodificando uno a la vez (ver valor)."""
+        self.consumir("[")
+        if self.siguiente() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.valor(con_texto)
+            caracter = self.siguiente()
+            self.pos += 1
+            if caracter == "]":
+                return
+            if caracter != ",":
+                self.pos -= 1
+                raise self.error("Se esperaba ',' o ']'")
+
+
+def iter_devocionales(file_path, idiomas_vistos=None, con_texto=False):
+    """
+    Recorre de forma incremental un archivo con la estructura
+    {"data": {"idioma": {"YYYY-MM-DD": [devocional, ...]}}} y produce tuplas
+    (idioma, fecha, devocional) de a una, sin cargar el documento completo.
+    La memoria máxima queda acotada por el devocional más grande. Acepta
+    archivos comprimidos con gzip o xz.
+
+    Si se pasa el conjunto idiomas_vistos, se le agregan los idiomas
+    encontrados bajo "data" (aunque estén vacíos), para poder validar la
+    estructura igual que con json.load.
+
+    Con con_texto se produce (idioma, fecha, devocional, texto), donde texto es el
+    JSON del devocional tal como está en el archivo (sin volver a serializarlo).
+
+    Lanza json.JSONDecodeError si el archivo no es un JSON válido; en ese caso
+    ya pueden haberse producido algunos devocionales.
+    """
+    with abrir_texto(file_path) as f:
+        lector = _LectorIncremental(f)
+        if lector.siguiente() != "{":
+            # Un array u otro valor suelto en la raíz no tiene devocionales por idioma.
+            lector.valor()
+        else:
+            for clave in lector.claves():
+                if clave != "data" or lector.siguiente() != "{":
+                    lector.valor()
+                    continue
+                for idioma in lector.claves():
+                    if idiomas_vistos is not None:
+                        idiomas_vistos.add(idioma)
+                    if lector.siguiente() != "{":
+                        lector.valor()
+                        continue
+                    for fecha in lector.claves():
+                        if lector.siguiente() != "[":
+                            lector.valor()
+                            continue
+                        if con_texto:
+                            for devocional, texto in lector.elementos(True):
+                                yield idioma, fecha, devocional, texto
+                        else:
+                            for devocional in lector.elementos():
+                                yield idioma, fecha, devocional
+        if lector.siguiente() != "":
+            raise lector.error("Datos adicionales después del documento JSON")
+
+
+def iter_elementos(file_path):
+    """
+    Recorre de forma incremental un archivo cuya raíz es un array JSON y produce sus
+    elementos de a uno, sin cargar el documento completo (por ejemplo, una exportación
+    plana de devocionales). Acepta archivos comprimidos con gzip o xz.
+
+    Lanza json.JSONDecodeError si la raíz no es un array o el archivo no es un JSON
+    válido; en ese caso ya pueden haberse producido algunos elementos.
+    """
+    with abrir_texto(file_path) as f:
+        lector = _LectorIncremental(f)
+        if lector.siguiente() != "[":
+            raise lector.error("Se esperaba un array JSON en la raíz")
+        yield from lector.elementos()
+        if lector.siguiente() != "":
+            raise lector.error("Datos adicionales después del documento JSON")
+
+
+_SALTAR_ESPACIOS = re.compile(r"[ \t\n\r]*")
+
+# Tipos de reparación que informa cargar_json_tolerante.
+COMA_FINAL = "coma_final"
+VALOR_CONCATENADO = "valor_concatenado"
+
+
+class _ParserTolerante:
+    """
+    Parser de una sola pasada que delega en el decodificador en C de json todo lo que
+    es válido y solo recorre en Python el camino hasta cada error: si un objeto o array
+    falla al decodificarse, se recorren sus miembros uno a uno (decodificando cada uno
+    en C) y se corrigen las comas finales en el lugar donde aparecen.
+    """
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.reparaciones = []  # (tipo, índice de carácter)
+
+    def _espacios(self, i):
+        return _SALTAR_ESPACIOS.match(self.texto, i).end()
+
+    def _error(self, mensaje, i):
+        return json.JSONDecodeError(mensaje, self.texto, i)
+
+    def valor(self, i):
+        try:
+            return _decodificador.raw_decode(self.texto, i)
+        except json.JSONDecodeError:
+            caracter = self.texto[i:i + 1]
+            if caracter == "{":
+                return self.objeto(i + 1)
+            if caracter == "[":
+                return self.array(i + 1)
+            raise
+
+    def objeto(self, i):
+        texto = self.texto
+        resultado = {}
+        i = self._espacios(i)
+        if texto[i:i + 1] == "}":
+            return resultado, i + 1
+        while True:
+            if texto[i:i + 1] != '"':
+                raise self._error("Se esperaba una clave entre comillas dobles", i)
+            clave, i = scanstring(texto, i + 1)
+            i = self._espacios(i)
+            if texto[i:i + 1] != ":":
+                raise self._error("Se esperaba ':'", i)
+            resultado[clave], i = self.valor(self._espacios(i + 1))
+            i = self._espacios(i)
+            caracter = texto[i:i + 1]
+            if caracter == "}":
+                return resultado, i + 1
+            if caracter != ",":
+                raise self._error("Se esperaba ',' o '}'", i)
+            coma = i
+            i = self._espacios(i + 1)
+            if texto[i:i + 1] == "}":
+                self.reparaciones.append((COMA_FINAL, coma))
+                return resultado, i + 1
+
+    def array(self, i):
+        texto = self.texto
+        resultado = []
+        i = self._espacios(i)
+        if texto[i:i + 1] == "]":
+            return resultado, i + 1
+        while True:
+            valor, i = self.valor(i)
+            resultado.append(valor)
+            i = self._espacios(i)
+            caracter = texto[i:i + 1]
+            if caracter == "]":
+                return resultado, i + 1
+            if caracter != ",":
+                raise self._error("Se esperaba ',' o ']'", i)
+            coma = i
+            i = self._espacios(i + 1)
+            if texto[i:i + 1] == "]":
+                self.reparaciones.append((COMA_FINAL, coma))
+                return resultado, i + 1
+
+    def documento(self):
+        valores = []
+        i = self._espacios(0)
+        while True:
+            inicio = i
+            valor, i = self.valor(i)
+            valores.append(valor)
+            if len(valores) > 1:
+                self.reparaciones.append((VALOR_CONCATENADO, inicio))
+            i = self._espacios(i)
+            if i >= len(self.texto):
+                break
+        if len(valores) == 1:
+            return valores[0]
+        if all(isinstance(valor, dict) for valor in valores):
+            combinado = {}
+            for valor in valores:
+                _combinar(combinado, valor)
+            return combinado
+        return valores
+
+
+def _combinar(destino, origen):
+    """Combina dos documentos: los objetos se unen recursivamente y las listas se concatenan."""
+    for clave, valor in origen.items():
+        actual = destino.get(clave)
+        if isinstance(actual, dict) and isinstance(valor, dict):
+            _combinar(actual, valor)
+        elif isinstance(actual, list) and isinstance(valor, list):
+            actual.extend(valor)
+        else:
+            destino[clave] = valor
+
+
+def _offsets_en_bytes(texto, indices):
+    """Convierte índices de carácter (ordenados) en offsets en bytes UTF-8 sin recodificar todo el texto cada vez."""
+    offsets = []
+    anterior = 0
+    bytes_acumulados = 0
+    for indice in indices:
+        bytes_acumulados += len(texto[anterior:indice].encode("utf-8"))
+        anterior = indice
+        offsets.append(bytes_acumulados)
+    return offsets
+
+
+def cargar_json_tolerante(texto):
+    """
+    Decodifica un documento JSON corrigiendo al vuelo las comas finales en objetos y
+    arrays y los valores concatenados en la raíz (varios objetos seguidos se combinan en
+    uno; si no son todos objetos se devuelven como lista). Un documento válido cuesta lo
+    mismo que json.loads.
+
+    Devuelve (datos, reparaciones) donde reparaciones es una lista de diccionarios
+    {"tipo": ..., "offset": ...} con el offset en bytes UTF-8 de cada corrección.
+    Lanza json.JSONDecodeError si el documento tiene otros errores.
+    """
+    parser = _ParserTolerante(texto)
+    datos = parser.documento()
+    reparaciones = sorted(parser.reparaciones, key=lambda r: r[1])
+    offsets = _offsets_en_bytes(texto, [indice for _, indice in reparaciones])
+    return datos, [{"tipo": tipo, "offset": offset} for (tipo, _), offset in zip(reparaciones, offsets)]
+
+
+def indexar_por_version(devocionales):
+    """
+    {versión: devocional} de una fecha, para buscar una versión sin recorrer la lista.
+    Acepta la lista de devocionales (si una versión se repite gana el primero) o el
+    objeto por versión que escribe el ajuste con --por-version, que se devuelve tal cual.
+    """
+    if isinstance(devocionales, dict):
+        return devocionales
+    por_version = {}
+    for devocional in devocionales:
+        if isinstance(devocional, dict):
+            por_version.setdefault(devocional.get("version"), devocional)
+    return por_version
+
+
+def cargar_por_version(file_path):
+    """
+    Carga una salida {"data": {idioma: {fecha: ...}}} (comprimida o no) con las fechas
+    como {versión: devocional}, sea cual sea el formato en que se escribió (listas por
+    fecha u objetos por versión): el devocional de una versión en una fecha es
+    datos[idioma][fecha][version].
+    """
+    with abrir_texto(file_path) as f:
+        datos = json.load(f)
+    return {idioma: {fecha: indexar_por_version(valor) for fecha, valor in fechas.items()}
+            for idioma, fechas in datos["data"].items()}
+
+
+class LectorIndexado:
+    """
+    Acceso directo a las fechas de una salida (consolidada o ajustada) que tiene índice
+    de fechas (ver escritura_json.escribir_indice_fechas). El archivo se mapea en memoria
+    y cada consulta decodifica solo el fragmento de esa fecha, así que su costo no
+    depende del tamaño del corpus.
+
+    Lanza ValueError si el índice no es de un formato conocido o no corresponde al
+    archivo (por ejemplo, si la salida se reescribió sin actualizar el índice).
+    """
+
+    def __init__(self, ruta, ruta_indice=None):
+        with open(ruta_indice or ruta_indice_fechas(ruta), 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        if not isinstance(indice, dict) or indice.get("formato") != FORMATO_INDICE_FECHAS:
+            raise ValueError("No es un índice de fechas o su formato no es compatible")
+        self.ruta = ruta
+        self.indice = indice["idiomas"]
+        self._archivo = open(ruta, 'rb')
+        try:
+            if os.fstat(self._archivo.fileno()).st_size != indice["tamano"]:
+                raise ValueError(f"El índice de fechas no corresponde a '{ruta}'")
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._archivo.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self._mapa.close()
+        self._archivo.close()
+
+    def idiomas(self):
+        return list(self.indice)
+
+    def fechas(self, idioma):
+        """Fechas del idioma en el orden del archivo."""
+        return list(self.indice.get(idioma, ()))
+
+    def fragmento(self, idioma, fecha):
+        """Los bytes JSON del valor de la fecha, sin decodificar, o None si no está."""
+        posicion = self.indice.get(idioma, {}).get(fecha)
+        if posicion is None:
+            return None
+        offset, longitud = posicion
+        return self._mapa[offset:offset + longitud]
+
+    def devocionales(self, idioma, fecha):
+        """Los devocionales de una fecha en un idioma (decodificados), o None si no está."""
+        fragmento = self.fragmento(idioma, fecha)
+        return None if fragmento is None else json.loads(fragmento)
+
+    def devocional(self, idioma, fecha, version):
+        """El devocional de una versión en una fecha, o None (ver indexar_por_version)."""
+        devocionales = self.devocionales(idioma, fecha)
+        return None if devocionales is None else indexar_por_version(devocionales).get(version)
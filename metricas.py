@@ -0,0 +1,117 @@
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def _etapa_vacia():
+    return {"segundos": 0.0, "cpu_segundos": 0.0, "llamadas": 0}
+
+
+def _registro_vacio():
+    return {"etapas": {}, "contadores": {}}
+
+
+class Metricas:
+    """
+    Acumula, por archivo y en total, el tiempo de reloj y de CPU de cada etapa del
+    proceso (lectura, reparación, normalización, deduplicación, escritura, ...) y
+    contadores como bytes leídos y escritos, registros o reparaciones.
+    Las etapas que se repiten por registro se acumulan por fuera y se suman con
+    sumar_tiempo solo con el tiempo de reloj (cpu_segundos queda en 0), para no leer
+    dos relojes por devocional.
+    """
+
+    def __init__(self):
+        self.total = _registro_vacio()
+        self.archivos = {}
+
+    def _registros(self, archivo):
+        if archivo is None:
+            return (self.total,)
+        return self.total, self.archivos.setdefault(archivo, _registro_vacio())
+
+    @contextmanager
+    def etapa(self, nombre, archivo=None):
+        """Mide el bloque como una llamada a la etapa indicada (del archivo, si se pasa)."""
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.sumar_tiempo(nombre, time.perf_counter() - inicio, time.process_time() - inicio_cpu, archivo)
+
+    def sumar_tiempo(self, nombre, segundos, cpu_segundos=0.0, archivo=None, llamadas=1):
+        for registro in self._registros(archivo):
+            etapa = registro["etapas"].setdefault(nombre, _etapa_vacia())
+            etapa["segundos"] += segundos
+            etapa["cpu_segundos"] += cpu_segundos
+            etapa["llamadas"] += llamadas
+
+    def contar(self, nombre, cantidad=1, archivo=None):
+        for registro in self._registros(archivo):
+            registro["contadores"][nombre] = registro["contadores"].get(nombre, 0) + cantidad
+
+    def incorporar(self, archivo, datos):
+        """Suma las métricas de un archivo medidas en otro proceso (con el formato de Metricas.total)."""
+        for nombre, etapa in datos.get("etapas", {}).items():
+            self.sumar_tiempo(nombre, etapa["segundos"], etapa["cpu_segundos"], archivo, etapa["llamadas"])
+        for nombre, cantidad in datos.get("contadores", {}).items():
+            self.contar(nombre, cantidad, archivo)
+
+    def como_dict(self, archivo=None):
+        """Métricas del archivo indicado (o totales) con los tiempos redondeados y las tasas derivadas."""
+        registro = self.total if archivo is None else self.archivos.get(archivo, _registro_vacio())
+        etapas = {nombre: {"segundos": round(etapa["segundos"], 6),
+                           "cpu_segundos": round(etapa["cpu_segundos"], 6),
+                           "llamadas": etapa["llamadas"]}
+                  for nombre, etapa in registro["etapas"].items()}
+        contadores = dict(registro["contadores"])
+        leidos = contadores.get("registros_leidos")
+        if leidos:
+            duplicados = contadores.get("duplicados", 0) + contadores.get("duplicados_exactos", 0)
+            contadores["tasa_duplicados"] = round(duplicados / leidos, 6)
+        return {"etapas": etapas, "contadores": contadores}
+
+    def guardar(self, ruta):
+        """
+        Escribe las métricas en ruta. Si termina en .jsonl se escribe una línea por
+        archivo y una última con los totales (archivo null); si no, un único JSON.
+        """
+        with open(ruta, "w", encoding="utf-8") as f:
+            if ruta.endswith(".jsonl"):
+                for archivo in list(self.archivos) + [None]:
+                    f.write(json.dumps({"archivo": archivo, **self.como_dict(archivo)}, ensure_ascii=False) + "\n")
+            else:
+                json.dump({"total": self.como_dict(),
+                           "archivos": {archivo: self.como_dict(archivo) for archivo in self.archivos}},
+                          f, ensure_ascii=False, indent=4)
+
+
+@contextmanager
+def perfilar(prefijo, lineas=30):
+    """
+    Perfil opcional de una ejecución: guarda las estadísticas de cProfile en
+    <prefijo>.prof (para pstats o snakeviz), las funciones más costosas en
+    <prefijo>.prof.txt y los puntos con más memoria asignada según tracemalloc,
+    junto con el pico, en <prefijo>.memoria.txt. Solo se perfila el proceso actual.
+    """
+    perfil = cProfile.Profile()
+    tracemalloc.start()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        instantanea = tracemalloc.take_snapshot()
+        actual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        perfil.dump_stats(f"{prefijo}.prof")
+        with open(f"{prefijo}.prof.txt", "w", encoding="utf-8") as f:
+            pstats.Stats(perfil, stream=f).sort_stats("cumulative").print_stats(lineas)
+        with open(f"{prefijo}.memoria.txt", "w", encoding="utf-8") as f:
+            f.write(f"Memoria actual: {actual:,} bytes\nPico: {pico:,} bytes\n\n")
+            for estadistica in instantanea.statistics("lineno")[:lineas]:
+                f.write(f"{estadistica}\n")
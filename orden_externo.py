@@ -0,0 +1,89 @@
+import heapq
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from itertools import groupby
+
+from registro_devocional import como_json
+
+# Tamaño por defecto de los registros acumulados en memoria antes de volcar un tramo.
+MEMORIA_POR_DEFECTO = 64 * 1024 * 1024
+
+# Tramos que se mezclan a la vez. Si hay más, se mezclan por grupos en pasadas
+# intermedias para no abrir un archivo por tramo.
+MAX_TRAMOS_ABIERTOS = 64
+
+
+def _linea(clave, valor):
+    return json.dumps([clave, valor], ensure_ascii=False, separators=(",", ":"), default=como_json) + "\n"
+
+
+def _escribir_tramo(carpeta, numero, lineas):
+    ruta = os.path.join(carpeta, f"tramo_{numero:06d}.jsonl")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.writelines(linea for _, linea in lineas)
+    return ruta
+
+
+def _leer_tramo(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            yield json.loads(linea)
+
+
+def _mezclar(rutas):
+    """
+    Mezcla k tramos ya ordenados por clave. heapq.merge es estable: a igual clave
+    sale primero el registro del tramo anterior, así que se conserva el orden de entrada.
+    """
+    return heapq.merge(*(_leer_tramo(ruta) for ruta in rutas), key=lambda par: par[0])
+
+
+@contextmanager
+def ordenar_en_disco(pares, memoria_maxima=MEMORIA_POR_DEFECTO, carpeta=None):
+    """
+    Ordena por clave un iterable de pares (clave, valor) serializables en JSON sin
+    tenerlos todos en memoria: los acumula como texto hasta unos memoria_maxima bytes,
+    vuelca cada tramo ordenado a un archivo temporal y al final los mezcla (k-way merge).
+    Produce un iterador de pares (clave, valor) en orden de clave; los de igual clave
+    conservan el orden de entrada. Los temporales se crean en carpeta (o en la carpeta
+    temporal del sistema) y se borran al salir del bloque with.
+    """
+    with tempfile.TemporaryDirectory(prefix=".orden_", dir=carpeta) as temporal:
+        tramos = []
+        lineas = []
+        tamano = 0
+        for clave, valor in pares:
+            linea = _linea(clave, valor)
+            lineas.append((clave, linea))
+            tamano += len(linea)
+            if tamano >= memoria_maxima:
+                lineas.sort(key=lambda par: par[0])
+                tramos.append(_escribir_tramo(temporal, len(tramos), lineas))
+                lineas = []
+                tamano = 0
+        lineas.sort(key=lambda par: par[0])
+        if lineas or not tramos:
+            tramos.append(_escribir_tramo(temporal, len(tramos), lineas))
+        del lineas
+
+        numero = len(tramos)
+        while len(tramos) > MAX_TRAMOS_ABIERTOS:
+            siguientes = []
+            for i in range(0, len(tramos), MAX_TRAMOS_ABIERTOS):
+                grupo = tramos[i:i + MAX_TRAMOS_ABIERTOS]
+                mezcla = ((clave, _linea(clave, valor)) for clave, valor in _mezclar(grupo))
+                siguientes.append(_escribir_tramo(temporal, numero, mezcla))
+                numero += 1
+                for ruta in grupo:
+                    os.remove(ruta)
+            tramos = siguientes
+
+        yield _mezclar(tramos)
+
+
+def agrupar_por_clave(pares_ordenados):
+    """Agrupa pares (clave, valor) ya ordenados en (clave, [valores]), un grupo a la vez."""
+    for clave, grupo in groupby(pares_ordenados, key=lambda par: par[0]):
+        yield clave, [valor for _, valor in grupo]
@@ -0,0 +1,208 @@
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from catalogo_libros import IDIOMAS, LIBROS_ES, NOMBRES_POR_IDIOMA, TOTAL_LIBROS, clave_libro, id_por_nombre
+
+# Los libros que no están en el catálogo reciben un identificador estable (igual en
+# todos los procesos y ejecuciones) a partir de este valor.
+ID_LIBRO_DESCONOCIDO = 1000
+
+# Siglas de versiones que se reconocen sueltas después de la referencia ("Juan 3:16 NVI").
+# Cualquier otra versión tiene que ir entre paréntesis ("Juan 3:16 (BTX4)") o seguida de
+# dos puntos ("Juan 3:16 BTX4: ..."), para no tomar como versión la primera palabra en
+# mayúsculas del texto ("Juan 3:16 DIOS ES AMOR").
+VERSIONES_CONOCIDAS = frozenset({
+    # Español
+    "RVR1960", "RVR1909", "RVR1977", "RVR1995", "RVR2015", "RVA2015", "RVR", "RV60", "RVA", "RVC",
+    "NVI", "NTV", "LBLA", "NBLA", "DHH", "TLA", "BLP", "BLPH", "BTX", "PDT", "NBV", "JBS", "BJ", "RVG",
+    # Inglés
+    "KJV", "NKJV", "NIV", "ESV", "NASB", "NLT", "NRSV", "RSV", "CSB", "HCSB", "AMP", "MSG", "ASV",
+    "WEB", "GNT", "CEV", "NET",
+    # Portugués
+    "ARC", "ARA", "ACF", "NVT", "NTLH", "NAA",
+    # Francés
+    "LSG", "S21", "BDS", "PDV", "NEG",
+    # Chino y japonés
+    "CUV", "CUNP", "CNVS", "JLB", "JCB",
+})
+
+_PATRON_REFERENCIA = re.compile(r"""
+    ^[\s"'“«]*
+    (?P<libro>(?:[1-3]\s*)?[^\W\d_]+\.?(?:\s+[^\W\d_]+\.?)*?)
+    \s*(?P<capitulo>\d{1,3})
+    (?:\s*:\s*(?P<inicio>\d{1,3})(?:\s*[-–]\s*(?P<fin>\d{1,3}))?)?
+    (?:\s*(?:\(\s*(?P<version_p>[^()]{1,40}?)\s*\)
+             |(?P<version_c>[A-Z][A-Z0-9]{1,9})(?=\s*:)
+             |(?P<version>%s)\b))?
+""" % "|".join(sorted(VERSIONES_CONOCIDAS, key=len, reverse=True)), re.VERBOSE)
+
+
+class Referencia(NamedTuple):
+    """
+    Referencia bíblica ya interpretada. Al ser una tupla de enteros (más la versión)
+    se compara, ordena y usa como clave de diccionario sin tocar cadenas.
+    verse_start y verse_end valen 0 cuando la referencia es a un capítulo completo.
+    """
+    book_id: int
+    chapter: int
+    verse_start: int
+    verse_end: int
+    version: str = ""
+
+    @property
+    def pasaje(self):
+        """La referencia sin la versión: lo que se compara al excluir o traducir."""
+        return self[:4]
+
+
+_NOMBRES_DESCONOCIDOS = {}
+
+
+@lru_cache(maxsize=4096)
+def id_libro(nombre):
+    """
+    Resuelve el identificador numérico de un libro a partir de su nombre, alias o
+    abreviatura en cualquier idioma del catálogo (las ambiguas se leen en español).
+    """
+    book_id = id_por_nombre(nombre, "es")
+    if book_id is None:
+        book_id = ID_LIBRO_DESCONOCIDO + zlib.crc32(clave_libro(nombre).encode("utf-8"))
+        _NOMBRES_DESCONOCIDOS.setdefault(book_id, re.sub(r"\s+", " ", nombre).strip())
+    return book_id
+
+
+def nombre_libro(book_id, idioma="es"):
+    """
+    Nombre de un libro del catálogo en el idioma indicado (en español si el idioma no
+    está en el catálogo), o el nombre original si el libro no está.
+    """
+    nombres = NOMBRES_POR_IDIOMA.get(idioma, LIBROS_ES)
+    if 1 <= book_id <= len(nombres):
+        return nombres[book_id - 1]
+    return _NOMBRES_DESCONOCIDOS.get(book_id, str(book_id))
+
+
+_GRUPOS = ("libro", "capitulo", "inicio", "fin", "version_p", "version_c", "version")
+
+
+@lru_cache(maxsize=1 << 16)
+def _interpretar(libro, capitulo, inicio, fin, *versiones) -> Optional[Referencia]:
+    """
+    Arma la Referencia a partir de los grupos del patrón. Se memoriza por esos grupos
+    (la referencia sin el texto de la cita), que sí se repiten entre archivos y versiones.
+    Un rango invertido ('Juan 3:16-5') no es una referencia válida: devuelve None.
+    """
+    inicio = int(inicio or 0)
+    fin = int(fin or inicio)
+    if fin < inicio:
+        return None
+    version = next((v for v in versiones if v), "")
+    return Referencia(id_libro(libro.rstrip(".")), int(capitulo), inicio, fin, version)
+
+
+def _parse(texto, interpretar):
+    if not isinstance(texto, str):
+        return None
+    match = _PATRON_REFERENCIA.match(texto)
+    if not match:
+        return None
+    return interpretar(*match.group(*_GRUPOS))
+
+
+def parse_referencia(texto) -> Optional[Referencia]:
+    """
+    Interpreta el inicio de un campo 'versiculo' (ej. 'Filipenses 2:3-4 RVR1960: "Nada hagáis..."')
+    y devuelve su Referencia, o None si no empieza con una referencia bíblica válida.
+    """
+    return _parse(texto, _interpretar)
+
+
+def limpiar_cache_referencias():
+    """Vacía la caché de referencias ya interpretadas."""
+    _interpretar.cache_clear()
+
+
+def formatear_referencia(referencia, nombre=None, idioma="es"):
+    """
+    Convierte una Referencia (o su pasaje) en texto, ej. 'Juan 3:16' o 'Salmos 23', con
+    el nombre del libro en idioma (el del devocional del que salió, ej. 'John 3:16' en
+    'en'). nombre permite usar directamente otro nombre de libro.
+    """
+    book_id, chapter, verse_start, verse_end = referencia[:4]
+    if nombre is None:
+        nombre = nombre_libro(book_id, idioma)
+    if not verse_start:
+        return f"{nombre} {chapter}"
+    if verse_end != verse_start:
+        return f"{nombre} {chapter}:{verse_start}-{verse_end}"
+    return f"{nombre} {chapter}:{verse_start}"
+
+
+def traducir_referencias(referencias, idiomas=IDIOMAS):
+    """
+    Formatea cada referencia (o pasaje) en los idiomas pedidos y devuelve
+    {idioma: set de textos}. El capítulo y los versículos se formatean una sola vez por
+    referencia; para cada idioma solo se indexa su tabla de nombres por book_id. Los
+    libros fuera del catálogo conservan su nombre original.
+    """
+    traducidas = {idioma: set() for idioma in idiomas}
+    destinos = [(NOMBRES_POR_IDIOMA[idioma], traducidas[idioma]) for idioma in idiomas]
+    for referencia in referencias:
+        sufijo = formatear_referencia(referencia, "")
+        indice = referencia[0] - 1
+        if 0 <= indice < TOTAL_LIBROS:
+            for nombres, destino in destinos:
+                destino.add(nombres[indice] + sufijo)
+        else:
+            texto = nombre_libro(referencia[0]) + sufijo
+            for _, destino in destinos:
+                destino.add(texto)
+    return traducidas
+
+
+def formatear_para_codigo(versiculos, idioma):
+    """
+    Lista de versículos (textos) lista para pegar en código: ordenados, entre comillas y
+    en líneas de 10 elementos como máximo.
+    """
+    if not versiculos:
+        return f"# No hay versículos en {idioma}"
+    ordenados = sorted(versiculos)
+    lineas = []
+    for i in range(0, len(ordenados), 10):
+        elementos = ', '.join(f'"{v}"' for v in ordenados[i:i + 10])
+        lineas.append(f"    {elementos}" if i + 10 >= len(ordenados) else f"    {elementos},")
+    return '\n'.join(lineas)
+
+
+def benchmark_referencias(cantidad=1_000_000):
+    """
+    Micro-benchmark del motor: interpreta `cantidad` referencias con y sin memoización
+    y devuelve las referencias por segundo de cada modo.
+    """
+    libros = LIBROS_ES + ["Salmo", "Cantar de los Cantares"]
+    distintas = [
+        f'{libros[i % len(libros)]} {i % 150 + 1}:{i % 30 + 1}{"-" + str(i % 30 + 3) if i % 4 == 0 else ""}'
+        f' RVR1960: "Texto del versículo {i}"'
+        for i in range(5000)
+    ]
+    textos = [distintas[i % len(distintas)] for i in range(cantidad)]
+
+    resultados = {}
+    sin_cache = _interpretar.__wrapped__
+    for modo, funcion in (("sin_cache", lambda texto: _parse(texto, sin_cache)), ("con_cache", parse_referencia)):
+        limpiar_cache_referencias()
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcion(texto)
+        segundos = time.perf_counter() - inicio
+        resultados[modo] = {"segundos": round(segundos, 3), "referencias_por_segundo": int(cantidad / segundos)}
+    return resultados
+
+
+if __name__ == "__main__":
+    for modo, datos in benchmark_referencias().items():
+        print(f"{modo}: {datos['referencias_por_segundo']:,} referencias/s ({datos['segundos']} s)")
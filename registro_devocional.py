@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sys
+
+from referencias_biblicas import parse_referencia
+
+# Campos habituales de un devocional: se guardan en slots en vez de en un dict propio.
+CAMPOS = ("id", "date", "language", "version", "versiculo", "reflexion", "oracion")
+
+# Valores que se repiten entre miles de registros y se comparten con sys.intern.
+_INTERNADOS = frozenset(("date", "language", "version"))
+_CONOCIDOS = frozenset(CAMPOS)
+
+# Cada orden de claves distinto se guarda una sola vez y lo comparten todos los registros.
+_ORDENES = {}
+
+
+def _orden(claves):
+    return _ORDENES.setdefault(claves, claves)
+
+
+class Devocional:
+    """
+    Devocional compacto en memoria. Los campos habituales van en slots, las fechas,
+    idiomas y versiones se internan, el orden original de las claves es una tupla
+    compartida y los campos desconocidos se conservan en extras, así que a_dict()
+    devuelve exactamente el dict leído (mismas claves, valores y orden).
+    referencia es la Referencia ya interpretada del campo 'versiculo' (o None).
+
+    Se usa como un dict de solo lo necesario: get, [], in y asignación.
+    """
+
+    __slots__ = CAMPOS + ("claves", "extras", "referencia")
+
+    def __init__(self, pares=()):
+        extras = None
+        claves = []
+        for clave, valor in pares:
+            if clave in _CONOCIDOS:
+                if clave in _INTERNADOS and type(valor) is str:
+                    valor = sys.intern(valor)
+                setattr(self, clave, valor)
+            else:
+                if extras is None:
+                    extras = {}
+                extras[sys.intern(clave)] = valor
+            claves.append(clave)
+        self.claves = _orden(tuple(claves))
+        self.extras = extras
+        self.referencia = parse_referencia(self.versiculo) if "versiculo" in self.claves else None
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos.items())
+
+    def __contains__(self, clave):
+        return clave in self.claves
+
+    def __getitem__(self, clave):
+        if clave not in self.claves:
+            raise KeyError(clave)
+        return getattr(self, clave) if clave in _CONOCIDOS else self.extras[clave]
+
+    def get(self, clave, defecto=None):
+        if clave not in self.claves:
+            return defecto
+        return getattr(self, clave) if clave in _CONOCIDOS else self.extras[clave]
+
+    def __setitem__(self, clave, valor):
+        if clave in _CONOCIDOS:
+            if clave in _INTERNADOS and type(valor) is str:
+                valor = sys.intern(valor)
+            setattr(self, clave, valor)
+            if clave == "versiculo":
+                self.referencia = parse_referencia(valor)
+        else:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[sys.intern(clave)] = valor
+        if clave not in self.claves:
+            self.claves = _orden(self.claves + (clave,))
+
+    def items(self):
+        for clave in self.claves:
+            yield clave, getattr(self, clave) if clave in _CONOCIDOS else self.extras[clave]
+
+    def a_dict(self):
+        """El devocional como dict, con las claves en el orden original."""
+        return dict(self.items())
+
+    def __eq__(self, otro):
+        if isinstance(otro, Devocional):
+            otro = otro.a_dict()
+        return self.a_dict() == otro
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Al pasar entre procesos se reconstruye para volver a internar los valores.
+        return Devocional, (list(self.items()),)
+
+    def __repr__(self):
+        return f"Devocional({self.a_dict()!r})"
+
+
+def como_json(obj):
+    """Función default de json.dump/json.dumps para escribir Devocional como su dict."""
+    if isinstance(obj, Devocional):
+        return obj.a_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Forma canónica para huella: claves ordenadas, sin espacios y en ASCII (escapar es
+# más rápido que codificar UTF-8 y el resultado es el mismo para textos iguales).
+_CANONICO = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=como_json)
+
+
+def huella(devocional, contexto=""):
+    """
+    Hash canónico del contenido de un devocional (dict o Devocional): blake2b de 16 bytes
+    sobre el JSON compacto con las claves ordenadas, así que no depende del orden de las
+    claves ni del formato del archivo. contexto (por ejemplo, la fecha bajo la que
+    aparece) se incluye en el hash para distinguir el mismo contenido en dos lugares.
+    """
+    h = hashlib.blake2b(contexto.encode("utf-8"), digest_size=16)
+    h.update(b"\0")
+    h.update(_CANONICO.encode(devocional).encode("ascii"))
+    return h.digest()
+
+
+def huella_texto(texto, contexto=""):
+    """
+    Como huella, pero sobre el JSON del devocional tal como se leyó del archivo (ver
+    lectura_json.iter_devocionales con con_texto): no hay que volver a serializarlo, a
+    cambio de que el mismo contenido con otro formato dé otra huella. Si el texto ya es
+    la forma canónica, coincide con huella.
+    """
+    h = hashlib.blake2b(contexto.encode("utf-8"), digest_size=16)
+    h.update(b"\0")
+    h.update(texto.encode("utf-8"))
+    return h.digest()
+
+
+def _pares_a_objeto(pares):
+    """object_pairs_hook: los objetos con 'versiculo' de texto son devocionales; el resto, dicts."""
+    for clave, valor in pares:
+        if clave == "versiculo" and type(valor) is str:
+            return Devocional(pares)
+    return dict(pares)
+
+
+def cargar_compacto(f):
+    """json.load que produce Devocional para los devocionales en lugar de dicts."""
+    return json.load(f, object_pairs_hook=_pares_a_objeto)
+
+
+def decodificar_compacto(texto):
+    """json.loads que produce Devocional para los devocionales en lugar de dicts."""
+    return json.loads(texto, object_pairs_hook=_pares_a_objeto)
+
+
+def compactar(devocional):
+    """Convierte un devocional leído como dict; lo que no es un dict se devuelve tal cual."""
+    return Devocional(devocional.items()) if type(devocional) is dict else devocional
@@ -0,0 +1,106 @@
+import os
+from abc import ABC, abstractmethod
+
+from catalogo_libros import CATALOGO, IDIOMAS
+from escritura_json import abrir_salida, volcar_json
+from indice_versiculos import IndiceVersiculos
+from referencias_biblicas import formatear_para_codigo, formatear_referencia, traducir_referencias
+
+NOMBRE_EXCLUIDOS = "excluded_verses.json"
+NOMBRE_INDICE_EXCLUIDOS = "excluded_verses.idx"
+NOMBRE_TRADUCIDOS = "versiculos_traducidos"
+
+FORMATOS_TRADUCIDOS = ("json", "codigo")
+
+
+class Salida(ABC):
+    """
+    Salida adicional que se arma en la misma pasada que la consolidación, sin volver a
+    leer el JSON consolidado: recibe con agregar cada devocional consolidado (un
+    Devocional, con la referencia ya interpretada) en orden de fecha y al final escribe
+    su archivo con escribir. clave la identifica en el resumen.
+    """
+
+    clave = None
+
+    @abstractmethod
+    def agregar(self, fecha, devocional):
+        """Recibe un devocional consolidado de la fecha."""
+
+    @abstractmethod
+    def escribir(self, carpeta, compresion=None, compacto=False):
+        """Escribe la salida en carpeta y devuelve su ruta."""
+
+
+class SalidaExcluidos(Salida):
+    """
+    excluded_verses.json: los pasajes de todos los devocionales consolidados, con
+    repeticiones y ordenados, igual que el extractor de versículos excluidos sobre el
+    JSON consolidado. Los libros se escriben con su nombre en idioma, el de los
+    devocionales consolidados. Con indice=True se escribe también excluded_verses.idx
+    (ver indice_versiculos).
+    """
+
+    clave = "excluidos"
+
+    def __init__(self, indice=False, idioma="es"):
+        self.indice = indice
+        self.idioma = idioma
+        self.pasajes = []
+
+    def agregar(self, fecha, devocional):
+        if devocional.referencia:
+            self.pasajes.append(devocional.referencia.pasaje)
+
+    def escribir(self, carpeta, compresion=None, compacto=False):
+        ruta = os.path.join(carpeta, NOMBRE_EXCLUIDOS + (f".{compresion}" if compresion else ""))
+        with abrir_salida(ruta) as f:
+            volcar_json(sorted(formatear_referencia(pasaje, idioma=self.idioma) for pasaje in self.pasajes),
+                        f, compacto=compacto)
+        if self.indice:
+            IndiceVersiculos.desde_pasajes(self.pasajes).guardar(os.path.join(carpeta, NOMBRE_INDICE_EXCLUIDOS))
+        return ruta
+
+
+class SalidaTraducidos(Salida):
+    """
+    Las listas de versículos traducidas a otros idiomas, igual que el extractor para
+    otros idiomas sobre el JSON consolidado: los pasajes distintos (sin capítulos
+    completos) formateados en cada idioma. formato 'json' escribe {idioma: [versículos
+    ordenados]}; 'codigo', un .txt con las listas listas para copiar (formatear_para_codigo).
+    """
+
+    clave = "traducidos"
+
+    def __init__(self, idiomas=IDIOMAS, formato="json"):
+        if formato not in FORMATOS_TRADUCIDOS:
+            raise ValueError(f"Formato de versículos traducidos desconocido: {formato}")
+        self.idiomas = tuple(idiomas)
+        self.formato = formato
+        self.pasajes = set()
+
+    def agregar(self, fecha, devocional):
+        referencia = devocional.referencia
+        if referencia and referencia.verse_start:
+            self.pasajes.add(referencia.pasaje)
+
+    def escribir(self, carpeta, compresion=None, compacto=False):
+        traducidas = traducir_referencias(self.pasajes, self.idiomas)
+        extension = ".json" if self.formato == "json" else ".txt"
+        ruta = os.path.join(carpeta, NOMBRE_TRADUCIDOS + extension + (f".{compresion}" if compresion else ""))
+        with abrir_salida(ruta) as f:
+            if self.formato == "json":
+                volcar_json({idioma: sorted(textos) for idioma, textos in traducidas.items()}, f, compacto=compacto)
+            else:
+                for idioma, textos in traducidas.items():
+                    f.write(f"# {CATALOGO[idioma]['idioma']} ({len(textos)} versículos únicos)\n")
+                    f.write(formatear_para_codigo(textos, idioma) + "\n\n")
+        return ruta
+
+
+def alimentar(salidas, fechas):
+    """Pasa a cada salida los devocionales de fechas, un iterable de (fecha, lista) en orden."""
+    for fecha, devocionales in fechas:
+        for devocional in devocionales:
+            for salida in salidas:
+                salida.agregar(fecha, devocional)
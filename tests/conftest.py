@@ -0,0 +1,15 @@
+import _pyio
+import io
+import os
+
+import pytest
+
+
+@pytest.fixture
+def saltos_de_windows(monkeypatch):
+    """
+    Simula la traducción de saltos de línea de Windows: el TextIOWrapper en Python puro
+    usa os.linesep cuando no se le indica newline.
+    """
+    monkeypatch.setattr(io, "TextIOWrapper", _pyio.TextIOWrapper)
+    monkeypatch.setattr(os, "linesep", "\r\n")
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_devocionales import _cargar_herramienta, benchmark_suite, generar_corpus  # noqa: E402
+
+PARAMETROS = {"anios": (2025,), "idiomas": ("es",), "tamano": 12000, "semilla": 0}
+
+
+def test_suite_con_workers_usa_el_pool_de_procesos(tmp_path):
+    consolidador = _cargar_herramienta("--conslidador archivos Json. V2.0.py", "consolidador")
+    corpus = generar_corpus(str(tmp_path), **PARAMETROS)
+    assert sum(os.path.getsize(ruta) for ruta in corpus["archivos"]) >= consolidador.MIN_BYTES_PARALELO
+    assert consolidador._usar_procesos(corpus["archivos"], 2)
+
+    informe = benchmark_suite(workers=2, **PARAMETROS)
+
+    assert informe["parametros"]["workers"] == 2
+    assert informe["resultados"]["consolidador"]["registros"] == corpus["devocionales"]
+    assert informe["resultados"]["canal_unico"]["segundos"] > 0
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_devocionales import _cargar_herramienta  # noqa: E402
+from metricas import Metricas  # noqa: E402
+
+
+def _devocional(versiculo, reflexion):
+    return {"id": reflexion, "versiculo": versiculo, "reflexion": reflexion}
+
+
+def _escribir_archivo(ruta):
+    # Dentro del mismo archivo: una repetición exacta, un duplicado por fecha y versículo
+    # con otro texto y un devocional sin referencia.
+    original = _devocional("Juan 3:16 RVR1960: \"Porque de tal manera...\"", "uno")
+    datos = {"data": {"es": {
+        "2025-01-01": [original, dict(original), _devocional("Juan 3:16 RVR1960: \"Porque de tal manera...\"", "dos")],
+        "2025-01-02": [_devocional("sin referencia", "tres"), _devocional("Salmos 23", "cuatro")],
+    }}}
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+
+
+def _contadores(consolidador, archivos, salida, cache, exact_repeats):
+    metricas = Metricas()
+    with redirect_stdout(StringIO()):
+        consolidador.consolidate_devotionals(archivos, salida, workers=1, cache_dir=cache, metricas=metricas,
+                                             exact_repeats=exact_repeats)
+    contadores = metricas.como_dict()["contadores"]
+    return {nombre: contadores.get(nombre, 0) for nombre in consolidador.CONTADORES_EN_CACHE}
+
+
+@pytest.mark.parametrize("exact_repeats", [False, True])
+def test_la_cache_informa_los_mismos_contadores_que_una_lectura_nueva(tmp_path, exact_repeats):
+    consolidador = _cargar_herramienta("--conslidador archivos Json. V2.0.py", "consolidador")
+    archivos = [str(tmp_path / "a.json"), str(tmp_path / "b.json")]
+    for ruta in archivos:
+        _escribir_archivo(ruta)
+    cache = str(tmp_path / "cache")
+
+    sin_cache = _contadores(consolidador, archivos, str(tmp_path / "salida_a"), None, exact_repeats)
+    primera = _contadores(consolidador, archivos, str(tmp_path / "salida_b"), cache, exact_repeats)
+    desde_cache = _contadores(consolidador, archivos, str(tmp_path / "salida_b"), cache, exact_repeats)
+
+    # Sin huellas, las repeticiones exactas se cuentan como duplicados por fecha y versículo
+    assert sin_cache["duplicados"] and sin_cache["sin_referencia"]
+    assert bool(sin_cache["duplicados_exactos"]) == exact_repeats
+    assert primera == sin_cache
+    assert desde_cache == sin_cache
+
+
+def test_las_huellas_no_cambian_la_salida(tmp_path):
+    consolidador = _cargar_herramienta("--conslidador archivos Json. V2.0.py", "consolidador")
+    archivos = [str(tmp_path / "a.json"), str(tmp_path / "b.json")]
+    for ruta in archivos:
+        _escribir_archivo(ruta)
+
+    salidas = []
+    for exact_repeats in (False, True):
+        with redirect_stdout(StringIO()):
+            resumen = consolidador.consolidate_devotionals(archivos, str(tmp_path / f"salida_{exact_repeats}"),
+                                                           workers=1, exact_repeats=exact_repeats)
+        with open(resumen["salida_json"], "rb") as f:
+            salidas.append(f.read())
+
+    assert salidas[0] == salidas[1]
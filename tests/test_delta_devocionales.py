@@ -0,0 +1,108 @@
+import copy
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta_devocionales import aplicar_delta, escribir_delta, resumir  # noqa: E402
+from escritura_json import abrir_salida, escribir_comprimido, volcar_devocionales  # noqa: E402
+
+
+def _devocional(idioma, fecha, version, texto):
+    return {"id": f"{idioma}-{fecha}-{version}", "date": fecha, "language": idioma,
+            "versiculo": f"Juan 3:16 {version}", "reflexion": texto, "version": version}
+
+
+def _anterior():
+    return {
+        "es": {
+            "2025-01-01": [_devocional("es", "2025-01-01", "RVR1960", "uno"),
+                           _devocional("es", "2025-01-01", "NVI", "dos")],
+            "2025-01-02": [_devocional("es", "2025-01-02", "RVR1960", "tres")],
+            "2025-01-03": [_devocional("es", "2025-01-03", "RVR1960", "cuatro")],
+        },
+        "en": {
+            "2025-01-01": [_devocional("en", "2025-01-01", "KJV", "one")],
+        },
+    }
+
+
+def _nuevo(anterior):
+    nuevo = copy.deepcopy(anterior)
+    # Modificado: misma (idioma, fecha, versión) con otro contenido
+    nuevo["es"]["2025-01-01"][0]["reflexion"] = "uno (revisado)"
+    # Eliminado: una versión de una fecha que sigue existiendo, y una fecha entera
+    del nuevo["es"]["2025-01-01"][1]
+    del nuevo["es"]["2025-01-03"]
+    # Agregados: otra versión en una fecha existente, una fecha nueva y un idioma nuevo
+    nuevo["es"]["2025-01-02"].append(_devocional("es", "2025-01-02", "NVI", "cinco"))
+    nuevo["en"]["2025-01-02"] = [_devocional("en", "2025-01-02", "KJV", "two")]
+    nuevo["pt"] = {"2025-01-01": [_devocional("pt", "2025-01-01", "ARC", "um")]}
+    return nuevo
+
+
+def _escribir(ruta, idiomas, compacto):
+    buffer = io.StringIO()
+    volcar_devocionales(buffer, [(idioma, list(fechas.items())) for idioma, fechas in idiomas.items()],
+                        compacto=compacto)
+    escribir_comprimido(str(ruta), buffer.getvalue().encode("utf-8"))
+
+
+@pytest.mark.parametrize("compacto, extension", [
+    (False, ".json"),
+    (True, ".json"),
+    (False, ".json.gz"),
+    (True, ".json.gz"),
+])
+def test_aplicar_delta_reproduce_el_nuevo_byte_a_byte(tmp_path, compacto, extension):
+    anterior = _anterior()
+    ruta_anterior = tmp_path / f"anterior{extension}"
+    ruta_nueva = tmp_path / f"nuevo{extension}"
+    ruta_reconstruida = tmp_path / f"reconstruido{extension}"
+    _escribir(ruta_anterior, anterior, compacto)
+    _escribir(ruta_nueva, _nuevo(anterior), compacto)
+
+    ruta, delta = escribir_delta(str(ruta_anterior), str(ruta_nueva))
+    aplicar_delta(str(ruta_anterior), ruta, str(ruta_reconstruida))
+
+    assert ruta_reconstruida.read_bytes() == ruta_nueva.read_bytes()
+    resumen = resumir(delta)
+    assert resumen["agregados"] and resumen["modificados"] and resumen["eliminados"]
+
+
+def test_aplicar_delta_rechaza_otro_archivo_base(tmp_path):
+    anterior = _anterior()
+    ruta_anterior = tmp_path / "anterior.json"
+    ruta_nueva = tmp_path / "nuevo.json"
+    _escribir(ruta_anterior, anterior, False)
+    _escribir(ruta_nueva, _nuevo(anterior), False)
+    ruta, _ = escribir_delta(str(ruta_anterior), str(ruta_nueva))
+
+    with pytest.raises(ValueError):
+        aplicar_delta(str(ruta_nueva), ruta, str(tmp_path / "reconstruido.json"))
+
+
+@pytest.mark.parametrize("compacto, extension", [
+    (False, ".json"),
+    (True, ".json"),
+    (False, ".json.gz"),
+])
+def test_delta_de_salidas_escritas_con_abrir_salida(tmp_path, saltos_de_windows, compacto, extension):
+    # Las herramientas escriben con abrir_salida; en Windows no debe traducir los saltos de línea.
+    anterior = _anterior()
+    rutas = {}
+    for nombre, idiomas in (("anterior", anterior), ("nuevo", _nuevo(anterior))):
+        rutas[nombre] = str(tmp_path / f"{nombre}{extension}")
+        with abrir_salida(rutas[nombre]) as f:
+            volcar_devocionales(f, [(idioma, list(fechas.items())) for idioma, fechas in idiomas.items()],
+                                compacto=compacto)
+    ruta_reconstruida = tmp_path / f"reconstruido{extension}"
+
+    ruta, _ = escribir_delta(rutas["anterior"], rutas["nuevo"])
+    aplicar_delta(rutas["anterior"], ruta, str(ruta_reconstruida))
+
+    with open(rutas["nuevo"], "rb") as f:
+        assert ruta_reconstruida.read_bytes() == f.read()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from escritura_json import abrir_salida, escribir_indice_fechas, volcar_devocionales  # noqa: E402
+from lectura_json import LectorIndexado  # noqa: E402
+
+
+def _idiomas():
+    return [("es", [(f"2025-01-{dia:02d}", [{"id": f"es-{dia}", "versiculo": f"Juan 3:{dia} RVR1960",
+                                             "reflexion": "línea\ncon salto"}])
+                    for dia in range(1, 6)]),
+            ("en", [("2025-01-01", [{"id": "en-1", "versiculo": "John 3:16 KJV"}])])]
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_indice_de_fechas_lee_entradas_despues_de_la_primera_linea(tmp_path, saltos_de_windows, compacto):
+    ruta = str(tmp_path / "consolidado.json")
+    desplazamientos = {}
+    with abrir_salida(ruta) as f:
+        volcar_devocionales(f, _idiomas(), compacto=compacto, desplazamientos=desplazamientos)
+    escribir_indice_fechas(ruta, desplazamientos)
+
+    with open(ruta, "rb") as f:
+        assert b"\r\n" not in f.read()
+    with LectorIndexado(ruta) as lector:
+        assert lector.devocionales("es", "2025-01-04")[0]["id"] == "es-4"
+        assert lector.devocionales("en", "2025-01-01")[0]["id"] == "en-1"